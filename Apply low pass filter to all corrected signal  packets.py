@@ -1,8 +1,8 @@
 def lowpass(data: np.ndarray, cutoff: float, sample_rate: float, poles: int = 12):
-    # Design the low-pass filter using Butterworth filter
-    sos = scipy.signal.butter(poles, cutoff, 'lowpass', fs=sample_rate, output='sos')
-    filtered_data = scipy.signal.sosfiltfilt(sos, data)
-    return filtered_data, sos
+    # Design the low-pass Butterworth filter once per parameter set (cached in the shared filter bank)
+    design = filter_bank.design('lowpass', poles, cutoff, sample_rate)
+    filtered_data = filter_bank.sosfiltfilt(design, data)
+    return filtered_data, design.sos
 
         # Apply low-pass filter to the corrected packet (e.g., 4 MHz cutoff)
 filtered_packet, sos = lowpass(corrected_packet, 8.5e6, sampling_rate)
@@ -11,20 +11,14 @@ fs=50e6
 # Frequency response of the filter
 w, h = scipy.signal.sosfreqz(sos, worN=2000, fs=fs)
 
-# Loop through all extracted packets, apply low-pass filter, and plot the filtered packets
-for idx, (start_idx, end_idx) in enumerate(packets, start=1):
-    # Extract corresponding signal samples for the packet
-    current_packet = ocusync2_data[start_idx:end_idx]
+# Estimate offsets, correct and low-pass filter all extracted packets in one batched pass
+pipeline = PacketPipeline(processor, sampling_rate=sampling_rate, cutoff=8.5e6)
+results = pipeline.run(ocusync2_data, packets)
 
-    # Correct the frequency offset for the packet (assuming offset is calculated previously)
-    offset, band_found = processor.estimate_offset(current_packet, sampling_rate, packet_type="droneid")
-
-    if band_found:
-        # Apply frequency shift correction using the static method of DroneSignalProcessor
-        corrected_packet = DroneSignalProcessor.fshift(current_packet, -offset, sampling_rate)
-
-        # Apply low-pass filter to the corrected packet (e.g., 4 MHz cutoff)
-        filtered_packet, sos = lowpass(corrected_packet, 8.5e6, sampling_rate)
+# Loop through the results and plot the filtered packets
+for idx, result in enumerate(results, start=1):
+    if result.band_found:
+        filtered_packet = result.filtered
 
         # Plot the spectrogram for the filtered packet
         plt.figure(figsize=(20, 6))
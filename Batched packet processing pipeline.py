@@ -0,0 +1,242 @@
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+import itertools
+import os
+import weakref
+import numpy as np
+import scipy.fft
+from scipy.signal import get_window
+from scipy.signal.windows import hamming
+
+# Result of the offset -> shift -> lowpass chain for one packet
+PacketResult = namedtuple("PacketResult", ["start", "end", "offset", "band_found", "corrected", "filtered"])
+
+
+@lru_cache(maxsize=256)
+def hamming_window(length):
+    """Cached, read-only Hamming window of the given length."""
+    window = hamming(length)
+    window.flags.writeable = False
+    return window
+
+
+def batched_welch(rows, lengths, fs, nperseg=256, noverlap=None, nfft=None, prewindow=True):
+    """
+    Two-sided Welch PSD of many zero-padded packets at once.
+
+    Row r matches `welch(row[:L] * hamming(L), fs, nperseg=nperseg, nfft=nfft,
+    return_onesided=False)` with L = lengths[r] (the full-length Hamming taper
+    is skipped with prewindow=False). Segments are transformed one segment
+    index at a time across all rows, so memory stays at rows x nfft.
+
+    Parameters:
+        rows (np.ndarray): 2-D array of zero-padded complex packets.
+        lengths (np.ndarray): Valid length of each row.
+        fs (float): Sampling rate in Hz.
+        nperseg (int): Welch segment length.
+        noverlap (int): Segment overlap (default: nperseg // 2).
+        nfft (int): FFT length per segment (default: nperseg).
+        prewindow (bool): Multiply each packet by a Hamming window of its own length first.
+
+    Returns:
+        f (np.ndarray): Frequencies in FFT order.
+        Pxx_den (np.ndarray): PSD of each row, shape (rows, nfft), in FFT order.
+    """
+    lengths = np.asarray(lengths)
+    noverlap = nperseg // 2 if noverlap is None else noverlap
+    nfft = nperseg if nfft is None else nfft
+    step = nperseg - noverlap
+
+    # Longest rows first, so the rows still active at each segment index form a prefix
+    order = np.argsort(-lengths, kind='stable')
+    sorted_lengths = lengths[order]
+    x = rows[order]
+    if prewindow:
+        x = x.astype(np.complex128)
+        for r, length in enumerate(sorted_lengths):
+            x[r, :length] *= hamming_window(int(length))
+
+    segment_window = get_window('hann', nperseg)
+    scale = 1.0 / (fs * (segment_window ** 2).sum())
+    num_segments = (sorted_lengths - noverlap) // step
+
+    accumulated = np.zeros((len(rows), nfft))
+    for k in range(int(num_segments.max(initial=0))):
+        active = int(np.count_nonzero(num_segments > k))
+        segment = x[:active, k * step:k * step + nperseg]
+        segment = (segment - segment.mean(axis=1, keepdims=True)) * segment_window
+        accumulated[:active] += np.abs(scipy.fft.fft(segment, nfft, axis=1)) ** 2
+
+    Pxx_den = np.empty_like(accumulated)
+    Pxx_den[order] = accumulated * scale / np.maximum(num_segments, 1)[:, None]
+    return scipy.fft.fftfreq(nfft, 1 / fs), Pxx_den
+
+
+# Live arrays with a cache identity: id(array) -> (weak reference, identity)
+_array_identities = {}
+_array_counter = itertools.count()
+
+
+def _forget_array(key, ref):
+    if _array_identities.get(key, (None,))[0] is ref:
+        del _array_identities[key]
+
+
+def capture_identity(data):
+    """
+    Cache identity of a capture.
+
+    A CaptureReader is identified by its file: path, size, modification time, sample
+    format and header, so results cached before the file was rewritten are not reused.
+    Any other array (including np.memmap, whose slices keep the parent's filename) gets
+    a token that is never handed out again. id(data) alone is not enough, since the id
+    of a garbage-collected array is reused by the next one. Arrays are assumed not to
+    change in place while their results are cached.
+
+    Parameters:
+        data (np.ndarray or CaptureReader): Capture samples.
+
+    Returns:
+        identity (tuple): Hashable capture identity for cache keys.
+    """
+    filepath = getattr(data, "filepath", None)
+    if filepath is not None:
+        stat = os.stat(filepath)
+        return ("file", os.path.realpath(filepath), stat.st_size, stat.st_mtime_ns, data.sample_format,
+                data.header_bytes)
+
+    key = id(data)
+    entry = _array_identities.get(key)
+    if entry is None or entry[0]() is not data:
+        try:
+            ref = weakref.ref(data, lambda ref: _forget_array(key, ref))
+        except TypeError:
+            raise ValueError(f"Pass an explicit capture_id for captures of type {type(data).__name__}") from None
+        entry = (ref, ("array", next(_array_counter)))
+        _array_identities[key] = entry
+    return entry[1]
+
+
+class PacketPipeline:
+    """
+    Runs offset estimation, frequency shift and low-pass filtering for all packets at once.
+
+    Packets are bucketed by length and zero-padded into 2-D arrays, so Welch,
+    the frequency shift and the zero-phase filter run as batched NumPy/SciPy
+    operations per bucket. Results are cached by (capture, start, end, params)
+    in a bounded LRU cache, so re-running an analysis script reuses them.
+    Buckets are processed `batch_rows` packets at a time, so working memory is
+    bounded by batch_rows x the longest packet, whatever the number of packets.
+
+    Parameters:
+        processor (DroneSignalProcessor): Supplies the band search of estimate_offset.
+        sampling_rate (float): Sampling rate in Hz.
+        cutoff (float): Low-pass cutoff in Hz.
+        poles (int): Low-pass Butterworth order.
+        nfft_welch (int): FFT size of the offset-estimation PSD.
+        bucket_step (int): Packets whose lengths round up to the same multiple of this share a bucket.
+        max_cached_packets (int): Maximum number of packet results kept in the cache.
+        batch_rows (int): Packets processed together per batch of a bucket.
+    """
+
+    def __init__(self, processor, sampling_rate=50e6, cutoff=8.5e6, poles=12, nfft_welch=2048,
+                 bucket_step=4096, max_cached_packets=4096, batch_rows=64):
+        self.processor = processor
+        self.sampling_rate = sampling_rate
+        self.cutoff = cutoff
+        self.poles = poles
+        self.nfft_welch = nfft_welch
+        self.bucket_step = bucket_step
+        self.max_cached_packets = max_cached_packets
+        self.batch_rows = batch_rows
+        self._cache = OrderedDict()
+
+    @property
+    def params(self):
+        return (self.sampling_rate, self.cutoff, self.poles, self.nfft_welch)
+
+    def run(self, data, packets, capture_id=None):
+        """
+        Process every packet of a capture.
+
+        Parameters:
+            data (np.ndarray): Capture samples (array, memmap or CaptureReader).
+            packets (list): (start_idx, end_idx) of each packet.
+            capture_id: Identifies the capture in the cache key (default: capture_identity(data)).
+
+        Returns:
+            results (list): One PacketResult per packet, in input order. `corrected` and
+            `filtered` are None when no band was found.
+        """
+        if capture_id is None:
+            capture_id = capture_identity(data)
+
+        keys = [(capture_id, int(start), int(end), self.params) for start, end in packets]
+        found = {key: self._cache[key] for key in dict.fromkeys(keys) if key in self._cache}
+
+        # Bucket the uncached packets by rounded-up length and process each bucket in row batches
+        buckets = {}
+        for key in dict.fromkeys(keys):
+            if key not in found:
+                buckets.setdefault(-(-(key[2] - key[1]) // self.bucket_step), []).append(key)
+        for bucket in buckets.values():
+            for i in range(0, len(bucket), self.batch_rows):
+                batch = bucket[i:i + self.batch_rows]
+                found.update(zip(batch, self._process_bucket(data, batch)))
+
+        # Refresh hits and store new results, then evict; this run's results are already collected
+        for key, result in found.items():
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cached_packets:
+            self._cache.popitem(last=False)
+        return [found[key] for key in keys]
+
+    def _process_bucket(self, data, bucket):
+        starts = np.array([key[1] for key in bucket])
+        lengths = np.array([key[2] - key[1] for key in bucket])
+
+        rows = np.zeros((len(bucket), lengths.max()), dtype=np.complex128)
+        for r, (start, length) in enumerate(zip(starts, lengths)):
+            rows[r, :length] = data[start:start + length]
+
+        # Step 1: Offset estimation from a batched Welch PSD (packets shorter than one FFT are skipped)
+        offsets = np.zeros(len(bucket))
+        band_found = np.zeros(len(bucket), dtype=bool)
+        long_enough = np.flatnonzero(lengths >= self.nfft_welch)
+        if len(long_enough):
+            _, Pxx_den = batched_welch(rows[long_enough], lengths[long_enough], self.sampling_rate, nfft=self.nfft_welch)
+            for r, psd in zip(long_enough, np.fft.fftshift(Pxx_den, axes=1)):
+                offsets[r], band_found[r] = self.processor.find_offset_band(psd, self.sampling_rate, self.nfft_welch)
+
+        # Step 2 and 3: Shift and low-pass filter the packets with a band, all rows at once
+        corrected = filtered = None
+        found = np.flatnonzero(band_found)
+        if len(found):
+            corrected = DroneSignalProcessor.fshift_batch(rows[found], -offsets[found], self.sampling_rate)
+            design = filter_bank.design('lowpass', self.poles, self.cutoff, self.sampling_rate)
+            filtered = filter_bank.sosfiltfilt_ragged(design, corrected, lengths[found])
+
+        results = []
+        row_of = {r: i for i, r in enumerate(found)}
+        for r, key in enumerate(bucket):
+            offset = offsets[r] if lengths[r] >= self.nfft_welch else None
+            if band_found[r]:
+                i, length = row_of[r], lengths[r]
+                results.append(PacketResult(key[1], key[2], offset, True, corrected[i, :length], filtered[i, :length]))
+            else:
+                results.append(PacketResult(key[1], key[2], offset, False, None, None))
+        return results
+
+    def cache_clear(self):
+        self._cache.clear()
+
+
+# Example usage:
+pipeline = PacketPipeline(DroneSignalProcessor(debug=False), sampling_rate=50e6)
+results = pipeline.run(ocusync2_data, packets)
+for idx, result in enumerate(results, start=1):
+    if result.band_found:
+        print(f"Packet {idx}: Offset = {result.offset / 1000:.2f} kHz, {len(result.filtered)} filtered samples")
+    else:
+        print(f"Packet {idx}: No suitable band found for offset correction.")
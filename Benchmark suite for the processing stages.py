@@ -0,0 +1,263 @@
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+import numpy as np
+import scipy
+
+# Capture sizes in bytes (complex64, 8 bytes per sample)
+BENCHMARK_SIZES = (10e6, 100e6, 1e9, 10e9)
+
+# Detection parameters of the detection script
+DETECTION_PARAMS = {"window_ms": 0.508, "threshold_factor": 0.6, "low_cutoff": 5e6, "high_cutoff": 24e6}
+
+
+def _measure(func, *args, measure_memory=True, **kwargs):
+    """
+    Run func and return (result, wall seconds, CPU seconds, peak bytes allocated).
+
+    The timed run has tracemalloc off, so tracing overhead never enters the times or the
+    throughput compare_benchmarks checks. The peak comes from a second, untimed run under
+    tracemalloc (None with measure_memory=False), so func must be safe to call twice.
+    """
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = func(*args, **kwargs)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    if not measure_memory:
+        return result, wall, cpu, None
+
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, wall, cpu, peak
+
+
+def _per_packet(func, items):
+    """Run func on every item and return (results, per-item latencies in seconds)."""
+    results, latencies = [], []
+    for item in items:
+        start = time.perf_counter()
+        results.append(func(item))
+        latencies.append(time.perf_counter() - start)
+    return results, np.array(latencies)
+
+
+def _record(stage, mode, wall, cpu, peak, samples, latencies=None, **extra):
+    record = {"stage": stage, "mode": mode, "wall_s": wall, "cpu_s": cpu, "samples": int(samples),
+              "samples_per_s": samples / wall if wall > 0 else None,
+              "peak_memory_bytes": None if peak is None else int(peak)}
+    if latencies is not None and len(latencies):
+        record["packets"] = len(latencies)
+        record["latency_ms"] = {"mean": float(latencies.mean() * 1e3),
+                                "p50": float(np.percentile(latencies, 50) * 1e3),
+                                "p95": float(np.percentile(latencies, 95) * 1e3),
+                                "max": float(latencies.max() * 1e3)}
+    record.update(extra)
+    return record
+
+
+def benchmark_capture(reader, truth, workdir, in_memory_limit=1e9, max_packets=200, sampling_rate=50e6,
+                      measure_memory=True):
+    """
+    Time every processing stage on one capture.
+
+    Whole-capture stages (bandpass, detection) run in memory up to in_memory_limit bytes
+    and streamed (overlap-save FIR into a memmap, streaming detector) beyond it.
+    Per-packet stages run on the first max_packets detected packets. Every stage is
+    timed without tracemalloc; with measure_memory it runs a second time for its peak.
+
+    Parameters:
+        reader (CaptureReader): Capture to process.
+        truth (np.ndarray): Ground-truth bursts of the capture (BURST_DTYPE).
+        workdir (str): Directory for temporary memmaps.
+        in_memory_limit (float): Largest capture (bytes) processed in memory.
+        max_packets (int): Packets timed by the per-packet stages.
+        sampling_rate (float): Sampling rate in Hz.
+        measure_memory (bool): Run each stage again under tracemalloc for its peak memory.
+
+    Returns:
+        records (list): One dict per stage (see run_benchmarks).
+    """
+    params = DETECTION_PARAMS
+    records = []
+    in_memory = reader.nbytes <= in_memory_limit
+
+    def measure(func, *args, **kwargs):
+        return _measure(func, *args, measure_memory=measure_memory, **kwargs)
+
+    # Step 1: Bandpass filter over the whole capture
+    if in_memory:
+        data = np.array(reader.read())
+        filtered, wall, cpu, peak = measure(bandpass_filter, data, sampling_rate, params["low_cutoff"],
+                                            params["high_cutoff"])
+        records.append(_record("bandpass_filter", "in-memory iir", wall, cpu, peak, len(data)))
+    else:
+        data = reader
+        out = np.memmap(os.path.join(workdir, "bandpass.tmp"), dtype=np.complex64, mode="w+", shape=(len(reader),))
+        filtered, wall, cpu, peak = measure(bandpass_filter, reader, sampling_rate, params["low_cutoff"],
+                                            params["high_cutoff"], method="fir", out=out)
+        records.append(_record("bandpass_filter", "streamed fir", wall, cpu, peak, len(reader)))
+
+    # Step 2: Energy detection
+    if in_memory:
+        (packets, _, _), wall, cpu, peak = measure(detect_packets_energy, filtered, sampling_rate,
+                                                   params["window_ms"], params["threshold_factor"])
+        mode = "in-memory"
+    else:
+        def streaming_detection():
+            detector = StreamingPacketDetector(sampling_rate, params["window_ms"], params["threshold_factor"])
+            blocks = (filtered[start:start + (1 << 22)] for start in range(0, len(filtered), 1 << 22))
+            return list(detector.iter_packets(blocks))
+
+        packets, wall, cpu, peak = measure(streaming_detection)
+        mode = "streaming"
+    records.append(_record("detect_packets_energy", mode, wall, cpu, peak, len(filtered),
+                           packets_detected=len(packets), packets_true=len(truth)))
+    del filtered
+
+    packets = packets[:max_packets] or [(int(b["start_idx"]), int(b["end_idx"])) for b in truth[:max_packets]]
+    raw_packets = [np.asarray(data[start_idx:end_idx]) for start_idx, end_idx in packets]
+    packet_samples = sum(len(p) for p in raw_packets)
+    processor = DroneSignalProcessor(debug=False)
+
+    # Step 3: Per-packet stages
+    (offsets, latencies), wall, cpu, peak = measure(
+        _per_packet, lambda p: processor.estimate_offset(p, sampling_rate), raw_packets)
+    records.append(_record("estimate_offset", "per-packet", wall, cpu, peak, packet_samples, latencies))
+
+    found = [(p, offset) for p, (offset, band_found) in zip(raw_packets, offsets) if band_found]
+    (corrected, latencies), wall, cpu, peak = measure(
+        _per_packet, lambda item: DroneSignalProcessor.fshift(item[0], -item[1], sampling_rate), found)
+    records.append(_record("fshift", "per-packet", wall, cpu, peak, sum(len(p) for p, _ in found), latencies))
+
+    (filtered_packets, latencies), wall, cpu, peak = measure(
+        _per_packet, lambda p: lowpass(p, 8.5e6, sampling_rate)[0], corrected)
+    corrected_samples = sum(len(p) for p in corrected)
+    records.append(_record("lowpass", "per-packet", wall, cpu, peak, corrected_samples, latencies))
+
+    long_enough = [p for p in filtered_packets if len(p) >= 2048]
+
+    def snr_stage():
+        # A private, empty PSDService: every PSD is computed, and the shared psd_service is left alone
+        service = PSDService()
+        psds = [service.psd(p, key=i, fs=sampling_rate, stage="filtered", nperseg=2048, capture_id=reader.filepath)
+                for i, p in enumerate(long_enough)]
+        if not psds:
+            return None
+        return SNRCalculator(psds[0].f).compute(np.array([psd.Pxx_den for psd in psds]))
+
+    _, wall, cpu, peak = measure(snr_stage)
+    records.append(_record("snr", "batched", wall, cpu, peak, sum(len(p) for p in long_enough),
+                           packets=len(long_enough)))
+
+    _, wall, cpu, peak = measure(ragged_moments, filtered_packets)
+    records.append(_record("moments", "batched", wall, cpu, peak, corrected_samples, packets=len(filtered_packets)))
+
+    def patterns(p):
+        return extract_patterns(p, 0.25 * np.mean(np.abs(p) ** 2), 3600, 5)[0]
+
+    (_, latencies), wall, cpu, peak = measure(_per_packet, patterns, filtered_packets)
+    records.append(_record("extract_patterns", "per-packet", wall, cpu, peak, corrected_samples, latencies))
+    return records
+
+
+def _version_label():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return time.strftime("%Y%m%d-%H%M%S")
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, workdir="benchmarks", label=None, seed=0, in_memory_limit=1e9,
+                   max_packets=200, sampling_rate=50e6, keep_captures=True, measure_memory=True):
+    """
+    Benchmark every stage on synthetic captures of each size and save the results as JSON.
+
+    Captures are generated once per (size, seed) with SyntheticOcuSync2 and reused by later
+    runs, so results of different versions are measured on identical data.
+
+    Parameters:
+        sizes (tuple): Capture sizes in bytes.
+        workdir (str): Directory for the captures and the results.
+        label (str): Name of the result file (default: current git commit, else a timestamp).
+        seed (int): Seed of the synthetic captures.
+        in_memory_limit (float): Largest capture (bytes) processed in memory.
+        max_packets (int): Packets timed by the per-packet stages.
+        sampling_rate (float): Sampling rate in Hz.
+        keep_captures (bool): Keep the generated captures for the next run.
+        measure_memory (bool): Also record each stage's peak memory (from a second, untimed run).
+
+    Returns:
+        report (dict): Environment and per-size, per-stage records, as written to <workdir>/<label>.json.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    label = label or _version_label()
+    generator = SyntheticOcuSync2(sampling_rate=sampling_rate, seed=seed)
+
+    report = {"label": label, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "environment": {"python": platform.python_version(), "numpy": np.__version__,
+                              "scipy": scipy.__version__, "machine": platform.machine(),
+                              "cpu_count": os.cpu_count()},
+              "results": []}
+
+    for size in sizes:
+        num_samples = int(size // 8)
+        path = os.path.join(workdir, f"synthetic_{int(size)}B_seed{seed}.dat")
+        if not os.path.exists(path) or os.path.getsize(path) != num_samples * 8:
+            generator.write(path, num_samples)
+        truth = generator.schedule(num_samples)
+        reader = CaptureReader(path, sampling_rate=sampling_rate)
+
+        records = benchmark_capture(reader, truth, workdir, in_memory_limit, max_packets, sampling_rate,
+                                    measure_memory)
+        for record in records:
+            record.update(size_bytes=int(size), num_samples=num_samples)
+            report["results"].append(record)
+            print(f"{size / 1e6:>8.0f} MB  {record['stage']:<22} {record['mode']:<14} "
+                  f"{record['wall_s']:8.3f} s  {(record['samples_per_s'] or 0) / 1e6:9.2f} MS/s  "
+                  f"{(record['peak_memory_bytes'] or 0) / 1e6:9.1f} MB peak")
+
+        del reader
+        if os.path.exists(os.path.join(workdir, "bandpass.tmp")):
+            os.remove(os.path.join(workdir, "bandpass.tmp"))
+        if not keep_captures:
+            os.remove(path)
+
+    with open(os.path.join(workdir, f"{label}.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def compare_benchmarks(baseline_path, current_path, tolerance=0.10):
+    """
+    Stages whose throughput dropped by more than `tolerance` between two benchmark files.
+
+    Returns:
+        regressions (list): (size_bytes, stage, baseline MS/s, current MS/s) tuples.
+    """
+    with open(baseline_path) as f:
+        baseline = {(r["size_bytes"], r["stage"]): r for r in json.load(f)["results"]}
+    with open(current_path) as f:
+        current = json.load(f)["results"]
+
+    regressions = []
+    for record in current:
+        before = baseline.get((record["size_bytes"], record["stage"]))
+        if before is None or not before["samples_per_s"] or not record["samples_per_s"]:
+            continue
+        if record["samples_per_s"] < (1 - tolerance) * before["samples_per_s"]:
+            regressions.append((record["size_bytes"], record["stage"],
+                                before["samples_per_s"] / 1e6, record["samples_per_s"] / 1e6))
+    return regressions
+
+
+# Example usage:
+report = run_benchmarks(sizes=(10e6, 100e6))
+for size_bytes, stage, before, after in compare_benchmarks("benchmarks/baseline.json", f"benchmarks/{report['label']}.json"):
+    print(f"Regression: {stage} at {size_bytes / 1e6:.0f} MB: {before:.2f} -> {after:.2f} MS/s")
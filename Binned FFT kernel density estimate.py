@@ -0,0 +1,219 @@
+import numpy as np
+import matplotlib.pyplot as plt
+import scipy.fft
+
+
+def linear_bin_counts(values, grid_min, grid_max, num_bins, rows=None, num_rows=1):
+    """
+    Linear binning: each sample splits its unit weight between the two nearest grid points.
+
+    Parameters:
+        values (np.ndarray): Real samples.
+        grid_min (float): First grid point.
+        grid_max (float): Last grid point.
+        num_bins (int): Number of grid points.
+        rows (np.ndarray): Row (distribution) of each sample, for batched counting.
+        num_rows (int): Number of rows.
+
+    Returns:
+        counts (np.ndarray): Weights per grid point, shape (num_rows, num_bins). Samples
+        outside [grid_min, grid_max] are not counted.
+    """
+    position = (np.asarray(values, dtype=np.float64) - grid_min) * ((num_bins - 1) / (grid_max - grid_min))
+    inside = (position >= 0) & (position <= num_bins - 1)
+    position = position[inside]
+    row_offset = 0 if rows is None else np.asarray(rows)[inside] * num_bins
+
+    left = np.minimum(position.astype(np.int64), num_bins - 2)
+    right_weight = position - left
+    size = num_rows * num_bins
+    counts = (np.bincount(row_offset + left, 1 - right_weight, minlength=size)
+              + np.bincount(row_offset + left + 1, right_weight, minlength=size))
+    return counts.reshape(num_rows, num_bins)
+
+
+def smooth_counts(counts, bandwidth_bins):
+    """
+    Convolve binned counts with Gaussian kernels via FFT (one kernel width per row).
+
+    Parameters:
+        counts (np.ndarray): Binned weights, shape (rows, bins).
+        bandwidth_bins (np.ndarray): Kernel standard deviation of each row, in bins.
+
+    Returns:
+        smoothed (np.ndarray): Convolved counts, shape (rows, bins).
+    """
+    rows, num_bins = counts.shape
+    bandwidth_bins = np.broadcast_to(np.asarray(bandwidth_bins, dtype=np.float64), (rows,))
+    # Enough zero padding that the kernel tails do not wrap around onto the grid
+    nfft = scipy.fft.next_fast_len(num_bins + int(np.ceil(8 * bandwidth_bins.max(initial=0))) + 1, real=True)
+
+    distance = np.minimum(np.arange(nfft), nfft - np.arange(nfft))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kernels = np.exp(-0.5 * (distance[None, :] / bandwidth_bins[:, None]) ** 2)
+    kernels[bandwidth_bins <= 0] = (distance == 0)
+    kernels /= kernels.sum(axis=1, keepdims=True)
+
+    spectrum = scipy.fft.rfft(counts, nfft, axis=1) * scipy.fft.rfft(kernels, axis=1)
+    return scipy.fft.irfft(spectrum, nfft, axis=1)[:, :num_bins]
+
+
+def scott_bandwidth(n, variance):
+    """Scott's rule bandwidth from the population variance (as scipy's gaussian_kde and seaborn's kdeplot)."""
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(n > 1, np.sqrt(variance * n / (n - 1)) * n ** (-1 / 5), 0.0)
+
+
+class BinnedKDE:
+    """
+    Mergeable Gaussian kernel density estimate on a fixed grid.
+
+    Samples are linearly binned onto `num_bins` grid points as they arrive, and
+    the density is the binned counts convolved with a Gaussian via FFT, so the
+    cost is O(N + bins log bins) instead of O(N * grid). Two estimates on the same
+    grid merge by adding counts (the moment accumulator used for the default
+    bandwidth merges too), so per-chunk or per-worker estimates combine exactly.
+    Samples outside the grid are not binned; the density is that of the samples
+    on the grid, normalised by their count.
+
+    Parameters:
+        grid_min (float): First grid point.
+        grid_max (float): Last grid point.
+        num_bins (int): Number of grid points.
+    """
+
+    def __init__(self, grid_min, grid_max, num_bins=512):
+        self.grid = np.linspace(grid_min, grid_max, num_bins)
+        self.counts = np.zeros(num_bins)
+        self.moments = MomentAccumulator()
+
+    def update(self, values):
+        """Add samples (complex samples contribute their magnitude). Returns self."""
+        values = np.asarray(values)
+        values = np.abs(values) if np.iscomplexobj(values) else values
+        self.counts += linear_bin_counts(values.ravel(), self.grid[0], self.grid[-1], len(self.grid))[0]
+        self.moments.update(values)
+        return self
+
+    def merge(self, other):
+        """Fold another estimate on the same grid into this one. Returns self."""
+        if not np.array_equal(self.grid, other.grid):
+            raise ValueError("Only estimates on the same grid can be merged")
+        self.counts += other.counts
+        self.moments.merge(other.moments)
+        return self
+
+    def density(self, bandwidth=None):
+        """
+        Density on the grid.
+
+        Parameters:
+            bandwidth (float): Kernel standard deviation (default: Scott's rule).
+
+        Returns:
+            grid (np.ndarray): Grid points.
+            density (np.ndarray): Estimated probability density at each grid point.
+        """
+        binned = self.counts.sum()
+        if binned == 0:
+            return self.grid, np.zeros_like(self.grid)
+        if bandwidth is None:
+            stats = self.moments.result()
+            bandwidth = scott_bandwidth(stats.n, stats.variance)
+        step = self.grid[1] - self.grid[0]
+        smoothed = smooth_counts(self.counts[None, :], bandwidth / step)[0]
+        return self.grid, smoothed / (binned * step)
+
+
+def binned_kde(values, num_bins=512, cut=3, bandwidth=None):
+    """
+    KDE of one distribution on a grid spanning its range plus `cut` bandwidths, like seaborn's kdeplot.
+
+    Returns:
+        grid (np.ndarray): Grid points.
+        density (np.ndarray): Estimated probability density at each grid point.
+    """
+    grids, densities = binned_kde_batch([values], num_bins=num_bins, cut=cut, bandwidth=bandwidth)
+    return grids[0], densities[0]
+
+
+def binned_kde_batch(distributions, num_bins=512, cut=3, bandwidth=None, shared_grid=False):
+    """
+    KDEs of many distributions (packets or patterns of any length) at once.
+
+    All samples are binned in one np.bincount and all rows are smoothed in one
+    batched FFT convolution.
+
+    Parameters:
+        distributions (list): Arrays; complex ones contribute their magnitude.
+        num_bins (int): Grid points per distribution.
+        cut (float): Grid extends this many bandwidths beyond the data range.
+        bandwidth (float): Kernel standard deviation (default: Scott's rule per distribution).
+        shared_grid (bool): Put every distribution on one common grid.
+
+    Returns:
+        grids (np.ndarray): Grid of each distribution, shape (distributions, num_bins).
+        densities (np.ndarray): Density of each distribution on its grid, same shape.
+    """
+    stats = ragged_moments(distributions)
+    lengths = stats.n
+    values = np.concatenate([np.abs(d).ravel() if np.iscomplexobj(d) else np.ravel(d) for d in distributions]
+                            + [np.zeros(0)]).astype(np.float64)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+
+    bandwidths = scott_bandwidth(lengths, np.nan_to_num(stats.variance))
+    if bandwidth is not None:
+        bandwidths = np.full(len(lengths), float(bandwidth))
+
+    # Per-row range of the data
+    lows = np.full(len(lengths), np.inf)
+    highs = np.full(len(lengths), -np.inf)
+    np.minimum.at(lows, rows, values)
+    np.maximum.at(highs, rows, values)
+    lows = np.where(lengths > 0, lows - cut * bandwidths, 0.0)
+    highs = np.where(lengths > 0, highs + cut * bandwidths, 1.0)
+    highs = np.where(highs > lows, highs, lows + 1.0)
+    if shared_grid and len(lengths):
+        lows[:] = lows.min()
+        highs[:] = highs.max()
+
+    # Bin every sample on its own row's grid: map samples to [0, 1] per row, then onto one unit grid
+    steps = (highs - lows) / (num_bins - 1)
+    unit = (values - lows[rows]) / (highs - lows)[rows]
+    counts = linear_bin_counts(unit, 0.0, 1.0, num_bins, rows=rows, num_rows=len(lengths))
+
+    smoothed = smooth_counts(counts, np.where(steps > 0, bandwidths / steps, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        densities = smoothed / (lengths * steps)[:, None]
+    densities[lengths == 0] = 0
+    grids = lows[:, None] + steps[:, None] * np.arange(num_bins)[None, :]
+    return grids, densities
+
+
+def plot_kde(grid, density, label=None, title=None, ax=None):
+    """Draw a precomputed density like a filled seaborn kdeplot."""
+    ax = ax or plt.gca()
+    ax.plot(grid, density, label=label)
+    ax.fill_between(grid, density, alpha=0.25)
+    if title:
+        ax.set_title(title)
+    ax.set_xlabel("Amplitude")
+    ax.set_ylabel("Density")
+    if label:
+        ax.legend(loc='upper right')
+    return ax
+
+
+# Example usage:
+packet_magnitudes = [np.abs(ocusync2_data[start_idx:end_idx]) for start_idx, end_idx in packets]
+grids, densities = binned_kde_batch(packet_magnitudes)
+
+# Merge per-block estimates of the whole capture on a fixed amplitude grid
+capture_kde = BinnedKDE(0.0, float(max(m.max() for m in packet_magnitudes)), num_bins=1024)
+for start_idx, end_idx in packets:
+    capture_kde.merge(BinnedKDE(*capture_kde.grid[[0, -1]], num_bins=1024).update(ocusync2_data[start_idx:end_idx]))
+
+plt.figure(figsize=(20, 6))
+plot_kde(*capture_kde.density(), label="All packets", title="KDE of all packet amplitudes")
+plt.show()
@@ -0,0 +1,137 @@
+from collections import OrderedDict, namedtuple
+import numpy as np
+
+# fftshifted PSD of one packet plus the statistics the analysis scripts derive from it
+PSDResult = namedtuple("PSDResult", ["f", "Pxx_den", "mean", "threshold"])
+
+# Welch segment length of the per-packet PSD scripts (after correction, after filtering, SNR, headless
+# analysis), so a stage's PSD is computed once whichever script asks for it first
+PSD_NPERSEG = 4096
+
+
+def is_power_of_two(n):
+    return n > 0 and (n & (n - 1)) == 0
+
+
+def filter_stage(name, **params):
+    """
+    Stage key of a filtered packet: the filter's name and every parameter that changes its output.
+
+    Example: filter_stage("lowpass", poles=12, cutoff=8.5e6).
+    """
+    return (name,) + tuple(sorted(params.items()))
+
+
+class PSDService:
+    """
+    Computes each packet's Welch PSD once and serves it to every analysis stage.
+
+    Results are memoized per (capture, packet key, stage, nperseg, nfft, window,
+    fs) in a bounded LRU cache, and the fftshifted spectrum and the mean-PSD
+    threshold are derived from the one cached result (band powers come from
+    SNRCalculator). The capture is part of the key because the service is
+    shared: the same (start_idx, end_idx) in another capture is another packet.
+    FFT sizes that are not a power of two are snapped up to the next one (or
+    refused).
+
+    What is cached is the finished PSD, so it is only reused by a request with
+    the same segment parameters; the PSD scripts therefore all use PSD_NPERSEG.
+    The offset search of estimate_offset (256-sample segments on a 2048-point
+    grid, stage "raw") is a different spectrum with no other consumer. The
+    stage must name everything done to the samples, so filtered stages are
+    keyed with filter_stage and their filter parameters.
+
+    Parameters:
+        max_entries (int): Maximum number of cached PSDs.
+        fft_size_policy (str): 'snap' to round FFT sizes up to a power of two,
+            'refuse' to raise ValueError, or 'allow' to use them as given.
+        threshold_factor (float): Multiplier of the mean PSD used as the band threshold.
+    """
+
+    def __init__(self, max_entries=1024, fft_size_policy="snap", threshold_factor=1.1):
+        if fft_size_policy not in ("snap", "refuse", "allow"):
+            raise ValueError(f"Unknown fft_size_policy '{fft_size_policy}', expected 'snap', 'refuse' or 'allow'")
+        self.max_entries = max_entries
+        self.fft_size_policy = fft_size_policy
+        self.threshold_factor = threshold_factor
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def fft_size(self, n):
+        """FFT size actually used for a requested size under the current policy."""
+        if self.fft_size_policy == "allow" or is_power_of_two(n):
+            return n
+        if self.fft_size_policy == "refuse":
+            raise ValueError(f"FFT size {n} is not a power of two")
+        return 1 << (int(n) - 1).bit_length()
+
+    def psd(self, packet, key, fs, stage="raw", nperseg=PSD_NPERSEG, nfft=None, window="hamming", *, capture_id):
+        """
+        Welch PSD of a packet, from the cache when this packet/stage was seen before.
+
+        Matches `welch(packet * hamming(len(packet)), fs, nperseg=nperseg, nfft=nfft,
+        return_onesided=False)` followed by fftshift, as the PSD scripts compute it.
+
+        Parameters:
+            packet (np.ndarray): Packet samples.
+            key: Hashable packet identity within the capture, e.g. (start_idx, end_idx).
+            fs (float): Sampling rate in Hz.
+            stage: Processing stage of `packet`, e.g. "raw", "corrected" or filter_stage("lowpass", poles=12, cutoff=8.5e6).
+            nperseg (int): Welch segment length.
+            nfft (int): FFT length per segment (default: nperseg).
+            window (str): Full-packet taper applied before Welch: "hamming", or None for no taper.
+            capture_id: Identity of the capture the packet comes from, e.g. capture_identity(ocusync2_data).
+
+        Returns:
+            result (PSDResult): fftshifted frequencies and PSD, mean PSD and threshold.
+        """
+        if window not in ("hamming", None):
+            raise ValueError(f"Unknown window '{window}', expected 'hamming' or None")
+        if capture_id is None:
+            raise ValueError("capture_id is required, packet keys are only unique within one capture")
+        nperseg = self.fft_size(nperseg)
+        nfft = nperseg if nfft is None else self.fft_size(nfft)
+        cache_key = (capture_id, key, stage, nperseg, nfft, window, fs)
+
+        result = self._cache.get(cache_key)
+        if result is not None:
+            self.hits += 1
+            self._cache.move_to_end(cache_key)
+            return result
+
+        self.misses += 1
+        if len(packet) < nperseg:
+            raise ValueError(f"Packet of {len(packet)} samples is shorter than nperseg={nperseg}")
+
+        f, Pxx_den = batched_welch(np.asarray(packet)[None, :], [len(packet)], fs, nperseg=nperseg, nfft=nfft,
+                                   prewindow=window == "hamming")
+        Pxx_den = np.fft.fftshift(Pxx_den[0])
+        mean = float(Pxx_den.mean())
+        result = PSDResult(np.fft.fftshift(f), Pxx_den, mean, self.threshold_factor * mean)
+
+        self._cache[cache_key] = result
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return result
+
+    def cache_info(self):
+        """Hit/miss counters and current cache occupancy."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache), "max_entries": self.max_entries}
+
+    def clear(self):
+        """Drop all cached PSDs and reset the counters."""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Shared service used by the PSD and SNR scripts
+psd_service = PSDService()
+
+# Example usage:
+capture_id = capture_identity(ocusync2_data)
+for idx, (start_idx, end_idx) in enumerate(packets, start=1):
+    psd = psd_service.psd(ocusync2_data[start_idx:end_idx], key=(start_idx, end_idx), fs=50e6, capture_id=capture_id)
+    print(f"Packet {idx}: Mean PSD = {psd.mean:.2e} V^2/Hz, threshold = {psd.threshold:.2e} V^2/Hz")
+print(psd_service.cache_info())
@@ -0,0 +1,238 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+class CoarseToFineDetector:
+    """
+    Energy-based packet detection that only works at full rate around packet edges.
+
+    Pass 1 reduces the capture to one power sum per `block_samples` samples (a
+    single einsum over the I/Q view, no full-rate temporaries). From the block
+    prefix sums every block of energy outputs gets a lower bound (blocks inside
+    all of its windows) and an upper bound (blocks touching any of them); blocks
+    whose bounds lie on one side of the threshold are decided at block level.
+
+    Pass 2 computes the exact energy only in the undecided blocks, where the
+    threshold crossings are. Each output there is a difference of two prefix
+    sums, which needs block sums plus the samples of the two partial blocks
+    at the window edges, so refining a block reads about four blocks of samples
+    whatever the window length. The noise level (mean of the energy profile)
+    is obtained exactly from the block sums and the edge samples.
+
+    Packets match `detect_packets_energy` up to float rounding at the threshold.
+    On sparse captures the full-rate work shrinks to a few blocks per packet edge.
+
+    Parameters:
+        sampling_rate (float): Sampling rate in Hz.
+        window_ms (float): Energy window size in milliseconds.
+        threshold_factor (float): Multiplier for the energy threshold.
+        off_threshold_factor (float): Multiplier for the threshold that ends a packet (default: same).
+        min_packet_samples (int): Packets shorter than this are dropped.
+        min_gap_samples (int): Packets separated by fewer samples than this are merged.
+        block_samples (int): Samples per coarse block.
+        chunk_samples (int): Samples read per step of the coarse pass (rounded to whole blocks).
+        margin (float): Relative widening of the bounds, covering float32 rounding of the block sums.
+        max_refined_fraction (float): Above this fraction of undecided blocks the whole
+            profile is computed at full rate instead.
+    """
+
+    def __init__(self, sampling_rate, window_ms, threshold_factor, off_threshold_factor=None, min_packet_samples=1,
+                 min_gap_samples=0, block_samples=256, chunk_samples=1 << 22, margin=1e-5,
+                 max_refined_fraction=0.1):
+        self.sampling_rate = sampling_rate
+        self.window_samples = int((window_ms / 1000) * sampling_rate)
+        self.threshold_factor = threshold_factor
+        self.off_threshold_factor = off_threshold_factor
+        self.min_packet_samples = min_packet_samples
+        self.min_gap_samples = min_gap_samples
+        self.block_samples = block_samples
+        self.chunk_samples = max(block_samples, chunk_samples // block_samples * block_samples)
+        self.margin = margin
+        self.max_refined_fraction = max_refined_fraction
+        self.threshold = None
+        self.refined_fraction = None
+
+    def block_power(self, data):
+        """Sum of |x|^2 over each block (the last block zero-padded), in float64."""
+        B = self.block_samples
+        n = len(data)
+        sums = np.zeros(-(-n // B))
+        for start in range(0, n, self.chunk_samples):
+            chunk = np.asarray(data[start:min(start + self.chunk_samples, n)])
+            full = len(chunk) // B * B
+            iq = np.ascontiguousarray(chunk[:full]).view(chunk.real.dtype).reshape(-1, 2 * B)
+            sums[start // B:(start + full) // B] = np.einsum('ij,ij->i', iq, iq)
+            if full < len(chunk):
+                sums[-1] = np.sum(np.abs(chunk[full:]) ** 2, dtype=np.float64)
+        return sums
+
+    def noise_level(self, data, prefix):
+        """
+        Exact mean of the 'same'-mode energy profile.
+
+        Sample j is counted by W windows, except within a window of either end
+        where the zero padding takes some of them, so the mean is W * total
+        power minus a correction over the first and last W samples.
+        """
+        n, W = len(data), self.window_samples
+        h = W // 2
+        total = W * prefix[-1]
+        for lo, hi in ((0, min(n, W)), (max(min(n, W), n - W), n)):
+            j = np.arange(lo, hi)
+            coverage = np.minimum(n - 1, j + h) - np.maximum(0, j + h - W + 1) + 1
+            total -= np.sum(np.abs(np.asarray(data[lo:hi])) ** 2 * (W - coverage))
+        return total / n
+
+    def _bounds(self, prefix, n):
+        B, W = self.block_samples, self.window_samples
+        nb = len(prefix) - 1
+        out_start = np.arange(nb) * B
+        out_last = np.minimum(out_start + B, n) - 1
+        first_window = out_start - W // 2
+        last_window = out_last - W // 2
+
+        # Blocks inside every window of the output block, and blocks touching any of them
+        inner = np.clip(-(-last_window // B), 0, nb), np.clip((first_window + W) // B, 0, nb)
+        outer = np.clip(first_window // B, 0, nb), np.clip(-(-(last_window + W) // B), 0, nb)
+        lower = np.maximum(prefix[inner[1]] - prefix[inner[0]], 0.0)
+        upper = prefix[outer[1]] - prefix[outer[0]]
+        return lower * (1 - self.margin), upper * (1 + self.margin)
+
+    def _refine(self, data, prefix, blocks, n):
+        """Exact energy of every output in the given blocks, shape (len(blocks), block_samples)."""
+        B, W = self.block_samples, self.window_samples
+        outputs = blocks[:, None] * B + np.arange(B)[None, :]
+        window_starts = np.clip(outputs - W // 2, 0, n)
+        window_ends = np.clip(outputs - W // 2 + W, 0, n)
+
+        # Samples of every block holding a window edge, as per-block running sums
+        edge_blocks = np.unique(np.concatenate([window_starts.ravel(), window_ends.ravel()]) // B)
+        edge_blocks = edge_blocks[edge_blocks < len(prefix) - 1]
+        local = np.zeros((len(edge_blocks), B + 1))
+        run_starts, run_ends = find_runs(np.isin(np.arange(len(prefix) - 1), edge_blocks))
+        row = 0
+        for first, last in zip(run_starts, run_ends):
+            samples = np.zeros((last - first) * B, dtype=np.complex128)
+            chunk = np.asarray(data[first * B:min(last * B, n)])
+            samples[:len(chunk)] = chunk
+            np.cumsum((np.abs(samples) ** 2).reshape(-1, B), axis=1, out=local[row:row + last - first, 1:])
+            row += last - first
+
+        def cumulative(position):
+            block = position // B
+            offset = position % B
+            rows = np.searchsorted(edge_blocks, np.minimum(block, edge_blocks[-1] if len(edge_blocks) else 0))
+            partial = np.where(offset > 0, local[rows, offset], 0.0)
+            return prefix[block] + partial
+
+        energy = cumulative(window_ends) - cumulative(window_starts)
+        energy[outputs >= n] = -np.inf
+        return energy
+
+    def _runs(self, threshold, lower, upper, refined_blocks, refined_energy, n):
+        B = self.block_samples
+        above = lower > threshold
+        above[refined_blocks] = False
+        block_starts, block_ends = find_runs(above)
+
+        # Runs inside the refined blocks; a False column keeps them from joining across blocks
+        mask = np.zeros((len(refined_blocks), B + 1), dtype=bool)
+        mask[:, :B] = refined_energy > threshold
+        starts, ends = find_runs(mask.ravel())
+        rows = starts // (B + 1)
+        offsets = refined_blocks[rows] * B - rows * (B + 1)
+
+        starts = np.concatenate([block_starts * B, starts + offsets])
+        ends = np.concatenate([np.minimum(block_ends * B, n), ends + offsets])
+        order = np.argsort(starts, kind='stable')
+
+        # Runs ending exactly where the next starts are one run
+        return clean_runs(starts[order], ends[order], min_gap=1)
+
+    def detect(self, data):
+        """
+        Detect packets in a capture (array, memmap or CaptureReader).
+
+        Returns:
+            packets (list): List of (start_index, end_index) for detected packets.
+            envelope (np.ndarray): Decimated energy profile, one value per block
+                (window rounded to whole blocks), for plotting.
+            threshold (float): Energy threshold used for detection.
+        """
+        n, B, W = len(data), self.block_samples, self.window_samples
+        block_power = self.block_power(data)
+        prefix = np.concatenate([[0.0], np.cumsum(block_power)])
+
+        noise_level = self.noise_level(data, prefix)
+        self.threshold = self.threshold_factor * noise_level
+        off_threshold = self.threshold if self.off_threshold_factor is None else self.off_threshold_factor * noise_level
+
+        # Step 1: Decide blocks from the bounds; blocks straddling either threshold are refined
+        lower, upper = self._bounds(prefix, n)
+        undecided = np.zeros(len(block_power), dtype=bool)
+        for threshold in {self.threshold, off_threshold}:
+            undecided |= (upper > threshold) & (lower <= threshold)
+        refined_blocks = np.flatnonzero(undecided)
+        self.refined_fraction = len(refined_blocks) / max(1, len(block_power))
+
+        # Block-resolution envelope for plotting
+        nb = len(block_power)
+        window_blocks = max(1, int(round(W / B)))
+        first = np.clip(np.arange(nb) - window_blocks // 2, 0, nb)
+        envelope = prefix[np.clip(first + window_blocks, 0, nb)] - prefix[first]
+
+        # Dense captures: refining most blocks costs more than the full-rate profile
+        if self.refined_fraction > self.max_refined_fraction:
+            energy_profile = sliding_energy(np.abs(np.asarray(data[:])) ** 2, W)
+            starts, ends = detect_runs(energy_profile, self.threshold, off_threshold=off_threshold,
+                                       min_run=self.min_packet_samples, min_gap=self.min_gap_samples)
+            return list(zip(starts.tolist(), ends.tolist())), envelope, self.threshold
+
+        # Step 2: Runs above the closing threshold, opened at the first sample above the opening one
+        refined_energy = self._refine(data, prefix, refined_blocks, n)
+        starts, ends = self._runs(off_threshold, lower, upper, refined_blocks, refined_energy, n)
+        if off_threshold != self.threshold and len(starts):
+            on_starts, on_ends = self._runs(self.threshold, lower, upper, refined_blocks, refined_energy, n)
+            first = np.searchsorted(on_ends, starts, side='right')
+            triggers = np.maximum(starts, np.append(on_starts, n)[first])
+            keep = triggers < ends
+            starts, ends = triggers[keep], ends[keep]
+
+        starts, ends = clean_runs(starts, ends, min_run=self.min_packet_samples, min_gap=self.min_gap_samples)
+        return list(zip(starts.tolist(), ends.tolist())), envelope, self.threshold
+
+
+def detect_packets_coarse_to_fine(data, sampling_rate, window_ms, threshold_factor, off_threshold_factor=None,
+                                  min_packet_samples=1, min_gap_samples=0, block_samples=256):
+    """
+    Drop-in alternative to detect_packets_energy using CoarseToFineDetector.
+
+    Returns:
+        packets (list): List of (start_index, end_index) for detected packets.
+        envelope (np.ndarray): Energy profile decimated to one value per block.
+        threshold (float): Energy threshold used for detection.
+    """
+    detector = CoarseToFineDetector(sampling_rate, window_ms, threshold_factor, off_threshold_factor,
+                                    min_packet_samples, min_gap_samples, block_samples)
+    return detector.detect(data)
+
+
+# Example usage:
+sampling_rate = 50e6
+block_samples = 256
+detector = CoarseToFineDetector(sampling_rate, window_ms=0.508, threshold_factor=0.6, block_samples=block_samples)
+packets, envelope, threshold = detector.detect(filtered_data)
+print(f"Number of detected packets: {len(packets)} "
+      f"({detector.refined_fraction * 100:.2f} % of blocks refined at full rate)")
+
+envelope_time = (np.arange(len(envelope)) + 0.5) * block_samples / sampling_rate
+plt.figure(figsize=(20, 6))
+plt.plot(envelope_time, envelope, label="Energy envelope")
+plt.axhline(threshold, color='r', linestyle='--', label="Threshold")
+for start_idx, end_idx in packets:
+    plt.axvspan(start_idx / sampling_rate, end_idx / sampling_rate, color='green', alpha=0.2)
+plt.xlabel("Time (s)")
+plt.ylabel("Energy")
+plt.title("Coarse-to-fine packet detection")
+plt.legend()
+plt.show()
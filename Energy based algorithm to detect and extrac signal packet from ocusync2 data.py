@@ -1,8 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.signal import butter, filtfilt
 
-def bandpass_filter(data, sampling_rate, low_cutoff, high_cutoff, order=4):
+def bandpass_filter(data, sampling_rate, low_cutoff, high_cutoff, order=4, method='iir', numtaps=257, out=None):
     """
     Apply a bandpass filter to isolate the desired frequency range.
 
@@ -11,18 +10,40 @@ def bandpass_filter(data, sampling_rate, low_cutoff, high_cutoff, order=4):
         sampling_rate (float): Sampling rate in Hz.
         low_cutoff (float): Low cutoff frequency in Hz.
         high_cutoff (float): High cutoff frequency in Hz.
-        order (int): Filter order.
+        order (int): Filter order (method='iir').
+        method (str): 'iir' for a zero-phase Butterworth filter, or 'fir' for a
+            linear-phase FIR applied block by block with overlap-save FFT convolution.
+        numtaps (int): Number of FIR taps (method='fir').
+        out (np.ndarray): Optional output array, e.g. a writable memmap (method='fir').
 
     Returns:
         filtered_data (np.ndarray): Bandpass-filtered signal.
     """
-    nyquist = sampling_rate / 2.0
-    low = low_cutoff / nyquist
-    high = high_cutoff / nyquist
-    b, a = butter(order, [low, high], btype='band')
-    return filtfilt(b, a, data)
+    if method == 'fir':
+        taps = design_fir('bandpass', (low_cutoff, high_cutoff), sampling_rate, numtaps=numtaps)
+        return OverlapSaveFilter(taps, zero_phase='linear').filter(data, out=out)
+    if method != 'iir':
+        raise ValueError(f"Unknown method '{method}', expected 'iir' or 'fir'")
 
-def detect_packets_energy(data, sampling_rate, window_ms, threshold_factor):
+    # Second-order sections from the shared filter bank: designed once, numerically stable at the band edges
+    return filter_bank.filtfilt('bandpass', order, (low_cutoff, high_cutoff), sampling_rate, data)
+
+def sliding_energy(power, window_samples):
+    """
+    Sum of `power` over a centred sliding window ('same' alignment, zero-padded edges).
+
+    Parameters:
+        power (np.ndarray): Instantaneous power |x|^2.
+        window_samples (int): Window length in samples.
+
+    Returns:
+        energy (np.ndarray): Windowed energy, same length as `power`.
+    """
+    # Running-sum engine: O(N) regardless of the window length
+    return EnergyProfileEngine(window_samples, mode='same').compute(power)
+
+def detect_packets_energy(data, sampling_rate, window_ms, threshold_factor,
+                          off_threshold_factor=None, min_packet_samples=1, min_gap_samples=0):
     """
     Detect signal packets based on energy accumulation.
 
@@ -31,6 +52,10 @@ def detect_packets_energy(data, sampling_rate, window_ms, threshold_factor):
         sampling_rate (float): Sampling rate in Hz.
         window_ms (float): Window size in milliseconds.
         threshold_factor (float): Multiplier for the energy threshold.
+        off_threshold_factor (float): Multiplier for the threshold that ends a packet
+            (hysteresis, default: same as threshold_factor).
+        min_packet_samples (int): Packets shorter than this are dropped.
+        min_gap_samples (int): Packets separated by fewer samples than this are merged.
 
     Returns:
         packets (list): List of (start_index, end_index) for detected packets.
@@ -40,29 +65,18 @@ def detect_packets_energy(data, sampling_rate, window_ms, threshold_factor):
     # Convert window size to samples
     window_samples = int((window_ms / 1000) * sampling_rate)
 
-    # Calculate energy profile using a sliding window
-    energy_profile = np.convolve(np.abs(data)**2, np.ones(window_samples), mode='same')
+    # Calculate energy profile using a sliding window (running sums, not a direct boxcar convolution)
+    energy_profile = sliding_energy(np.abs(data)**2, window_samples)
 
     # Set threshold for detection
     noise_level = np.mean(energy_profile)  # Baseline noise level
     threshold = threshold_factor * noise_level
-a
-    # Detect packets based on threshold
-    detected = energy_profile > threshold
-    packets = []
-    start = None
-
-    for i, is_high in enumerate(detected):
-        if is_high and start is None:
-            start = i  # Start of a packet
-        elif not is_high and start is not None:
-            end = i  # End of the packet
-            packets.append((start, end))
-            start = None
-
-    # Handle the last packet if it continues to the end
-    if start is not None:
-        packets.append((start, len(detected)))
+
+    # Detect packets based on threshold (a packet still open at the end runs to the last sample)
+    off_threshold = None if off_threshold_factor is None else off_threshold_factor * noise_level
+    starts, ends = detect_runs(energy_profile, threshold, off_threshold=off_threshold,
+                               min_run=min_packet_samples, min_gap=min_gap_samples)
+    packets = list(zip(starts.tolist(), ends.tolist()))
 
     return packets, energy_profile, threshold
 
@@ -1,3 +1,12 @@
+import numpy as np
+import scipy.fft
+
+# OFDM numerology of a packet type: subcarrier spacing (Hz), occupied subcarriers, cyclic prefix / useful symbol
+OFDM_NUMEROLOGY = {
+    "droneid": {"subcarrier_spacing": 15e3, "subcarriers": 601, "cp_fraction": 72 / 1024},
+}
+
+
 class DroneSignalProcessor:
     def __init__(self, debug=True):
         self.debug = debug
@@ -7,13 +16,37 @@ class DroneSignalProcessor:
         """Group consecutive elements based on a step size."""
         return np.split(data, np.where(np.diff(data) != stepsize)[0] + 1)
 
-    def estimate_offset(self, y, Fs, packet_type="droneid"):
-        """Estimate the frequency offset in the signal."""
+    def estimate_offset(self, y, Fs, packet_type="droneid", mode="welch", psd_key=None, noise_floor=None,
+                        capture_id=None, update_noise_floor=True):
+        """
+        Estimate the frequency offset in the signal.
+
+        mode="fast" uses estimate_offset_fast. With a `psd_key` (e.g. (start_idx, end_idx))
+        and the `capture_id` of the capture the packet comes from (capture_identity) the
+        PSD comes from, and is shared through, the cached psd_service. With a
+        `noise_floor` (NoiseFloorTracker) the band threshold is its running PSD noise
+        floor instead of 1.1 * the mean of this packet's PSD (use one tracker per mode,
+        the two PSDs are scaled differently). The packet's PSD is first added to the
+        tracker, so the tracker is shared state: estimate each packet once, or pass
+        update_noise_floor=False to reuse the floor without counting the packet again.
+        """
+        if mode == "fast":
+            return self.estimate_offset_fast(y, Fs, packet_type=packet_type, noise_floor=noise_floor,
+                                             update_noise_floor=update_noise_floor)
+        if mode != "welch":
+            raise ValueError(f"Unknown mode '{mode}', expected 'welch' or 'fast'")
+
         nfft_welch = 2048  # FFT size for PSD calculation
 
         if len(y) < nfft_welch:
             return None, False
 
+        if psd_key is not None:
+            psd = psd_service.psd(y, key=psd_key, fs=Fs, stage="raw", nperseg=256, nfft=nfft_welch,
+                                  capture_id=capture_id)
+            return self.find_offset_band(psd.Pxx_den, Fs, nfft_welch, noise_floor=noise_floor,
+                                         update_noise_floor=update_noise_floor)
+
         # Apply Hamming window to the signal
         window = hamming(len(y))
         y = y * window
@@ -23,11 +56,32 @@ class DroneSignalProcessor:
         Pxx_den = np.fft.fftshift(Pxx_den)
         f = np.fft.fftshift(f)
 
+        return self.find_offset_band(Pxx_den, Fs, nfft_welch, noise_floor=noise_floor,
+                                     update_noise_floor=update_noise_floor)
+
+    def find_offset_band(self, Pxx_den, Fs, nfft_welch, noise_floor=None, update_noise_floor=True):
+        """
+        Find the occupied band in an fftshifted PSD and return (offset, band_found).
+
+        With a `noise_floor` tracker the PSD is added to it (unless update_noise_floor=False)
+        before its threshold is read, as in estimate_offset.
+        """
+        Pxx_den = Pxx_den.copy()
+
         # Add a fake DC carrier to distinguish signal components
-        Pxx_den[nfft_welch // 2 - 10:nfft_welch // 2 + 10] = 1.1 * Pxx_den.mean()
+        if noise_floor is None:
+            Pxx_den[nfft_welch // 2 - 10:nfft_welch // 2 + 10] = 1.1 * Pxx_den.mean()
+            threshold = 1.1 * Pxx_den.mean()
+        else:
+            # Robust threshold: running noise floor of the PSD bins of all packets so far
+            if update_noise_floor:
+                noise_floor.update(Pxx_den)
+            threshold = noise_floor.threshold()
+            # Carrier just above the threshold, so bands crossing DC stay in one piece as in the default path
+            Pxx_den[nfft_welch // 2 - 10:nfft_welch // 2 + 10] = np.nextafter(threshold, np.inf)
 
         # Identify candidate frequency bands
-        candidate_bands = self.consecutive(np.where(Pxx_den > 1.1 * Pxx_den.mean())[0])
+        candidate_bands = self.consecutive(np.where(Pxx_den > threshold)[0])
 
         band_found = False
         offset = 0.0
@@ -52,6 +106,124 @@ class DroneSignalProcessor:
             print(f"Offset found: {offset / 1000:.2f} kHz")
         return offset, band_found
 
+    def estimate_offset_fast(self, y, Fs, packet_type="droneid", nfft=2048, n_frames=16, refine=True, merge_bins=8,
+                             noise_floor=None, update_noise_floor=True):
+        """
+        Estimate the frequency offset from a fixed number of windowed FFT frames.
+
+        Instead of windowing the whole packet and running Welch over it, average
+        the power spectra of `n_frames` frames of `nfft` samples spread evenly
+        over the packet, using a cached window. The occupied band is found with
+        vectorized edge detection (runs closer than `merge_bins` bins are merged,
+        since full-length frames resolve individual subcarriers); its centre is
+        the coarse offset, good to about one bin (Fs / nfft). A `noise_floor`
+        tracker is updated with the averaged spectrum unless update_noise_floor=False,
+        as in estimate_offset.
+
+        With refine=True and a packet_type in OFDM_NUMEROLOGY the offset is refined
+        below one subcarrier (see refine_offset_ofdm).
+
+        Returns (offset, band_found), like estimate_offset.
+        """
+        if len(y) < nfft:
+            return None, False
+
+        # Step 1: Average the spectra of evenly spaced frames
+        starts = np.unique(np.linspace(0, len(y) - nfft, n_frames).astype(int))
+        frames = y[starts[:, None] + np.arange(nfft)]
+        frames = (frames - frames.mean(axis=1, keepdims=True)) * hamming_window(nfft)
+        Pxx_den = np.fft.fftshift(np.mean(np.abs(np.fft.fft(frames, axis=1)) ** 2, axis=0))
+
+        # Step 2: Fake DC carrier and threshold, as in estimate_offset
+        if noise_floor is None:
+            Pxx_den[nfft // 2 - 10:nfft // 2 + 10] = 1.1 * Pxx_den.mean()
+            threshold = 1.1 * Pxx_den.mean()
+        else:
+            if update_noise_floor:
+                noise_floor.update(Pxx_den)
+            threshold = noise_floor.threshold()
+            Pxx_den[nfft // 2 - 10:nfft // 2 + 10] = np.nextafter(threshold, np.inf)
+        band_starts, band_ends = detect_runs(Pxx_den, threshold, min_gap=merge_bins)
+        if len(band_starts) == 0:
+            return 0.0, False
+
+        # Step 3: Coarse offset: centre of the first band in range
+        centers = ((band_starts + band_ends - 1) / 2 - nfft / 2) * Fs / nfft
+        valid = np.flatnonzero((centers >= -24e6) & (centers <= 0))
+
+        if self.debug:
+            for low, high in zip(band_starts, band_ends - 1):
+                print(f"Candidate band fstart: {(high - nfft / 2) * Fs / nfft:.2f}, "
+                      f"fend: {(low - nfft / 2) * Fs / nfft:.2f}, bw: {(high - low) * Fs / nfft / 1e6:.2f} MHz")
+
+        if len(valid) == 0:
+            return 0.0, False
+        offset = float(centers[valid[0]])
+
+        # Step 4: Sub-subcarrier refinement from the known OFDM numerology
+        if refine and packet_type in OFDM_NUMEROLOGY:
+            offset = self.refine_offset_ofdm(y, Fs, offset, search_hz=2 * Fs / nfft, **OFDM_NUMEROLOGY[packet_type])
+        if self.debug:
+            print(f"Offset found: {offset / 1000:.2f} kHz")
+        return offset, True
+
+    @staticmethod
+    def refine_offset_ofdm(y, Fs, coarse, subcarrier_spacing, subcarriers, cp_fraction, search_hz):
+        """
+        Refine a coarse offset of an OFDM packet to a small fraction of a subcarrier.
+
+        The band position is first fitted to a fraction of a subcarrier: the occupied
+        bandwidth (subcarriers x spacing) is slid over the packet's periodogram, one
+        bin of about Fs / len(y) at a time within `search_hz` of the coarse offset, and
+        the window holding the most power is taken. The cyclic prefix then gives the
+        offset modulo one subcarrier spacing: each prefix repeats the end of its symbol
+        one useful symbol (Fs / spacing samples) earlier, so y[n]* y[n + L] turns by
+        2 pi offset L / Fs there. The lag products are summed over prefix-length windows,
+        weighted by their magnitude so the windows on a prefix dominate without symbol
+        timing. The band fit picks the multiple of Fs / L, so the result stays exact as
+        long as the fit is within half a spacing.
+
+        Parameters:
+            y (np.ndarray): Packet samples.
+            Fs (float): Sampling rate in Hz.
+            coarse (float): Coarse offset (centre of the occupied band) in Hz.
+            subcarrier_spacing (float): OFDM subcarrier spacing in Hz.
+            subcarriers (int): Occupied subcarriers (including a nulled DC subcarrier).
+            cp_fraction (float): Cyclic prefix length over the useful symbol length.
+            search_hz (float): Largest distance of the band fit from `coarse`.
+
+        Returns:
+            offset (float): Refined offset in Hz.
+        """
+        y = np.asarray(y)
+        n = len(y)
+
+        # Step 1: Band fit on the periodogram (boxcar sums of the occupied bandwidth via a cumulative sum)
+        nfft = scipy.fft.next_fast_len(n)
+        df = Fs / nfft
+        width = max(1, int(round(subcarriers * subcarrier_spacing / df)))
+        centers = (np.arange(nfft - width + 1) - nfft // 2 + (width - 1) / 2) * df
+        candidates = np.flatnonzero(np.abs(centers - coarse) <= search_hz)
+        if len(candidates) == 0:
+            return coarse
+        power = np.fft.fftshift(np.abs(scipy.fft.fft(y, nfft)) ** 2)[candidates[0]:candidates[-1] + width]
+        cumulative = np.concatenate([[0.0], np.cumsum(power, dtype=np.float64)])
+        sums = cumulative[width:] - cumulative[:-width]
+        band_center = float(centers[candidates[np.argmax(sums)]])
+
+        # Step 2: Cyclic-prefix phase over one useful symbol, weighted towards the prefixes
+        lag = int(round(Fs / subcarrier_spacing))
+        cp_samples = max(1, int(round(cp_fraction * lag)))
+        if n < lag + cp_samples:
+            return band_center
+        products = np.cumsum(np.concatenate([[0.0], np.conj(y[:-lag]) * y[lag:]]), dtype=np.complex128)
+        windows = products[cp_samples:] - products[:-cp_samples]
+        fine = np.angle(np.sum(windows * np.abs(windows))) * Fs / (2 * np.pi * lag)
+
+        # Step 3: The multiple of Fs / lag closest to the band fit
+        period = Fs / lag
+        return band_center + (fine - band_center + period / 2) % period - period / 2
+
 
 # Assuming you have the packets already detected, loop through each packet and estimate its offset
 for idx, (start_idx, end_idx) in enumerate(packets, start=1):
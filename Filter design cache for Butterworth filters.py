@@ -0,0 +1,168 @@
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+import scipy.signal
+
+# A cached Butterworth design: second-order sections, steady-state initial conditions and edge padding
+FilterDesign = namedtuple("FilterDesign", ["sos", "zi", "padlen"])
+
+
+class FilterBank:
+    """
+    Memoizes Butterworth SOS designs and their `sosfiltfilt` initial conditions.
+
+    Designs are keyed by (type, order, cutoffs, fs) and evicted least recently
+    used first once more than `max_designs` are cached, so per-packet filtering
+    pays the design cost once per parameter set instead of once per packet.
+    The cache and counters are guarded by a lock, so one bank can serve
+    several threads; filtering itself only reads the returned design.
+
+    Parameters:
+        max_designs (int): Maximum number of designs kept in the cache.
+    """
+
+    def __init__(self, max_designs=64):
+        self.max_designs = max_designs
+        self._designs = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def design(self, btype, order, cutoff, fs):
+        """
+        Return the cached design for these parameters, designing it on a miss.
+
+        Parameters:
+            btype (str): 'lowpass', 'highpass', 'bandpass' or 'bandstop'.
+            order (int): Filter order.
+            cutoff (float or tuple): Cutoff frequency, or (low, high) band edges, in Hz.
+            fs (float): Sampling rate in Hz.
+
+        Returns:
+            design (FilterDesign): SOS coefficients, initial conditions and pad length.
+        """
+        key = (btype, int(order), tuple(float(c) for c in np.atleast_1d(cutoff)), float(fs))
+        with self._lock:
+            design = self._designs.get(key)
+            if design is not None:
+                self.hits += 1
+                self._designs.move_to_end(key)
+                return design
+
+            self.misses += 1
+            sos = scipy.signal.butter(order, cutoff, btype, fs=fs, output='sos')
+            zi = scipy.signal.sosfilt_zi(sos)
+
+            # Same default edge padding as scipy.signal.sosfiltfilt
+            ntaps = 2 * len(sos) + 1
+            ntaps -= min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())
+            design = FilterDesign(sos, zi, 3 * ntaps)
+
+            self._designs[key] = design
+            while len(self._designs) > self.max_designs:
+                self._designs.popitem(last=False)
+            return design
+
+    def sosfiltfilt(self, design, data):
+        """
+        Zero-phase filtering along the last axis with a cached design.
+
+        Equivalent to `scipy.signal.sosfiltfilt(design.sos, data)` but reuses the
+        precomputed initial conditions.
+
+        Parameters:
+            design (FilterDesign): Design returned by `design`.
+            data (np.ndarray): Signal, or a 2-D array of signals (one per row).
+
+        Returns:
+            filtered_data (np.ndarray): Filtered signal(s).
+        """
+        data = np.asarray(data)
+        edge = design.padlen
+        if data.shape[-1] <= edge:
+            raise ValueError(f"The length of the input must be greater than padlen, which is {edge}.")
+
+        # Odd extension at both ends
+        first, last = data[..., :1], data[..., -1:]
+        ext = np.concatenate([2 * first - data[..., edge:0:-1],
+                              data,
+                              2 * last - data[..., -2:-edge - 2:-1]], axis=-1)
+
+        zi = design.zi.reshape((len(design.sos),) + (1,) * (data.ndim - 1) + (2,))
+        y, _ = scipy.signal.sosfilt(design.sos, ext, zi=zi * ext[..., :1])
+        y, _ = scipy.signal.sosfilt(design.sos, y[..., ::-1], zi=zi * y[..., -1:])
+        return y[..., ::-1][..., edge:-edge]
+
+    def sosfiltfilt_ragged(self, design, rows, lengths):
+        """
+        Zero-phase filtering of zero-padded rows that hold signals of different lengths.
+
+        Row r holds a signal of lengths[r] samples followed by padding. Each row is
+        extended, filtered and reversed at its own length, so every row matches
+        `scipy.signal.sosfiltfilt(design.sos, rows[r, :lengths[r]])` while all rows
+        are filtered together.
+
+        Parameters:
+            design (FilterDesign): Design returned by `design`.
+            rows (np.ndarray): 2-D array of zero-padded signals.
+            lengths (np.ndarray): Valid length of each row.
+
+        Returns:
+            filtered_rows (np.ndarray): Filtered rows, zero beyond each row's length.
+        """
+        rows = np.asarray(rows)
+        lengths = np.asarray(lengths)[:, None]
+        edge = design.padlen
+        if np.any(lengths <= edge):
+            raise ValueError(f"The length of the input must be greater than padlen, which is {edge}.")
+
+        # Odd extension of each row at its own ends: position p of the extended row maps to sample p - edge
+        ext_len = lengths + 2 * edge
+        position = np.arange(rows.shape[1] + 2 * edge)[None, :]
+        source = position - edge
+        left = source < 0
+        right = source >= lengths
+        source = np.where(left, -source, np.where(right, 2 * (lengths - 1) - source, source))
+        values = np.take_along_axis(rows, np.clip(source, 0, rows.shape[1] - 1), axis=1)
+        first = rows[:, :1]
+        last = np.take_along_axis(rows, lengths - 1, axis=1)
+        ext = np.where(left, 2 * first - values, np.where(right, 2 * last - values, values))
+        ext[position >= ext_len] = 0
+
+        zi = design.zi[:, None, :]
+        y, _ = scipy.signal.sosfilt(design.sos, ext, zi=zi * ext[:, :1])
+
+        # Reverse each row about its own end, filter backwards, then reverse back and crop the padding
+        reverse = np.clip(ext_len - 1 - position, 0, ext.shape[1] - 1)
+        y = np.take_along_axis(y, reverse, axis=1)
+        y[position >= ext_len] = 0
+        y, _ = scipy.signal.sosfilt(design.sos, y, zi=zi * y[:, :1])
+
+        output_position = np.arange(rows.shape[1])[None, :]
+        filtered = np.take_along_axis(y, np.clip(lengths + edge - 1 - output_position, 0, y.shape[1] - 1), axis=1)
+        filtered[output_position >= lengths] = 0
+        return filtered
+
+    def filtfilt(self, btype, order, cutoff, fs, data):
+        """Design (or fetch) a Butterworth filter and apply it with zero phase."""
+        return self.sosfiltfilt(self.design(btype, order, cutoff, fs), data)
+
+    def cache_info(self):
+        """Hit/miss counters and current cache occupancy."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._designs), "max_designs": self.max_designs}
+
+    def clear(self):
+        """Drop all cached designs and reset the counters."""
+        with self._lock:
+            self._designs.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared bank used by lowpass and bandpass_filter
+filter_bank = FilterBank()
+
+# Example usage:
+for idx, (start_idx, end_idx) in enumerate(packets, start=1):
+    filtered_packet = filter_bank.filtfilt('lowpass', 12, 8.5e6, 50e6, ocusync2_data[start_idx:end_idx])
+print(filter_bank.cache_info())
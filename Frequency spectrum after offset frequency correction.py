@@ -1,7 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
-def plot_corrected_packet_spectra(corrected_packet, packets, fs=50e6, N_fft=2048):
+def plot_corrected_packet_spectra(corrected_packet, packets, fs=50e6, N_fft=2048, plot=True):
     """
     This function computes and plots the frequency spectrum of frequency-corrected signal packets.
     
@@ -10,14 +10,23 @@ def plot_corrected_packet_spectra(corrected_packet, packets, fs=50e6, N_fft=2048
     - packets: A list of tuples (start_idx, end_idx) indicating detected packet indices
     - fs: Sampling frequency (default is 50 MHz)
     - N_fft: Number of FFT points (default is 2048)
+    - plot: Plot each spectrum; False runs headless
+
+    Returns:
+    - freqs: Shifted frequency axis (Hz)
+    - spectra: Magnitude spectrum of each packet, one row per packet
     """
+    freqs = np.fft.fftshift(np.fft.fftfreq(N_fft, 1 / fs))
+    spectra = np.zeros((len(packets), N_fft))
     for idx, (start_idx, end_idx) in enumerate(packets, start=1):
         # Extract corresponding signal samples for the packet
         current_packet = corrected_packet[start_idx:end_idx]
 
         # Compute FFT and shift zero frequency component to the center
         data_fft = np.fft.fftshift(np.fft.fft(current_packet, N_fft))
-        freqs = np.fft.fftshift(np.fft.fftfreq(N_fft, 1 / fs))
+        spectra[idx - 1] = np.abs(data_fft)
+        if not plot:
+            continue
 
         # Plot the frequency spectrum of the corrected packet
         plt.figure(figsize=(20, 6))
@@ -28,5 +37,7 @@ def plot_corrected_packet_spectra(corrected_packet, packets, fs=50e6, N_fft=2048
         plt.grid(True)
         plt.show()
 
+    return freqs, spectra
+
 # Example usage:
 plot_corrected_packet_spectra(corrected_packet, packets)
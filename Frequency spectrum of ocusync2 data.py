@@ -1,14 +1,124 @@
 import numpy as np
 import matplotlib.pyplot as plt
+import scipy.fft
+from scipy.signal import get_window
 
-def plot_frequency_spectrum(ocusync2_data, sampling_rate):
+class AveragedSpectrum:
+    """
+    Streaming spectrum of a capture from averaged fixed-size block FFTs.
+
+    Samples are cut into consecutive nfft-sample frames (leftovers are carried to
+    the next update), windowed and transformed a batch at a time. The running
+    mean (mean-hold) and maximum (peak-hold) of the frame power spectra are kept,
+    so memory is a few nfft-sized arrays no matter how long the capture is.
+
+    The mean-hold spectrum equals scipy.signal.welch(x, fs, window, nperseg=nfft,
+    noverlap=0, detrend=detrend or False, return_onesided=False), fftshifted. Frames
+    are not detrended by default so the DC component stays visible; detrend='constant'
+    subtracts each frame's mean as welch does by default.
+
+    Parameters:
+        nfft (int): Frame / FFT length, i.e. the number of output bins.
+        sampling_rate (float): Sampling rate in Hz.
+        window (str): Window applied to each frame.
+        detrend (str or None): None, or 'constant' to remove each frame's mean before windowing.
+    """
+
+    def __init__(self, nfft=4096, sampling_rate=50e6, window='hann', detrend=None):
+        if detrend not in (None, 'constant'):
+            raise ValueError(f"Unsupported detrend '{detrend}', expected None or 'constant'")
+        self.nfft = nfft
+        self.sampling_rate = sampling_rate
+        self.detrend = detrend
+        self.window = get_window(window, nfft).astype(np.float32)
+        self.scale = 1.0 / (sampling_rate * (self.window ** 2).sum())
+        self.frequencies = np.fft.fftshift(np.fft.fftfreq(nfft, 1 / sampling_rate))
+        self.reset()
+
+    def reset(self):
+        """Forget all accumulated frames."""
+        self._sum = np.zeros(self.nfft)
+        self._peak = np.zeros(self.nfft)
+        self._leftover = np.zeros(0, dtype=np.complex64)
+        self.frames = 0
+
+    def update(self, block):
+        """Add a block of samples (any length) to the averages."""
+        block = np.asarray(block)
+        if len(self._leftover):
+            block = np.concatenate([self._leftover, block])
+        num_frames = len(block) // self.nfft
+        self._leftover = block[num_frames * self.nfft:].copy()
+        if num_frames == 0:
+            return
+
+        frames = block[:num_frames * self.nfft].reshape(num_frames, self.nfft)
+        if self.detrend == 'constant':
+            frames = frames - frames.mean(axis=1, keepdims=True)
+        frames = frames * self.window
+        power = np.abs(scipy.fft.fft(frames, axis=1, overwrite_x=True, workers=-1)) ** 2
+        self._sum += power.sum(axis=0)
+        np.maximum(self._peak, power.max(axis=0), out=self._peak)
+        self.frames += num_frames
+
+    @property
+    def mean(self):
+        """Mean-hold power spectral density (fftshifted)."""
+        return np.fft.fftshift(self._sum * self.scale / max(self.frames, 1))
+
+    @property
+    def peak(self):
+        """Peak-hold power spectral density (fftshifted)."""
+        return np.fft.fftshift(self._peak * self.scale)
+
+def averaged_spectrum(ocusync2_data, sampling_rate, nfft=4096, block_frames=256, detrend=None):
+    """
+    Mean-hold and peak-hold spectrum of a whole capture, streamed in bounded memory.
+
+    Parameters:
+    - ocusync2_data: Input signal data (numpy array, memmap or CaptureReader)
+    - sampling_rate: The sampling rate of the signal (Hz)
+    - nfft: Number of frequency bins (FFT size per frame)
+    - block_frames: Frames read and transformed per step
+    - detrend: None, or 'constant' to remove each frame's mean (welch's default)
+
+    Returns:
+    - frequencies: Shifted frequency axis (Hz)
+    - mean_psd: Mean-hold PSD
+    - peak_psd: Peak-hold PSD
+    """
+    spectrum = AveragedSpectrum(nfft, sampling_rate, detrend=detrend)
+    block_size = nfft * block_frames
+    for start in range(0, len(ocusync2_data) - len(ocusync2_data) % nfft, block_size):
+        spectrum.update(ocusync2_data[start:start + block_size])
+    return spectrum.frequencies, spectrum.mean, spectrum.peak
+
+def plot_frequency_spectrum(ocusync2_data, sampling_rate, mode="averaged", nfft=4096):
     """
     This function computes and plots the frequency spectrum of the input signal using FFT.
-    
+
     Parameters:
     - ocusync2_data: Input signal data (numpy array)
     - sampling_rate: The sampling rate of the signal (Hz)
+    - mode: "averaged" streams averaged nfft-point block FFTs (mean-hold and peak-hold, bounded
+      memory); "full" takes one FFT of the whole capture
+    - nfft: Number of frequency bins in "averaged" mode
     """
+    if mode == "averaged":
+        frequencies, mean_psd, peak_psd = averaged_spectrum(ocusync2_data, sampling_rate, nfft=nfft)
+
+        plt.figure(figsize=(20, 6))
+        plt.plot(frequencies, 10 * np.log10(peak_psd + np.finfo(float).tiny), label="Peak hold")
+        plt.plot(frequencies, 10 * np.log10(mean_psd + np.finfo(float).tiny), label="Mean hold")
+        plt.title('Frequency Spectrum of the Signal')
+        plt.xlabel('Frequency (Hz)')
+        plt.ylabel('PSD (dB/Hz)')
+        plt.legend()
+        plt.show()
+        return
+    if mode != "full":
+        raise ValueError(f"Unknown mode '{mode}', expected 'averaged' or 'full'")
+
     # Step 1: Perform the FFT
     n = len(ocusync2_data)  # Number of samples
     fft_data = np.fft.fft(ocusync2_data)
@@ -0,0 +1,248 @@
+import os
+import multiprocessing
+from collections import namedtuple
+import numpy as np
+
+# One row per packet; NaN where a value could not be computed (no band found, packet shorter than the PSD FFT)
+PACKET_DTYPE = np.dtype([
+    ("packet", np.int64),
+    ("start_idx", np.int64),
+    ("end_idx", np.int64),
+    ("start_time", np.float64),
+    ("duration", np.float64),
+    ("num_samples", np.int64),
+    ("band_found", np.bool_),
+    ("offset", np.float64),
+    ("mean_psd", np.float64),
+    ("snr_dB", np.float64),
+    ("skewness", np.float64),
+    ("kurtosis", np.float64),
+])
+
+# Numeric results of analyze_packets
+PacketAnalysis = namedtuple("PacketAnalysis", ["table", "psd_freqs", "psds", "spectrograms"])
+
+
+def analyze_packets(ocusync2_data, packets, processor, sampling_rate=50e6, nfft_welch=PSD_NPERSEG, spectrograms=False,
+                    signal_band=(-8.5e6, 8.5e6), noise_bands=((-25e6, -8.5e6), (8.5e6, 25e6)), batch_packets=1024):
+    """
+    Runs the per-packet analysis without drawing anything and returns the numbers.
+
+    Offsets, corrected and filtered packets come from the batched PacketPipeline,
+    PSDs from the shared psd_service and SNRs from one SNRCalculator pass, so a
+    capture with thousands of packets costs only the DSP. Packets go through the
+    pipeline `batch_packets` at a time, so only one batch of filtered packets is
+    held at once. Figures can be produced afterwards for a subset with
+    plot_packet_results.
+
+    Parameters:
+        ocusync2_data (np.ndarray): Capture samples (array, memmap or CaptureReader).
+        packets (list): (start_idx, end_idx) of each packet.
+        processor (DroneSignalProcessor): Supplies the offset band search.
+        sampling_rate (float): Sampling rate in Hz.
+        nfft_welch (int): FFT size of the filtered-packet PSD.
+        spectrograms (bool): Also keep the spectrogram (NFFT=256, noverlap=128) of every packet.
+        signal_band (tuple): (f_low, f_high) of the signal for the SNR, in Hz.
+        noise_bands (list): (f_low, f_high) of each noise band for the SNR, in Hz.
+        batch_packets (int): Packets passed to the pipeline per run.
+
+    Returns:
+        analysis (PacketAnalysis): `table` is a structured array with PACKET_DTYPE rows,
+        `psds` the (packets, nfft) matrix of fftshifted PSDs on `psd_freqs` (NaN rows where
+        missing) and `spectrograms` a dict of packet number -> (f, t, Sxx) when requested.
+    """
+    pipeline = PacketPipeline(processor, sampling_rate=sampling_rate, cutoff=8.5e6)
+    capture_id = capture_identity(ocusync2_data)
+
+    nfft = psd_service.fft_size(nfft_welch)
+    psd_freqs = np.fft.fftshift(np.fft.fftfreq(nfft, 1 / sampling_rate))
+    psds = np.full((len(packets), nfft), np.nan)
+
+    table = np.zeros(len(packets), dtype=PACKET_DTYPE)
+    table["packet"] = np.arange(1, len(packets) + 1)
+    table["start_idx"] = [start_idx for start_idx, _ in packets]
+    table["end_idx"] = [end_idx for _, end_idx in packets]
+    table["num_samples"] = table["end_idx"] - table["start_idx"]
+    table["start_time"] = table["start_idx"] / sampling_rate
+    table["duration"] = table["num_samples"] / sampling_rate
+    for field in ("offset", "mean_psd", "snr_dB", "skewness", "kurtosis"):
+        table[field] = np.nan
+
+    for first in range(0, len(packets), batch_packets):
+        results = pipeline.run(ocusync2_data, packets[first:first + batch_packets], capture_id=capture_id)
+        for row, result in enumerate(results, start=first):
+            table["band_found"][row] = result.band_found
+            if result.offset is not None:
+                table["offset"][row] = result.offset
+            if not result.band_found:
+                continue
+
+            magnitude = np.abs(result.filtered)
+            table["skewness"][row] = moment_based_skew(magnitude)
+            table["kurtosis"][row] = moment_based_kurtosis(magnitude)
+
+            if len(result.filtered) >= nfft:
+                psd = psd_service.psd(result.filtered, key=(result.start, result.end, result.offset),
+                                      fs=sampling_rate, stage=filter_stage("lowpass", poles=pipeline.poles,
+                                                                           cutoff=pipeline.cutoff),
+                                      nperseg=nfft, capture_id=capture_id)
+                psds[row] = psd.Pxx_den
+                table["mean_psd"][row] = psd.mean
+
+    # SNR of every packet with a PSD in one pass
+    with_psd = np.flatnonzero(~np.isnan(psds[:, 0]))
+    if len(with_psd):
+        table["snr_dB"][with_psd] = SNRCalculator(psd_freqs, signal_band, noise_bands).compute(psds[with_psd]).snr_dB
+
+    packet_spectrograms = {}
+    if spectrograms:
+        for row, (start_idx, end_idx) in enumerate(packets):
+            packet_spectrograms[row + 1] = packet_spectrogram(ocusync2_data[start_idx:end_idx], sampling_rate)
+
+    return PacketAnalysis(table, psd_freqs, psds, packet_spectrograms)
+
+
+def to_dataframe(table):
+    """The analysis table as a pandas DataFrame, or unchanged when pandas is not installed."""
+    try:
+        import pandas as pd
+    except ImportError:
+        return table
+    return pd.DataFrame.from_records(table, index="packet")
+
+
+def _draw_figure(kind, title, payload):
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(20, 6))
+    if kind == "psd":
+        f, Pxx_den = payload
+        plt.semilogy(f / 1e6, Pxx_den)
+        plt.axhline(psd_service.threshold_factor * np.nanmean(Pxx_den), color='r', linestyle='--', label="Mean PSD")
+        plt.xlabel("Frequency [MHz]")
+        plt.ylabel("PSD [V**2/Hz]")
+        plt.legend()
+    elif kind == "spectrogram":
+        f, t, Sxx = payload
+        plt.pcolormesh(t, f, 10 * np.log10(Sxx + np.finfo(float).tiny), shading="auto", cmap='viridis')
+        plt.xlabel("Time [s]")
+        plt.ylabel("Frequency [Hz]")
+        plt.colorbar(label="Power/Frequency [dB]")
+    else:
+        raise ValueError(f"Unknown figure kind '{kind}', expected 'psd' or 'spectrogram'")
+    plt.title(title)
+    return fig
+
+
+def _render_to_file(kind, title, payload, path):
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+    import matplotlib.pyplot as plt
+
+    fig = _draw_figure(kind, title, payload)
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+class DeferredPlotter:
+    """
+    Renders figures to image files on a pool of worker processes with the Agg backend.
+
+    Submitting returns immediately, so the analysis loop never waits for matplotlib;
+    `wait` collects the written paths.
+
+    Parameters:
+        output_dir (str): Directory the figures are written to (created if missing).
+        workers (int): Number of worker processes (default: all cores).
+        image_format (str): File extension understood by matplotlib, e.g. "png" or "svg".
+    """
+
+    def __init__(self, output_dir, workers=None, image_format="png"):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.image_format = image_format
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        self._pool = context.Pool(workers or os.cpu_count())
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, kind, name, title, payload):
+        """Queue one figure ('psd' or 'spectrogram') and return the path it will be written to."""
+        path = os.path.join(self.output_dir, f"{name}.{self.image_format}")
+        self._pending.append(self._pool.apply_async(_render_to_file, (kind, title, payload, path)))
+        return path
+
+    def wait(self):
+        """Block until every queued figure is written and return their paths."""
+        paths = [pending.get() for pending in self._pending]
+        self._pending = []
+        return paths
+
+    def close(self):
+        """Finish the queued figures and shut the pool down."""
+        if self._pool is not None:
+            self.wait()
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+def plot_packet_results(analysis, packet_numbers=None, kinds=("psd",), plotter=None):
+    """
+    Draws figures for a selected subset of an analysis, inline or through a DeferredPlotter.
+
+    Parameters:
+        analysis (PacketAnalysis): Result of analyze_packets.
+        packet_numbers (list): 1-based packet numbers to draw (default: all).
+        kinds (tuple): Figures per packet, 'psd' and/or 'spectrogram'.
+        plotter (DeferredPlotter): Write the figures to files in the background instead of showing them.
+
+    Returns:
+        paths (list): Files queued on the plotter (empty when shown inline).
+    """
+    import matplotlib.pyplot as plt
+
+    if packet_numbers is None:
+        packet_numbers = analysis.table["packet"]
+
+    paths = []
+    for number in packet_numbers:
+        row = int(number) - 1
+        for kind in kinds:
+            if kind == "psd":
+                if np.isnan(analysis.psds[row, 0]):
+                    continue
+                payload = (analysis.psd_freqs, analysis.psds[row])
+                title = f"Power Spectral Density (PSD) of Filtered Packet {number}"
+            else:
+                if number not in analysis.spectrograms:
+                    continue
+                payload = analysis.spectrograms[number]
+                title = f"Spectrogram of Detected Packet {number}"
+
+            if plotter is not None:
+                paths.append(plotter.submit(kind, f"packet_{number:05d}_{kind}", title, payload))
+            else:
+                _draw_figure(kind, title, payload)
+                plt.show()
+    return paths
+
+
+# Example usage:
+analysis = analyze_packets(ocusync2_data, packets, DroneSignalProcessor(debug=False), sampling_rate=50e6)
+print(to_dataframe(analysis.table))
+
+# Show only the five lowest-SNR packets
+lowest_snr = analysis.table[np.argsort(analysis.table["snr_dB"])[:5]]["packet"]
+plot_packet_results(analysis, lowest_snr)
+
+# Write every PSD to disk in the background
+with DeferredPlotter("packet_figures") as plotter:
+    plot_packet_results(analysis, kinds=("psd",), plotter=plotter)
@@ -0,0 +1,530 @@
+import asyncio
+import socket
+import struct
+import time
+from collections import deque, namedtuple
+import numpy as np
+
+# Analysis result of one packet detected in the live feed
+LivePacket = namedtuple("LivePacket", ["start_idx", "end_idx", "level", "offset", "band_found", "snr_dB",
+                                       "skewness", "kurtosis", "latency_s"])
+
+# Analysis levels, from most to least work; "failed" marks a packet whose analyzer raised
+ANALYSIS_LEVELS = ("full", "reduced", "detect-only")
+FAILED_LEVEL = "failed"
+
+# UDP datagram header: stream index of the first sample (little-endian uint64)
+SEQUENCE_HEADER = struct.Struct("<Q")
+
+
+class SampleRing:
+    """
+    Preallocated ring buffer of complex samples between the socket and the detector.
+
+    Samples are copied into a fixed NumPy array and read out as contiguous runs
+    tagged with their stream index. Samples that do not fit are dropped and
+    counted (unless the writer keeps them to retry), and the discontinuity is
+    recorded, so the reader can tell where the stream has holes. Producer and consumer both run on the event loop
+    thread, so no locks are needed.
+
+    Parameters:
+        capacity (int): Ring size in samples.
+        dtype: Sample dtype.
+    """
+
+    def __init__(self, capacity, dtype=np.complex64):
+        self.buffer = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.head = 0               # samples ever stored
+        self.tail = 0               # samples ever read
+        self.dropped = 0            # samples refused because the ring was full
+        self.gaps = 0               # discontinuities in the stored stream
+        self._marks = deque()       # (ring count, stream index) where a contiguous run starts
+        self._stored_end = None     # stream index following the last stored sample
+
+    def __len__(self):
+        return self.head - self.tail
+
+    @property
+    def fill(self):
+        """Fraction of the ring in use."""
+        return len(self) / self.capacity
+
+    def write(self, samples, stream_index, drop=True):
+        """
+        Store samples that start at stream_index.
+
+        Parameters:
+            samples (np.ndarray): Samples to store.
+            stream_index (int): Stream index of the first sample.
+            drop (bool): Count what does not fit as dropped; otherwise the caller keeps it.
+
+        Returns:
+            stored (int): Number of samples stored.
+        """
+        count = min(len(samples), self.capacity - len(self))
+        if drop:
+            self.dropped += len(samples) - count
+        if count == 0:
+            return 0
+        if stream_index != self._stored_end:
+            if self._stored_end is not None:
+                self.gaps += 1
+            self._marks.append((self.head, stream_index))
+
+        position = self.head % self.capacity
+        first = min(count, self.capacity - position)
+        self.buffer[position:position + first] = samples[:first]
+        self.buffer[:count - first] = samples[first:count]
+        self.head += count
+        self._stored_end = stream_index + count
+        return count
+
+    def read(self, max_samples):
+        """
+        Remove the oldest contiguous run of up to max_samples samples.
+
+        Returns:
+            (stream_index, samples): Stream index of the first sample and a copy of the run.
+        """
+        while len(self._marks) > 1 and self._marks[1][0] <= self.tail:
+            self._marks.popleft()
+        if len(self) == 0 or not self._marks:
+            return self._stored_end or 0, self.buffer[:0].copy()
+
+        mark_count, mark_index = self._marks[0]
+        count = min(max_samples, len(self))
+        if len(self._marks) > 1:
+            count = min(count, self._marks[1][0] - self.tail)
+
+        position = self.tail % self.capacity
+        first = min(count, self.capacity - position)
+        samples = np.concatenate([self.buffer[position:position + first], self.buffer[:count - first]])
+        stream_index = mark_index + self.tail - mark_count
+        self.tail += count
+        return stream_index, samples
+
+
+class LivePacketAnalyzer:
+    """
+    Per-packet analysis for the live feed, at the level the ingest can afford.
+
+    "full" estimates the offset, corrects and low-pass filters the packet and
+    computes its SNR, skewness and kurtosis; "reduced" only estimates the
+    offset. Plotting is never done on the live path.
+
+    Parameters:
+        sampling_rate (float): Sampling rate in Hz.
+        cutoff (float): Low-pass cutoff in Hz.
+        nfft (int): FFT size of the offset estimate and the SNR PSD.
+    """
+
+    def __init__(self, sampling_rate=50e6, cutoff=8.5e6, nfft=2048):
+        self.sampling_rate = sampling_rate
+        self.cutoff = cutoff
+        self.nfft = nfft
+        self.processor = DroneSignalProcessor(debug=False)
+        self.snr = SNRCalculator(np.fft.fftshift(np.fft.fftfreq(nfft, 1 / sampling_rate)))
+
+    def __call__(self, samples, level):
+        """
+        Returns:
+            (offset, band_found, snr_dB, skewness, kurtosis): None for what the level skips.
+        """
+        offset, band_found = self.processor.estimate_offset_fast(samples, self.sampling_rate, nfft=self.nfft)
+        if level != "full" or not band_found:
+            return offset, band_found, None, None, None
+
+        corrected = DroneSignalProcessor.fshift(samples, -offset, self.sampling_rate)
+        filtered, _ = lowpass(corrected, self.cutoff, self.sampling_rate)
+        _, Pxx_den = batched_welch(filtered[None, :], [len(filtered)], self.sampling_rate, nperseg=self.nfft)
+        snr_dB = float(self.snr.compute(np.fft.fftshift(Pxx_den, axes=1)).snr_dB[0])
+        stats = MomentAccumulator().update(filtered).result()
+        return offset, band_found, snr_dB, stats.skewness, stats.kurtosis
+
+
+class _UDPIngest(asyncio.DatagramProtocol):
+    def __init__(self, ingest):
+        self.ingest = ingest
+
+    def datagram_received(self, data, addr):
+        self.ingest.feed_datagram(data)
+
+
+class _TCPIngest(asyncio.Protocol):
+    def __init__(self, ingest):
+        self.ingest = ingest
+        self.backlog = b""          # bytes received but not yet stored in the ring
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.ingest._transports[transport] = self
+        if self.ingest._paused:
+            transport.pause_reading()
+
+    def data_received(self, data):
+        self.backlog += data
+        if not self.drain():
+            self.ingest._pause()
+
+    def drain(self):
+        """Store as much of the backlog as the ring has room for; True once only a partial sample is left."""
+        itemsize = self.ingest.ring.buffer.itemsize
+        usable = len(self.backlog) - len(self.backlog) % itemsize
+        stored = self.ingest.feed(self.backlog[:usable], drop=False)
+        self.backlog = self.backlog[stored * itemsize:]
+        return len(self.backlog) < itemsize
+
+    def connection_lost(self, exc):
+        self.ingest._transports.pop(self.transport, None)
+
+
+class LiveIngest:
+    """
+    Real-time OcuSync2 packet detection from complex samples arriving on a local socket.
+
+    Samples (complex64, as in the .dat captures) arrive over UDP (each datagram
+    optionally prefixed with the uint64 stream index of its first sample, so
+    network loss is detected) or TCP, and are copied into a preallocated
+    SampleRing. A consumer task hands blocks of at most `block_samples` to a
+    StreamingPacketDetector, waiting at most `max_latency_s` for a block to
+    fill, and queues every closed packet for analysis in a worker thread.
+
+    When analysis falls behind it degrades instead of stalling the feed: above
+    `degrade_fill` ring occupancy packets get "reduced" analysis, and above
+    `skip_fill` (or with `max_pending` analyses already queued) they are only
+    reported. TCP senders are paused above `high_water` and resumed below
+    `low_water`, and bytes that do not fit in the ring wait in the connection
+    until there is room, so TCP never drops samples. UDP cannot be paused, so
+    overflowing samples are dropped and counted, and the detector restarts
+    after the gap. A packet whose analyzer raises is still reported, at level
+    "failed", and the error is kept in `errors`.
+
+    Packets are emitted as their analysis completes, not in capture order:
+    a detect-only packet, or a short packet analyzed in parallel, can overtake
+    an earlier one still being analyzed. Sort `packets` by start_idx for
+    capture order.
+
+    Only the detector and the analyzer run off the event loop. The detector
+    is called for one block at a time, and everything else touching the ring,
+    the detector's stream state and the counters runs on the loop thread.
+    Analyses can overlap, so the analyzer must be thread-safe: the default
+    LivePacketAnalyzer builds its per-packet state (corrected and filtered
+    samples, moment accumulator) per call, only reads its processor and SNR
+    calculator, and fetches filter designs from the locked `filter_bank`.
+
+    Parameters:
+        sampling_rate (float): Sampling rate in Hz.
+        window_ms (float): Energy window size in milliseconds.
+        threshold_factor (float): Multiplier applied to the noise floor estimate.
+        noise_mode (str): Noise floor mode of the StreamingPacketDetector.
+        ring_seconds (float): Ring buffer length in seconds of samples.
+        block_samples (int): Largest block handed to the detector.
+        max_latency_s (float): Longest wait for a block to fill before processing what is there.
+        max_packet_s (float): Longest packet whose samples are kept for analysis.
+        analyzer (callable): analyzer(samples, level) -> (offset, band_found, snr_dB, skewness, kurtosis).
+        max_pending (int): Analyses queued before packets are only reported.
+        degrade_fill (float): Ring occupancy above which analysis is reduced.
+        skip_fill (float): Ring occupancy above which analysis is skipped.
+        high_water (float): Ring occupancy at which TCP senders are paused.
+        low_water (float): Ring occupancy at which paused TCP senders are resumed.
+        sequence_header (bool): UDP datagrams start with a SEQUENCE_HEADER.
+        on_packet (callable): Called on the event loop with every LivePacket, in completion order.
+        executor: Executor for detection and analysis (default: the loop's thread pool).
+    """
+
+    def __init__(self, sampling_rate=50e6, window_ms=0.508, threshold_factor=0.6, noise_mode="ema",
+                 ring_seconds=0.5, block_samples=1 << 18, max_latency_s=0.05, max_packet_s=0.01,
+                 analyzer=None, max_pending=8, degrade_fill=0.5, skip_fill=0.8, high_water=0.75, low_water=0.25,
+                 sequence_header=True, on_packet=None, executor=None):
+        self.sampling_rate = sampling_rate
+        self.detector = StreamingPacketDetector(sampling_rate, window_ms, threshold_factor, noise_mode=noise_mode)
+        self.ring = SampleRing(int(ring_seconds * sampling_rate))
+        self.block_samples = block_samples
+        self.max_latency_s = max_latency_s
+        self.max_packet_samples = int(max_packet_s * sampling_rate)
+        self.analyzer = analyzer or LivePacketAnalyzer(sampling_rate)
+        self.max_pending = max_pending
+        self.degrade_fill = degrade_fill
+        self.skip_fill = skip_fill
+        self.high_water = high_water
+        self.low_water = low_water
+        self.sequence_header = sequence_header
+        self.on_packet = on_packet
+        self.executor = executor
+
+        self.packets = deque(maxlen=100000)
+        self.lost = 0
+        self.truncated = 0
+        self.pauses = 0
+        self.analyzed = dict.fromkeys(ANALYSIS_LEVELS + (FAILED_LEVEL,), 0)
+        self.errors = deque(maxlen=100)     # (start_idx, end_idx, exception) of failed analyses
+        self.max_latency = 0.0
+        self._last_receive = time.monotonic()
+        self._next_index = 0            # stream index expected from the sender
+        self._detector_base = 0         # stream index of the detector's sample 0
+        self._detector_next = 0         # stream index the detector expects next
+        self._recent = deque()          # (stream index, block) kept for packet extraction
+        self._recent_samples = 0
+        self._arrivals = deque()        # (ring head, monotonic time) of each write
+        self._pending = set()
+        self._transports = {}           # TCP transport -> its _TCPIngest
+        self._servers = []
+        self._paused = False
+        self._closing = False
+        self._data_event = asyncio.Event()
+        self._consumer = None
+        self.address = None
+
+    async def start(self, host="127.0.0.1", port=5555, protocol="udp", receive_buffer_bytes=8 << 20):
+        """
+        Listen for samples on host:port ('udp' or 'tcp') and start the consumer task.
+
+        Port 0 picks a free port; the address listened on is stored in `address`.
+        """
+        loop = asyncio.get_running_loop()
+        if protocol == "udp":
+            transport, _ = await loop.create_datagram_endpoint(lambda: _UDPIngest(self), local_addr=(host, port))
+            sock = transport.get_extra_info("socket")
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer_bytes)
+            self._servers.append(transport)
+        elif protocol == "tcp":
+            server = await loop.create_server(lambda: _TCPIngest(self), host, port)
+            sock = server.sockets[0]
+            self._servers.append(server)
+        else:
+            raise ValueError(f"Unknown protocol '{protocol}', expected 'udp' or 'tcp'")
+        self.address = sock.getsockname()[:2]
+        self._consumer = asyncio.ensure_future(self._consume())
+        return self
+
+    def feed_datagram(self, data):
+        """Store one UDP datagram (with or without sequence header)."""
+        if self.sequence_header:
+            stream_index, = SEQUENCE_HEADER.unpack_from(data)
+            self.feed(data[SEQUENCE_HEADER.size:], stream_index)
+        else:
+            self.feed(data)
+
+    def feed(self, data, stream_index=None, drop=True):
+        """
+        Store raw complex64 bytes starting at stream_index (default: right after the previous ones).
+
+        Returns:
+            stored (int): Samples stored; with drop=False the rest is left to the caller to feed again.
+        """
+        self._last_receive = time.monotonic()
+        samples = np.frombuffer(data, dtype=self.ring.buffer.dtype)
+        if stream_index is None:
+            stream_index = self._next_index
+        elif stream_index > self._next_index:
+            self.lost += stream_index - self._next_index
+
+        stored = self.ring.write(samples, stream_index, drop=drop)
+        self._next_index = max(self._next_index, stream_index + (len(samples) if drop else stored))
+        if stored:
+            self._arrivals.append((self.ring.head, time.monotonic()))
+        if self.ring.fill >= self.high_water:
+            self._pause()
+        if len(self.ring) >= self.block_samples:
+            self._data_event.set()
+        return stored
+
+    def _pause(self):
+        if self._transports and not self._paused:
+            self._paused = True
+            self.pauses += 1
+            for transport in self._transports:
+                transport.pause_reading()
+
+    def _resume(self):
+        # Backlogs go into the ring first; reading resumes only once every connection's backlog is stored
+        drained = [protocol.drain() for protocol in list(self._transports.values())]
+        if all(drained) and self.ring.fill < self.high_water:
+            self._paused = False
+            for transport in self._transports:
+                transport.resume_reading()
+
+    def _load_level(self):
+        fill = self.ring.fill
+        if fill >= self.skip_fill or len(self._pending) >= self.max_pending:
+            return "detect-only"
+        return "reduced" if fill >= self.degrade_fill else "full"
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Step 1: Wait for a full block, or at most max_latency_s
+            deadline = loop.time() + self.max_latency_s
+            while len(self.ring) < self.block_samples and not self._closing:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._data_event.clear()
+                try:
+                    await asyncio.wait_for(self._data_event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            stream_index, block = self.ring.read(self.block_samples)
+            arrival = None
+            while self._arrivals and self._arrivals[0][0] <= self.ring.tail:
+                arrival = self._arrivals.popleft()[1]
+            if self._paused and self.ring.fill <= self.low_water:
+                self._resume()
+            if len(block) == 0:
+                if self._closing and len(self.ring) == 0:
+                    break
+                continue
+
+            # Step 2: Restart detection after a hole in the stream
+            packets = []
+            if stream_index != self._detector_next:
+                packets = [(self._detector_base + s, self._detector_base + e) for s, e in self.detector.flush()]
+                self.detector.reset()
+                self._detector_base = stream_index
+            self._detector_next = stream_index + len(block)
+
+            # Step 3: Detect in a worker thread while the loop keeps receiving
+            closed = await loop.run_in_executor(self.executor, self.detector.process, block)
+            packets.extend((self._detector_base + s, self._detector_base + e) for s, e in closed)
+            self._remember(stream_index, block)
+            for start_idx, end_idx in packets:
+                self._dispatch(start_idx, end_idx, arrival or time.monotonic())
+
+        closed = self.detector.flush()
+        for start_idx, end_idx in closed:
+            self._dispatch(self._detector_base + start_idx, self._detector_base + end_idx, time.monotonic())
+
+    def _remember(self, stream_index, block):
+        self._recent.append((stream_index, block))
+        self._recent_samples += len(block)
+        while self._recent_samples - len(self._recent[0][1]) >= self.max_packet_samples:
+            self._recent_samples -= len(self._recent.popleft()[1])
+
+    def _packet_samples(self, start_idx, end_idx):
+        parts = []
+        for block_start, block in self._recent:
+            lo, hi = max(start_idx, block_start), min(end_idx, block_start + len(block))
+            if lo < hi:
+                parts.append(block[lo - block_start:hi - block_start])
+        samples = np.concatenate(parts) if parts else np.zeros(0, dtype=self.ring.buffer.dtype)
+        if len(samples) < end_idx - start_idx:
+            self.truncated += 1
+        return samples
+
+    def _dispatch(self, start_idx, end_idx, arrival):
+        level = self._load_level()
+        if level == "detect-only":
+            self._emit(LivePacket(start_idx, end_idx, level, None, False, None, None, None,
+                                  time.monotonic() - arrival))
+            return
+
+        samples = self._packet_samples(start_idx, end_idx)
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self.analyzer, samples, level)
+        self._pending.add(future)
+
+        def done(future):
+            self._pending.discard(future)
+            try:
+                offset, band_found, snr_dB, skewness, kurtosis = future.result()
+            except (Exception, asyncio.CancelledError) as error:
+                self.errors.append((start_idx, end_idx, error))
+                self._emit(LivePacket(start_idx, end_idx, FAILED_LEVEL, None, False, None, None, None,
+                                      time.monotonic() - arrival))
+                return
+            self._emit(LivePacket(start_idx, end_idx, level, offset, band_found, snr_dB, skewness, kurtosis,
+                                  time.monotonic() - arrival))
+        future.add_done_callback(done)
+
+    def _emit(self, packet):
+        self.analyzed[packet.level] += 1
+        self.max_latency = max(self.max_latency, packet.latency_s)
+        self.packets.append(packet)
+        if self.on_packet is not None:
+            self.on_packet(packet)
+
+    def stats(self):
+        """Counters of the feed: samples received, dropped and lost, queue depth, packets per analysis level."""
+        return {"received": self.ring.head + self.ring.dropped, "dropped": self.ring.dropped, "lost": self.lost,
+                "gaps": self.ring.gaps, "queue_depth": len(self.ring), "fill": self.ring.fill,
+                "paused": self._paused, "pauses": self.pauses, "pending": len(self._pending),
+                "packets": dict(self.analyzed),
+                "truncated": self.truncated, "max_latency_s": self.max_latency}
+
+    async def stop(self, idle_s=0.1):
+        """
+        Stop listening once the feed has been idle (and not paused) for idle_s seconds,
+        drain the ring, close open packets and wait for pending analyses.
+
+        Returns:
+            stats (dict): Final counters (see stats).
+        """
+        # A paused TCP sender may still have data queued in the connection
+        while time.monotonic() - self._last_receive < idle_s or self._paused:
+            await asyncio.sleep(idle_s / 4)
+        for server in self._servers:
+            server.close()
+        self._closing = True
+        self._data_event.set()
+        if self._consumer is not None:
+            await self._consumer
+        if self._pending:
+            await asyncio.wait(list(self._pending))
+        return self.stats()
+
+
+async def send_samples(samples, host="127.0.0.1", port=5555, protocol="udp", sampling_rate=None,
+                       datagram_samples=1024, sequence_header=True, start_index=0):
+    """
+    Local stand-in for an SDR: stream complex64 samples to a LiveIngest socket.
+
+    Parameters:
+        samples (np.ndarray): Samples to send (array, memmap or CaptureReader range).
+        host (str): Receiver address.
+        port (int): Receiver port.
+        protocol (str): 'udp' or 'tcp'.
+        sampling_rate (float): Pace the stream in real time at this rate (default: as fast as possible).
+        datagram_samples (int): Samples per UDP datagram / TCP write.
+        sequence_header (bool): Prefix UDP datagrams with their stream index.
+        start_index (int): Stream index of the first sample.
+    """
+    loop = asyncio.get_running_loop()
+    if protocol == "udp":
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+        writer = None
+    else:
+        _, writer = await asyncio.open_connection(host, port)
+
+    started = time.monotonic()
+    for offset in range(0, len(samples), datagram_samples):
+        chunk = np.ascontiguousarray(samples[offset:offset + datagram_samples], dtype=np.complex64).tobytes()
+        if writer is None:
+            header = SEQUENCE_HEADER.pack(start_index + offset) if sequence_header else b""
+            transport.sendto(header + chunk)
+        else:
+            writer.write(chunk)
+            await writer.drain()
+
+        # Yield after every datagram (a receiver on the same loop reads one per iteration),
+        # and hold back when ahead of real time
+        ahead = offset / sampling_rate - (time.monotonic() - started) if sampling_rate else 0.0
+        await asyncio.sleep(max(0.0, ahead))
+
+    if writer is None:
+        transport.close()
+    else:
+        writer.close()
+        await writer.wait_closed()
+
+
+# Example usage:
+async def live_demo(capture, port=5555, protocol="udp"):
+    ingest = LiveIngest(sampling_rate=50e6, on_packet=lambda p: print(
+        f"Packet {p.start_idx / 50e6:.6f}-{p.end_idx / 50e6:.6f} s [{p.level}]: "
+        f"offset {(p.offset or 0) / 1e3:.1f} kHz, SNR {p.snr_dB}, latency {p.latency_s * 1e3:.1f} ms"))
+    await ingest.start(port=port, protocol=protocol)
+    await send_samples(capture, port=port, protocol=protocol, sampling_rate=50e6)
+    return await ingest.stop()
+
+print(asyncio.run(live_demo(ocusync2_data[:int(0.2 * 50e6)])))
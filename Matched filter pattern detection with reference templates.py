@@ -0,0 +1,227 @@
+from collections import deque, namedtuple
+from fractions import Fraction
+import numpy as np
+import scipy.fft
+import scipy.signal
+
+# One template match: template index, sample range of the match and its normalized correlation
+PatternMatch = namedtuple("PatternMatch", ["template", "start", "end", "score"])
+
+
+def zadoff_chu(root, length=601):
+    """Zadoff-Chu sequence of odd length with the given root."""
+    n = np.arange(length)
+    return np.exp(-1j * np.pi * root * n * (n + 1) / length)
+
+
+def zc_sync_template(root, sampling_rate=50e6, source_rate=15.36e6, nfft=1024, cp_length=72, length=601):
+    """
+    Time-domain ZC synchronization symbol as transmitted in an OcuSync2 / DroneID burst.
+
+    The ZC sequence (with its middle element on the DC subcarrier nulled) is placed on the
+    `length` subcarriers around DC of an nfft-point OFDM symbol at source_rate, a cyclic
+    prefix is prepended and the symbol is resampled to sampling_rate (625/192 for 15.36 -> 50 Msps).
+
+    Parameters:
+        root (int): ZC root (600 and 147 for the two DroneID sync symbols).
+        sampling_rate (float): Sampling rate of the capture in Hz.
+        source_rate (float): OFDM sampling rate in Hz.
+        nfft (int): OFDM FFT size.
+        cp_length (int): Cyclic prefix length at source_rate.
+        length (int): ZC sequence length (occupied subcarriers including DC).
+
+    Returns:
+        template (np.ndarray): Complex template at sampling_rate.
+    """
+    sequence = zadoff_chu(root, length)
+    sequence[length // 2] = 0
+    spectrum = np.zeros(nfft, dtype=np.complex128)
+    spectrum[np.arange(-(length // 2), length // 2 + 1) % nfft] = sequence
+    symbol = scipy.fft.ifft(spectrum)
+    symbol = np.concatenate([symbol[-cp_length:], symbol]) if cp_length else symbol
+
+    ratio = Fraction(sampling_rate / source_rate).limit_denominator(10000)
+    return scipy.signal.resample_poly(symbol, ratio.numerator, ratio.denominator)
+
+
+class TemplateBank:
+    """
+    Normalized FFT cross-correlation of signals against a bank of reference templates.
+
+    Signals are cut into overlap-save segments; segments of consecutive signals are
+    transformed `max_segments` at a time in one batched FFT, multiplied by the cached
+    conjugate spectrum of each template and transformed back, so a bank of T
+    templates costs one forward FFT and T inverse FFTs per segment. Template spectra are cached per FFT size.
+    Correlations are normalized by the template norm and the local signal energy
+    (running sums), so a perfect match scores 1 whatever the signal level.
+
+    Parameters:
+        templates (list): Complex reference templates (all of the same length).
+        block_size (int): Target number of correlation outputs per FFT segment.
+        max_segments (int): Segments transformed per batch; only one batch is held at a time.
+        workers (int): Threads used by scipy.fft (-1 for all cores).
+    """
+
+    def __init__(self, templates, block_size=1 << 14, max_segments=64, workers=-1):
+        self.templates = [np.asarray(t, dtype=np.complex128) for t in templates]
+        lengths = {len(t) for t in self.templates}
+        if len(lengths) != 1:
+            raise ValueError("All templates in a bank must have the same length")
+        self.template_length = lengths.pop()
+        self.norms = np.array([np.linalg.norm(t) for t in self.templates])
+        self.max_segments = max_segments
+        self.workers = workers
+
+        self.nfft = scipy.fft.next_fast_len(block_size + self.template_length - 1)
+        self.step = self.nfft - self.template_length + 1
+        self._spectra = {}
+        self._energy_engine = EnergyProfileEngine(self.template_length, mode="valid")
+
+    def spectra(self, nfft):
+        """Cached conjugate template spectra for an FFT size, shape (templates, nfft)."""
+        spectra = self._spectra.get(nfft)
+        if spectra is None:
+            spectra = np.conj(scipy.fft.fft(np.array(self.templates), nfft, axis=1))
+            self._spectra[nfft] = spectra
+        return spectra
+
+    def iter_correlate(self, signals):
+        """
+        Normalized correlation of every signal with every template, yielded signal by signal.
+
+        Segments of consecutive signals are gathered until `max_segments` are pending
+        and transformed as one batch; each signal's scores are yielded, in input order,
+        as soon as all of its segments are done. Only one batch of segments and the
+        scores of the signals it touches are held at a time, and `signals` may be a
+        lazy iterable (e.g. packet slices of a CaptureReader).
+
+        Parameters:
+            signals (iterable): Complex signals of any lengths.
+
+        Yields:
+            scores (np.ndarray): Shape (templates, len(signal) - template_length + 1), the
+            normalized correlation magnitude at each lag (empty for signals shorter than a template).
+        """
+        L, T = self.template_length, len(self.templates)
+        template_spectra = self.spectra(self.nfft)[:, None, :]
+        batch = np.zeros((self.max_segments, self.nfft), dtype=np.complex128)
+        targets = []        # (signal entry, segment index) of each batch row
+        waiting = deque()   # [signal, correlation, segments still to compute], in input order
+
+        def transform():
+            count = len(targets)
+            spectra = scipy.fft.fft(batch[:count], axis=1, workers=self.workers)
+            products = scipy.fft.ifft(spectra[None, :, :] * template_spectra, axis=2, overwrite_x=True,
+                                      workers=self.workers)
+            for row, (entry, k) in enumerate(targets):
+                entry[1][:, k] = np.abs(products[:, row, :self.step])
+                entry[2] -= 1
+            targets.clear()
+
+        for signal in signals:
+            signal = np.asarray(signal)
+            num_segments = max(0, -(-(len(signal) - L + 1) // self.step))
+            entry = [signal, np.empty((T, num_segments, self.step)), num_segments]
+            waiting.append(entry)
+            for k in range(num_segments):
+                piece = signal[k * self.step:k * self.step + self.nfft]
+                batch[len(targets), :len(piece)] = piece
+                batch[len(targets), len(piece):] = 0
+                targets.append((entry, k))
+                if len(targets) == self.max_segments:
+                    transform()
+                    while waiting and waiting[0][2] == 0:
+                        yield self._normalize(*waiting.popleft()[:2])
+            while waiting and waiting[0][2] == 0:
+                yield self._normalize(*waiting.popleft()[:2])
+
+        if targets:
+            transform()
+        while waiting:
+            yield self._normalize(*waiting.popleft()[:2])
+
+    def _normalize(self, signal, correlation):
+        num_out = len(signal) - self.template_length + 1
+        if num_out <= 0:
+            return np.zeros((len(self.templates), 0))
+        rows = correlation.reshape(len(self.templates), -1)[:, :num_out]
+        energy = self._energy_engine.compute(np.abs(signal) ** 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            normalized = rows / (self.norms[:, None] * np.sqrt(np.maximum(energy, 0))[None, :])
+        return np.nan_to_num(normalized, nan=0.0, posinf=0.0)
+
+    def correlate_batch(self, signals):
+        """
+        Normalized correlation of every signal with every template (see iter_correlate).
+
+        Returns:
+            scores (list): Per signal, an array of shape (templates, len(signal) - template_length + 1).
+        """
+        return list(self.iter_correlate(signals))
+
+    def correlate(self, signal):
+        """Normalized correlation of one signal with every template (see correlate_batch)."""
+        return self.correlate_batch([signal])[0]
+
+    def detect_batch(self, signals, threshold=0.5, min_distance=None):
+        """
+        Template matches in many signals.
+
+        A match is a local maximum of a template's normalized correlation above
+        `threshold`; matches of the same template are at least min_distance
+        (default: one template length) apart.
+
+        Returns:
+            matches (list): Per signal, a list of PatternMatch sorted by start.
+        """
+        min_distance = min_distance or self.template_length
+        matches = []
+        for scores in self.iter_correlate(signals):
+            found = []
+            for template, row in enumerate(scores):
+                peaks, properties = scipy.signal.find_peaks(row, height=threshold, distance=min_distance)
+                found.extend(PatternMatch(template, int(p), int(p) + self.template_length, float(score))
+                             for p, score in zip(peaks, properties["peak_heights"]))
+            matches.append(sorted(found, key=lambda match: match.start))
+        return matches
+
+    def detect(self, signal, threshold=0.5, min_distance=None):
+        """Template matches in one signal (see detect_batch)."""
+        return self.detect_batch([signal], threshold, min_distance)[0]
+
+
+def extract_patterns_matched(filtered_packet, bank, threshold=0.5):
+    """
+    Extract patterns from a filtered packet by matched filtering against a template bank.
+
+    Parameters:
+    - filtered_packet: The signal data after offset correction and filtering.
+    - bank: TemplateBank of reference patterns.
+    - threshold: Minimum normalized correlation (0..1) of a match.
+
+    Returns:
+    - extracted_patterns: List of extracted patterns.
+    - detected_starts: List of start indices of detected patterns.
+    - detected_ends: List of end indices of detected patterns.
+    - matches: The PatternMatch of each pattern (template index and score).
+    """
+    matches = bank.detect(filtered_packet, threshold)
+    detected_starts = [match.start for match in matches]
+    detected_ends = [match.end for match in matches]
+    extracted_patterns = [filtered_packet[match.start:match.end] for match in matches]
+    return extracted_patterns, detected_starts, detected_ends, matches
+
+
+# Example usage:
+sampling_rate = 50e6
+sync_bank = TemplateBank([zc_sync_template(600, sampling_rate), zc_sync_template(147, sampling_rate)])
+
+# Patterns of one filtered packet
+extracted_patterns, detected_starts, detected_ends, matches = extract_patterns_matched(filtered_packet, sync_bank)
+for idx, match in enumerate(matches, start=1):
+    print(f"Pattern {idx}: Root {(600, 147)[match.template]}, Start Sample = {match.start}, "
+          f"End Sample = {match.end}, Score = {match.score:.3f}")
+
+# All packets in one batched pass
+packet_matches = sync_bank.detect_batch([ocusync2_data[start_idx:end_idx] for start_idx, end_idx in packets])
+print(f"Sync symbols found: {sum(len(found) for found in packet_matches)} in {len(packets)} packets")
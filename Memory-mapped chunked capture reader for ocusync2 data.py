@@ -0,0 +1,147 @@
+import os
+import numpy as np
+
+# On-disk sample formats: (stored scalar dtype, scalars per complex sample)
+SAMPLE_FORMATS = {
+    "sc16": (np.int16, 2),          # interleaved signed 16-bit I/Q
+    "complex64": (np.complex64, 1),
+    "complex128": (np.complex128, 1),
+}
+
+
+class CaptureReader:
+    """
+    Memory-mapped reader for raw IQ capture files.
+
+    Nothing is read from disk until a sample range is accessed, so captures far
+    larger than RAM can be sliced or walked block by block. complex64 and
+    complex128 ranges are returned as zero-copy views of the memory map; sc16
+    ranges are converted to complex64 one range at a time.
+
+    Parameters:
+        filepath (str): Path to the .dat capture.
+        sample_format (str): One of "sc16", "complex64" or "complex128".
+        sampling_rate (float): Sampling rate in Hz.
+        header_bytes (int): Number of bytes to skip at the start of the file.
+        sc16_scale (float): Scale applied to sc16 samples (full scale -> 1.0).
+    """
+
+    def __init__(self, filepath, sample_format="complex64", sampling_rate=50e6, header_bytes=0, sc16_scale=1 / 32768):
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample format '{sample_format}', expected one of {list(SAMPLE_FORMATS)}")
+
+        self.filepath = filepath
+        self.sample_format = sample_format
+        self.sampling_rate = sampling_rate
+        self.header_bytes = header_bytes
+        self.sc16_scale = sc16_scale
+
+        storage_dtype, width = SAMPLE_FORMATS[sample_format]
+        bytes_per_sample = np.dtype(storage_dtype).itemsize * width
+        self.num_samples = (os.path.getsize(filepath) - header_bytes) // bytes_per_sample
+        self.dtype = np.dtype(np.complex64) if width == 2 else np.dtype(storage_dtype)
+
+        shape = (self.num_samples, width) if width == 2 else (self.num_samples,)
+        if self.num_samples == 0:
+            # np.memmap cannot map an empty region
+            self._raw = np.zeros(shape, dtype=storage_dtype)
+        else:
+            self._raw = np.memmap(filepath, dtype=storage_dtype, mode="r", offset=header_bytes, shape=shape)
+
+    def __len__(self):
+        return self.num_samples
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            # Read only the range the slice covers, then step through it (either direction)
+            index = range(*key.indices(self.num_samples))
+            if len(index) == 0:
+                return self.read(0, 0)
+            low, high = min(index[0], index[-1]), max(index[0], index[-1]) + 1
+            data = self.read(low, high)
+            return data if index.step == 1 else data[index[0] - low::index.step]
+        index = range(self.num_samples)[key]
+        return self.read(index, index + 1)[0]
+
+    @property
+    def duration(self):
+        """Capture duration in seconds."""
+        return self.num_samples / self.sampling_rate
+
+    @property
+    def nbytes(self):
+        """Size of the sample payload on disk in bytes."""
+        return self._raw.nbytes
+
+    def read(self, start=0, stop=None):
+        """
+        Return samples [start, stop) as a complex array.
+
+        Parameters:
+            start (int): First sample index.
+            stop (int): One past the last sample index (default: end of capture).
+
+        Returns:
+            samples (np.ndarray): Lazy memmap view for complex formats, a converted
+            complex64 copy of just this range for sc16.
+        """
+        stop = self.num_samples if stop is None else min(stop, self.num_samples)
+        start = max(0, min(start, stop))
+
+        raw = self._raw[start:stop]
+        if self.sample_format != "sc16":
+            return raw
+
+        samples = raw.astype(np.float32).view(np.complex64)[:, 0]
+        samples *= self.sc16_scale
+        return samples
+
+    def blocks(self, block_size, overlap=0, start=0, stop=None):
+        """
+        Iterate over the capture in fixed-size blocks.
+
+        Consecutive blocks share `overlap` samples, so block k covers
+        [start + k * (block_size - overlap), start + k * (block_size - overlap) + block_size).
+        The last block may be shorter.
+
+        Parameters:
+            block_size (int): Samples per block.
+            overlap (int): Samples shared between consecutive blocks.
+            start (int): First sample index.
+            stop (int): One past the last sample index (default: end of capture).
+
+        Yields:
+            (block_start, block): Absolute index of the first sample and the block samples.
+        """
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+        if not 0 <= overlap < block_size:
+            raise ValueError("overlap must satisfy 0 <= overlap < block_size")
+
+        stop = self.num_samples if stop is None else min(stop, self.num_samples)
+        step = block_size - overlap
+        block_start = start
+        while block_start < stop:
+            block_stop = min(block_start + block_size, stop)
+            yield block_start, self.read(block_start, block_stop)
+            if block_stop == stop:
+                break
+            block_start += step
+
+    def time_axis(self, start=0, stop=None):
+        """Time in seconds of samples [start, stop)."""
+        stop = self.num_samples if stop is None else min(stop, self.num_samples)
+        return np.arange(start, stop) / self.sampling_rate
+
+
+# Example usage:
+reader = CaptureReader("/home/sandeep/Documents/sandeep/ocusync2_50msps.dat", sample_format="complex64", sampling_rate=50e6)
+print(f"Capture: {len(reader)} samples, {reader.duration:.3f} s, {reader.nbytes / 1e9:.2f} GB on disk")
+
+# Lazy view of the first 10 ms; only these pages are read from disk
+first_10ms = reader[:int(10e-3 * reader.sampling_rate)]
+
+# Walk the capture in 1 M-sample blocks that overlap by one detection window
+window_samples = int((0.508 / 1000) * reader.sampling_rate)
+for block_start, block in reader.blocks(1 << 20, overlap=window_samples):
+    pass
@@ -0,0 +1,176 @@
+import numpy as np
+import scipy.fft
+import scipy.signal
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def design_fir(btype, cutoff, fs, numtaps=257, window='hamming'):
+    """
+    Design a linear-phase FIR filter with the window method.
+
+    Parameters:
+        btype (str): 'lowpass', 'highpass', 'bandpass' or 'bandstop'.
+        cutoff (float or tuple): Cutoff frequency, or (low, high) band edges, in Hz.
+        fs (float): Sampling rate in Hz.
+        numtaps (int): Number of taps (odd, so the group delay is a whole number of samples).
+        window (str): Window used by scipy.signal.firwin.
+
+    Returns:
+        taps (np.ndarray): Symmetric FIR coefficients.
+    """
+    if numtaps % 2 == 0:
+        raise ValueError("numtaps must be odd for a whole-sample group delay")
+    pass_zero = btype in ('lowpass', 'bandstop')
+    return scipy.signal.firwin(numtaps, cutoff, window=window, pass_zero=pass_zero, fs=fs)
+
+
+class OverlapSaveFilter:
+    """
+    Block-by-block FIR filtering with FFT fast convolution (overlap-save).
+
+    Only the last len(taps) - 1 input samples are carried between blocks, so
+    memory stays constant regardless of capture length. The FFTs of each block
+    run as one batched, multi-threaded scipy.fft call.
+
+    Parameters:
+        taps (np.ndarray): FIR coefficients.
+        block_size (int): Target number of new samples per FFT segment.
+        zero_phase (str): None for a causal filter, 'linear' to remove the group
+            delay of a symmetric (linear-phase) FIR, or 'forward-backward' to filter
+            forwards then backwards like filtfilt (batch `filter` only).
+        workers (int): Threads used by scipy.fft (-1 for all cores).
+    """
+
+    def __init__(self, taps, block_size=1 << 16, zero_phase='linear', workers=-1):
+        if zero_phase not in (None, 'linear', 'forward-backward'):
+            raise ValueError(f"Unknown zero_phase '{zero_phase}', expected None, 'linear' or 'forward-backward'")
+
+        self.taps = np.asarray(taps)
+        self.zero_phase = zero_phase
+        self.workers = workers
+
+        overlap = len(self.taps) - 1
+        self.nfft = scipy.fft.next_fast_len(block_size + overlap)
+        self.step = self.nfft - overlap
+        self.delay = overlap // 2 if zero_phase else 0
+        self._spectrum = scipy.fft.fft(self.taps, self.nfft)
+        self.reset()
+
+    def reset(self):
+        """Clear the carried input history and delay state."""
+        self._history = np.zeros(len(self.taps) - 1, dtype=np.complex128)
+        self._to_drop = self.delay
+
+    def process(self, block):
+        """
+        Filter the next block of a stream.
+
+        With zero_phase='linear' the first `delay` outputs of the stream are
+        dropped, so output sample k lines up with input sample k; call `flush`
+        at the end of the stream to emit the last `delay` samples.
+
+        Parameters:
+            block (np.ndarray): Next block of samples.
+
+        Returns:
+            filtered (np.ndarray): Filtered samples available so far.
+        """
+        overlap = len(self.taps) - 1
+        buffer = np.concatenate([self._history, block])
+        self._history = buffer[len(buffer) - overlap:]
+
+        num_out = len(block)
+        num_segments = -(-num_out // self.step)
+        if num_segments == 0:
+            return np.zeros(0, dtype=np.complex128)
+
+        padded = np.zeros(num_segments * self.step + overlap, dtype=np.complex128)
+        padded[:len(buffer)] = buffer
+        segments = sliding_window_view(padded, self.nfft)[::self.step]
+
+        spectra = scipy.fft.fft(segments, axis=1, workers=self.workers)
+        spectra *= self._spectrum
+        filtered = scipy.fft.ifft(spectra, axis=1, workers=self.workers)[:, overlap:].reshape(-1)[:num_out]
+
+        if self._to_drop:
+            dropped = min(self._to_drop, len(filtered))
+            filtered = filtered[dropped:]
+            self._to_drop -= dropped
+        return filtered
+
+    def flush(self):
+        """Emit the samples still held back by the delay compensation."""
+        tail = self.process(np.zeros(self.delay, dtype=np.complex128))
+        self.reset()
+        return tail
+
+    def stream(self, blocks):
+        """
+        Filter an iterable of blocks (e.g. from CaptureReader.blocks) lazily.
+
+        Parameters:
+            blocks (iterable): Contiguous, non-overlapping sample blocks.
+
+        Yields:
+            filtered (np.ndarray): Filtered, delay-compensated blocks.
+        """
+        if self.zero_phase == 'forward-backward':
+            raise ValueError("forward-backward filtering needs the whole signal; use zero_phase='linear' to stream")
+        for block in blocks:
+            filtered = self.process(block)
+            if len(filtered):
+                yield filtered
+        tail = self.flush()
+        if len(tail):
+            yield tail
+
+    def _run(self, data, out, reverse):
+        n = len(data)
+        written = 0
+        for start in range(0, n, self.step):
+            stop = min(n, start + self.step)
+            block = data[n - stop:n - start][::-1] if reverse else data[start:stop]
+            written = self._write(self.process(block), out, written, reverse)
+        self._write(self.flush(), out, written, reverse)
+
+    @staticmethod
+    def _write(filtered, out, written, reverse):
+        n = len(out)
+        if reverse:
+            out[n - written - len(filtered):n - written] = filtered[::-1]
+        else:
+            out[written:written + len(filtered)] = filtered
+        return written + len(filtered)
+
+    def filter(self, data, out=None):
+        """
+        Filter a whole signal block by block.
+
+        Parameters:
+            data (np.ndarray): Signal (any sliceable array, e.g. a memmap or CaptureReader).
+            out (np.ndarray): Optional output array of the same length, e.g. a writable
+                np.memmap so that nothing capture-sized is held in RAM.
+
+        Returns:
+            filtered (np.ndarray): Filtered signal aligned with the input.
+        """
+        if out is None:
+            out = np.empty(len(data), dtype=np.complex128)
+        self.reset()
+        self._run(data, out, reverse=False)
+        if self.zero_phase == 'forward-backward':
+            # The backward pass only ever writes samples it has already read
+            self._run(out, out, reverse=True)
+        return out
+
+
+# Example usage:
+reader = CaptureReader("/home/sandeep/Documents/sandeep/ocusync2_50msps.dat", sampling_rate=50e6)
+taps = design_fir('bandpass', (5e6, 24e6), reader.sampling_rate, numtaps=257)
+fir = OverlapSaveFilter(taps, block_size=1 << 18, zero_phase='linear')
+
+# Stream: reader -> overlap-save bandpass -> streaming energy detector, all in constant memory
+detector = StreamingPacketDetector(reader.sampling_rate, window_ms=0.508, threshold_factor=0.6)
+filtered_blocks = fir.stream(block for _, block in reader.blocks(1 << 22))
+packets = list(detector.iter_packets(filtered_blocks))
+print(f"Number of detected packets: {len(packets)}")
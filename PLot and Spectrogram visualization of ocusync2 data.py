@@ -1,32 +1,45 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
-def load_and_plot_spectrogram(filepath, sampling_rate=50e6):
+def load_and_plot_spectrogram(filepath, sampling_rate=50e6, sample_format="complex64", pyramid_dir=None,
+                              start_time=0.0, stop_time=None):
     """
-    Load complex64 data from a .dat file, compute, and plot the spectrogram.
+    Memory-map IQ data from a .dat file and plot its spectrogram from a tiled pyramid.
+
+    The pyramid is built on the first call (one streaming pass over the capture) and
+    reused afterwards, so only the tiles covering [start_time, stop_time) are read.
     
     Parameters:
     filepath (str): Path to the .dat file.
     sampling_rate (float): Sampling frequency in Hz. Default is 50 Msps.
+    sample_format (str): "sc16", "complex64" or "complex128". Default is complex64.
+    pyramid_dir (str): Directory of the spectrogram pyramid. Default is "<filepath>.spectrogram".
+    start_time (float): Start of the plotted window in seconds.
+    stop_time (float): End of the plotted window in seconds. Default is the end of the capture.
+
+    Returns:
+    reader (CaptureReader): Lazy, sliceable view of the capture samples.
+    time (callable): time(start, stop) -> time in seconds of samples [start, stop), computed on demand
+        (a capture-length float64 array would take twice the memory of a complex64 capture).
     """
-    # Step 1: Read the data
-    with open(filepath, "rb") as f:
-        data = np.fromfile(f, dtype=np.complex64)
+    # Step 1: Memory-map the data (pages are only read from disk when accessed)
+    reader = CaptureReader(filepath, sample_format=sample_format, sampling_rate=sampling_rate)
     
-    # Step 2: Compute and plot spectrogram
+    # Step 2: Open (or build once) the spectrogram pyramid and plot the requested window
+    pyramid = SpectrogramPyramid.open_or_build(reader, pyramid_dir or filepath + ".spectrogram")
+    times, frequencies, power = pyramid.window(start_time, stop_time)
     plt.figure(figsize=(12, 6))
-    plt.specgram(data, Fs=sampling_rate)
+    plt.pcolormesh(times, frequencies, 10 * np.log10(power.T + np.finfo(np.float32).tiny), shading='auto')
     plt.title('Spectrogram of Original Data', fontsize=14, fontweight='bold')
     plt.xlabel("Time (s)")
     plt.ylabel("Frequency (Hz)")
     plt.colorbar(label="Intensity (dB)")
     plt.show()
     
-    # Step 3: Create a time array in seconds
-    time = np.arange(len(data)) / sampling_rate
-    
-    return data, time
+    # Step 3: Time axis on demand, for the sample ranges that are actually used
+    return reader, reader.time_axis
 
 # Example usage
 samplefile = "/home/sandeep/Documents/sandeep/ocusync2_50msps.dat"
 data, time = load_and_plot_spectrogram(samplefile)
+first_ms = time(0, int(1e-3 * 50e6))
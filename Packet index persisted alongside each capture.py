@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+PACKET_INDEX_MAGIC = b"PKTIDX01"
+
+# Fixed-width, little-endian record per detected packet
+PACKET_RECORD_DTYPE = np.dtype([
+    ("start_idx", "<i8"),
+    ("end_idx", "<i8"),
+    ("offset", "<f8"),
+    ("snr_dB", "<f4"),
+    ("band_found", "?"),
+])
+
+
+def param_hash(params):
+    """Stable hash of a detection parameter dict."""
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def capture_fingerprint(filepath, num_blocks=64, block_bytes=1 << 16):
+    """
+    Cheap checksum of a capture file: its size and modification time plus a BLAKE2 digest of evenly spaced blocks.
+
+    Reads num_blocks * block_bytes bytes (4 MB by default) whatever the file size, so a
+    20 GB capture is fingerprinted in milliseconds. The sampled blocks catch a different
+    file at the same path or a truncation even when the modification time was preserved,
+    and the modification time catches an in-place edit that falls between the blocks.
+    """
+    stat = os.stat(filepath)
+    size = stat.st_size
+    digest = hashlib.blake2b(f"{size}:{stat.st_mtime_ns}".encode(), digest_size=16)
+    with open(filepath, "rb") as f:
+        for offset in np.linspace(0, max(size - block_bytes, 0), num_blocks).astype(np.int64):
+            f.seek(int(offset))
+            digest.update(f.read(block_bytes))
+    return digest.hexdigest()
+
+
+class PacketIndex:
+    """
+    Packet list of one capture, persisted in a sidecar file next to it.
+
+    The file holds a magic string, the little-endian uint32 length of a JSON header
+    (record count, parameter hash and capture fingerprint) and then the PACKET_RECORD_DTYPE records, which are
+    memory-mapped on load. A stored index is only reused when both the detection
+    parameter hash and the capture fingerprint still match.
+
+    Parameters:
+        records (np.ndarray): Structured array of PACKET_RECORD_DTYPE, sorted by start_idx.
+        sampling_rate (float): Sampling rate in Hz, used by the time queries.
+        header (dict): Metadata stored with the records.
+    """
+
+    def __init__(self, records, sampling_rate, header=None):
+        self.records = records
+        self.sampling_rate = sampling_rate
+        self.header = header or {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, key):
+        return self.records[key]
+
+    @property
+    def packets(self):
+        """(start_idx, end_idx) list, as used by the analysis scripts."""
+        return list(zip(self.records["start_idx"].tolist(), self.records["end_idx"].tolist()))
+
+    @staticmethod
+    def path_for(capture_path):
+        return capture_path + ".pktidx"
+
+    def save(self, path):
+        """Write the header and records to `path` (via a temporary file, so a crash never leaves a partial index)."""
+        header = dict(self.header, num_records=len(self.records), sampling_rate=self.sampling_rate)
+        header_bytes = json.dumps(header, sort_keys=True).encode()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(PACKET_INDEX_MAGIC)
+            f.write(np.array(len(header_bytes), dtype="<u4").tobytes())
+            f.write(header_bytes)
+            f.write(np.ascontiguousarray(self.records, dtype=PACKET_RECORD_DTYPE).tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, params=None, fingerprint=None):
+        """
+        Open a stored index, or return None when it is missing, corrupt or stale.
+
+        Parameters:
+            path (str): Sidecar file.
+            params (dict): Detection parameters the index must have been built with.
+            fingerprint (str): capture_fingerprint the capture must still have.
+
+        Returns:
+            index (PacketIndex): Index with memory-mapped records, or None.
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            if f.read(len(PACKET_INDEX_MAGIC)) != PACKET_INDEX_MAGIC:
+                return None
+            try:
+                header_length = int(np.frombuffer(f.read(4), dtype="<u4")[0])
+                header = json.loads(f.read(header_length))
+            except (ValueError, IndexError):
+                # Truncated length field or header, or a header that is not JSON
+                return None
+        if not isinstance(header, dict) or not isinstance(header.get("num_records"), int) \
+                or "sampling_rate" not in header:
+            return None
+        if params is not None and header.get("param_hash") != param_hash(params):
+            return None
+        if fingerprint is not None and header.get("fingerprint") != fingerprint:
+            return None
+
+        offset = len(PACKET_INDEX_MAGIC) + 4 + header_length
+        if os.path.getsize(path) != offset + header["num_records"] * PACKET_RECORD_DTYPE.itemsize:
+            return None
+        if header["num_records"] == 0:
+            records = np.zeros(0, dtype=PACKET_RECORD_DTYPE)
+        else:
+            records = np.memmap(path, dtype=PACKET_RECORD_DTYPE, mode="r", offset=offset,
+                                shape=(header["num_records"],))
+        return cls(records, header["sampling_rate"], header)
+
+    def in_time_range(self, start_time, stop_time):
+        """Records of packets overlapping [start_time, stop_time) seconds."""
+        start_idx = int(np.floor(start_time * self.sampling_rate))
+        stop_idx = int(np.ceil(stop_time * self.sampling_rate))
+        # Packets are sorted and do not overlap, so end_idx is sorted too
+        first = np.searchsorted(self.records["end_idx"], start_idx, side="right")
+        last = np.searchsorted(self.records["start_idx"], stop_idx, side="left")
+        return self.records[first:last]
+
+    def in_snr_range(self, min_snr_dB=-np.inf, max_snr_dB=np.inf):
+        """Records of packets whose SNR lies in [min_snr_dB, max_snr_dB]."""
+        snr = self.records["snr_dB"]
+        return self.records[(snr >= min_snr_dB) & (snr <= max_snr_dB)]
+
+
+def scan_capture(reader, params, processor, block_samples=1 << 22, numtaps=257):
+    """
+    Detect and analyze every packet of a capture and return the records for a PacketIndex.
+
+    The capture is read block by block, bandpass filtered with the overlap-save FIR
+    (the streaming form of bandpass_filter(method='fir')) and fed straight into a
+    StreamingPacketDetector; the packets then go through the batched offset / filter /
+    SNR analysis of analyze_packets, which reads them from the reader. Nothing
+    capture-sized is held in memory or written to disk.
+
+    Parameters:
+        reader (CaptureReader): Capture to scan.
+        params (dict): Detection parameters (window_ms, threshold_factor, low_cutoff, high_cutoff).
+        processor (DroneSignalProcessor): Supplies the offset band search.
+        block_samples (int): Samples read and filtered per block.
+        numtaps (int): Taps of the bandpass FIR.
+
+    Returns:
+        records (np.ndarray): Structured array of PACKET_RECORD_DTYPE, sorted by start_idx.
+    """
+    taps = design_fir('bandpass', (params["low_cutoff"], params["high_cutoff"]), reader.sampling_rate, numtaps=numtaps)
+    bandpass = OverlapSaveFilter(taps, zero_phase='linear')
+    detector = StreamingPacketDetector(reader.sampling_rate, params["window_ms"], params["threshold_factor"])
+    filtered_blocks = bandpass.stream(block for _, block in reader.blocks(block_samples))
+    packets = list(detector.iter_packets(filtered_blocks))
+
+    table = analyze_packets(reader, packets, processor, sampling_rate=reader.sampling_rate).table
+    records = np.zeros(len(packets), dtype=PACKET_RECORD_DTYPE)
+    for field in PACKET_RECORD_DTYPE.names:
+        records[field] = table[field]
+    return records
+
+
+def load_or_scan_packets(reader, params, processor, path=None):
+    """
+    Packet index of a capture, reused from its sidecar file when still valid, else rebuilt and saved.
+
+    Parameters:
+        reader (CaptureReader): Capture to index.
+        params (dict): Detection parameters (window_ms, threshold_factor, low_cutoff, high_cutoff).
+        processor (DroneSignalProcessor): Supplies the offset band search.
+        path (str): Sidecar file (default: "<capture>.pktidx").
+
+    Returns:
+        index (PacketIndex): Index of every packet in the capture.
+    """
+    path = path or PacketIndex.path_for(reader.filepath)
+    params = dict(params, sampling_rate=reader.sampling_rate, sample_format=reader.sample_format)
+    fingerprint = capture_fingerprint(reader.filepath)
+
+    index = PacketIndex.load(path, params, fingerprint)
+    if index is None:
+        header = {"param_hash": param_hash(params), "params": params, "fingerprint": fingerprint}
+        index = PacketIndex(scan_capture(reader, params, processor), reader.sampling_rate, header)
+        index.save(path)
+    return index
+
+
+# Example usage:
+reader = CaptureReader("/home/sandeep/Documents/sandeep/ocusync2_50msps.dat", sampling_rate=50e6)
+detection_params = {"window_ms": 0.508, "threshold_factor": 0.6, "low_cutoff": 5e6, "high_cutoff": 24e6}
+packet_index = load_or_scan_packets(reader, detection_params, DroneSignalProcessor(debug=False))
+packets = packet_index.packets
+
+print(f"{len(packet_index)} packets, {len(packet_index.in_snr_range(min_snr_dB=10))} with SNR >= 10 dB")
+for record in packet_index.in_time_range(0.10, 0.20):
+    print(f"Packet at {record['start_idx'] / reader.sampling_rate:.6f} s: "
+          f"Offset = {record['offset'] / 1000:.2f} kHz, SNR = {record['snr_dB']:.2f} dB")
@@ -0,0 +1,270 @@
+import heapq
+import mmap
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+from multiprocessing import shared_memory
+import numpy as np
+
+# Per-worker state: the function to run and the captures already attached in this process
+_worker_state = {"func": None, "captures": {}}
+
+
+def _init_worker(func):
+    _worker_state["func"] = func
+    _worker_state["captures"] = {}
+
+
+def _attach_capture(descriptor):
+    """Open the capture described by `descriptor` in a worker, without copying samples."""
+    captures = _worker_state["captures"]
+    if descriptor in captures:
+        return captures[descriptor][0]
+
+    # Keep only the latest capture attached, so shared memory from earlier runs is released
+    while captures:
+        _, (stale_data, stale_handle) = captures.popitem()
+        del stale_data
+        if stale_handle is not None:
+            try:
+                stale_handle.close()
+            except BufferError:
+                pass  # still referenced by the worker function; freed when that reference goes
+
+    kind = descriptor[0]
+    handle = None
+    if kind == "reader":
+        _, filepath, sample_format, sampling_rate, header_bytes, sc16_scale = descriptor
+        data = CaptureReader(filepath, sample_format=sample_format, sampling_rate=sampling_rate,
+                             header_bytes=header_bytes, sc16_scale=sc16_scale)
+    elif kind == "memmap":
+        _, filename, dtype, offset, shape = descriptor
+        data = np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape)
+    else:
+        _, name, dtype, shape = descriptor
+        handle = shared_memory.SharedMemory(name=name)
+        data = np.ndarray(shape, dtype=dtype, buffer=handle.buf)
+
+    captures[descriptor] = (data, handle)
+    return data
+
+
+def _worker_main(func, tasks, results):
+    """
+    Worker process loop: run tasks until a None task arrives.
+
+    The function arrives through fork, not pickle, so it may be defined anywhere
+    (a notebook cell, a closure, a lambda); only packets and results are pickled.
+    """
+    _init_worker(func)
+    for task_id, descriptor, capture_id, packets in iter(tasks.get, None):
+        try:
+            outcome = _worker_state["func"](_attach_capture(descriptor), packets, capture_id=capture_id)
+            results.put((task_id, outcome, None))
+        except Exception:
+            results.put((task_id, None, traceback.format_exc()))
+
+
+def file_region(data):
+    """
+    File and byte offset holding an array's samples, if it is a contiguous view of a file mapping.
+
+    Parameters:
+        data (np.ndarray): An np.memmap, a slice of one, or any other array.
+
+    Returns:
+        region (tuple): (filename, byte offset), or None if the samples are not file-backed.
+    """
+    if not isinstance(data, np.ndarray) or not data.flags.c_contiguous:
+        return None
+    root = data
+    while isinstance(root.base, np.ndarray):
+        root = root.base
+    if not isinstance(root, np.memmap) or not isinstance(root.base, mmap.mmap) or root.filename is None:
+        return None
+    address = data.__array_interface__["data"][0] - root.__array_interface__["data"][0]
+    return root.filename, root.offset + address
+
+
+def balance_packets(packets, num_tasks):
+    """
+    Split packets into tasks of roughly equal total length.
+
+    Longest packets are placed first, each into the currently lightest task
+    (longest-processing-time-first scheduling).
+
+    Parameters:
+        packets (list): (start_idx, end_idx) of each packet.
+        num_tasks (int): Number of tasks to create.
+
+    Returns:
+        tasks (list): Per task, the original packet indices (in capture order).
+    """
+    lengths = np.array([end - start for start, end in packets])
+    heap = [(0, task) for task in range(min(num_tasks, len(packets)))]
+    tasks = [[] for _ in heap]
+    for index in np.argsort(-lengths, kind="stable"):
+        load, task = heapq.heappop(heap)
+        tasks[task].append(int(index))
+        heapq.heappush(heap, (load + int(lengths[index]), task))
+    return [sorted(task) for task in tasks if task]
+
+
+class ParallelPacketExecutor:
+    """
+    Runs per-packet processing on a pool of worker processes.
+
+    Workers read the capture zero-copy: a CaptureReader, and any contiguous
+    np.memmap or slice of one, is re-opened by path in each worker; only an
+    in-memory array is copied, once, into shared memory that is kept for further
+    runs on the same array. Packets are split into length-balanced tasks (several
+    per worker, so faster workers pick up the slack) and results come back in the
+    original packet order.
+
+    Every task carries the capture identity (capture_identity in the parent), so
+    caches inside the workers, such as a PacketPipeline's, never serve results of
+    an earlier capture. Workers are forked, so func itself is never pickled; its
+    results are.
+
+    Parameters:
+        func (callable): func(data, packets, capture_id=...) -> list with one result
+            per packet, e.g. PacketPipeline(...).run.
+        workers (int): Number of worker processes (default: all cores).
+        tasks_per_worker (int): Tasks created per worker for load balancing.
+        poll_s (float): Interval at which a waiting run checks that the workers are alive.
+    """
+
+    def __init__(self, func, workers=None, tasks_per_worker=4, poll_s=1.0):
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("ParallelPacketExecutor needs the 'fork' start method")
+        self.func = func
+        self.workers = workers or os.cpu_count()
+        self.tasks_per_worker = tasks_per_worker
+        self.poll_s = poll_s
+        self._processes = []
+        self._tasks = self._results = None
+        self._shared = None  # (capture_id, descriptor, shared memory handle) of the last in-memory capture
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _start(self):
+        if self._processes:
+            return
+        context = multiprocessing.get_context("fork")
+        self._tasks, self._results = context.Queue(), context.Queue()
+        self._processes = [context.Process(target=_worker_main, args=(self.func, self._tasks, self._results),
+                                           daemon=True) for _ in range(self.workers)]
+        for process in self._processes:
+            process.start()
+
+    def _stop(self, terminate=False):
+        for process in self._processes:
+            if terminate:
+                process.terminate()
+            else:
+                self._tasks.put(None)
+        for process in self._processes:
+            process.join()
+        self._processes = []
+        if self._tasks is not None:
+            self._tasks.close()
+            self._results.close()
+            self._tasks = self._results = None
+
+    def close(self):
+        """Shut the workers down and release shared memory."""
+        self._stop()
+        self._release()
+
+    def _release(self):
+        if self._shared is not None:
+            handle = self._shared[2]
+            handle.close()
+            handle.unlink()
+            self._shared = None
+
+    def _share(self, data, capture_id):
+        if isinstance(data, CaptureReader):
+            return ("reader", data.filepath, data.sample_format, data.sampling_rate, data.header_bytes,
+                    data.sc16_scale)
+        region = file_region(data)
+        if region is not None:
+            return ("memmap", region[0], data.dtype.str, region[1], data.shape)
+
+        # In-memory array: one copy into shared memory, reused while the same capture is run again
+        if self._shared is not None and self._shared[0] == capture_id:
+            return self._shared[1]
+        self._release()
+        data = np.ascontiguousarray(data)
+        handle = shared_memory.SharedMemory(create=True, size=max(1, data.nbytes))
+        np.ndarray(data.shape, dtype=data.dtype, buffer=handle.buf)[...] = data
+        descriptor = ("shm", handle.name, data.dtype.str, data.shape)
+        self._shared = (capture_id, descriptor, handle)
+        return descriptor
+
+    def run(self, data, packets, capture_id=None):
+        """
+        Process all packets of a capture in parallel.
+
+        Parameters:
+            data: Capture samples (CaptureReader, np.memmap or np.ndarray).
+            packets (list): (start_idx, end_idx) of each packet.
+            capture_id: Identity of the capture passed on to func (default: capture_identity(data)).
+
+        Returns:
+            results (list): func's result for each packet, in input order.
+
+        Raises:
+            RuntimeError: If func raised in a worker (with the worker's traceback) or a worker
+            died. The workers are then restarted by the next run.
+        """
+        if len(packets) == 0:
+            return []
+        if capture_id is None:
+            capture_id = capture_identity(data)
+
+        descriptor = self._share(data, capture_id)
+        self._start()
+        tasks = balance_packets(packets, self.workers * self.tasks_per_worker)
+        for task_id, task in enumerate(tasks):
+            self._tasks.put((task_id, descriptor, capture_id, [packets[i] for i in task]))
+
+        results = [None] * len(packets)
+        for _ in tasks:
+            while True:
+                try:
+                    task_id, outcome, error = self._results.get(timeout=self.poll_s)
+                    break
+                except queue.Empty:
+                    if not all(process.is_alive() for process in self._processes):
+                        self._stop(terminate=True)
+                        raise RuntimeError("A worker process died while processing packets") from None
+            if error is not None:
+                self._stop(terminate=True)
+                raise RuntimeError(f"Packet processing failed in a worker:\n{error}")
+            for index, result in zip(tasks[task_id], outcome):
+                results[index] = result
+        return results
+
+
+# Example usage:
+reader = CaptureReader("/home/sandeep/Documents/sandeep/ocusync2_50msps.dat", sampling_rate=50e6)
+
+# Serial and parallel runs on this machine's cores (fresh pipelines, so neither is served from a cache)
+start = time.perf_counter()
+serial = PacketPipeline(DroneSignalProcessor(debug=False), sampling_rate=reader.sampling_rate).run(reader, packets)
+serial_s = time.perf_counter() - start
+
+pipeline = PacketPipeline(DroneSignalProcessor(debug=False), sampling_rate=reader.sampling_rate)
+with ParallelPacketExecutor(pipeline.run) as executor:
+    start = time.perf_counter()
+    results = executor.run(reader, packets)
+    parallel_s = time.perf_counter() - start
+print(f"Processed {len(results)} packets, {sum(r.band_found for r in results)} with a band: "
+      f"{serial_s:.2f} s serial, {parallel_s:.2f} s on {executor.workers} workers ({serial_s / parallel_s:.1f}x)")
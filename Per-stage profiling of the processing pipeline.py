@@ -0,0 +1,377 @@
+from collections import namedtuple
+from functools import wraps
+import json
+import threading
+import time
+import tracemalloc
+import numpy as np
+
+# One finished span: wall/CPU seconds, samples and packets processed, bytes allocated at peak
+SpanRecord = namedtuple("SpanRecord", ["name", "start", "wall", "cpu", "samples", "packets", "bytes_allocated",
+                                       "thread_id", "depth"])
+
+
+class _NullSpan:
+    """Span handed out while profiling is disabled: every operation is a no-op."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, samples=0, packets=0):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, profiler, name, samples, packets):
+        self.profiler = profiler
+        self.name = name
+        self.samples = samples
+        self.packets = packets
+        self.peak = 0
+        self.memory_start = 0
+
+    def add(self, samples=0, packets=0):
+        """Count samples / packets processed inside the span."""
+        self.samples += samples
+        self.packets += packets
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        if self.profiler.track_memory and tracemalloc.is_tracing():
+            # The peak so far belongs to the enclosing spans; fold it in before resetting
+            peak = tracemalloc.get_traced_memory()[1]
+            for span in stack:
+                span.peak = max(span.peak, peak - span.memory_start)
+            tracemalloc.reset_peak()
+            self.memory_start = tracemalloc.get_traced_memory()[0]
+        stack.append(self)
+        self.cpu_start = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.start
+        cpu = time.process_time() - self.cpu_start
+        stack = self.profiler._stack()
+        stack.pop()
+        if self.profiler.track_memory and tracemalloc.is_tracing():
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1] - self.memory_start)
+            for span in stack:
+                span.peak = max(span.peak, self.peak + self.memory_start - span.memory_start)
+        self.profiler._finish(SpanRecord(self.name, self.start, wall, cpu, self.samples, self.packets,
+                                         max(0, self.peak), threading.get_ident(), len(stack)))
+        return False
+
+
+class StageProfiler:
+    """
+    Wall time, CPU time, samples, packets and allocations per processing stage.
+
+    Stages are timed with `span` (a context manager) or `stage` (a decorator);
+    `instrument` wraps the pipeline functions of a namespace so the existing
+    scripts are profiled without editing them. Spans nest: times are inclusive
+    and a stage called inside another is also counted in the outer one.
+
+    While disabled, `span` returns a shared no-op object and instrumented
+    functions call straight through after one attribute check, so the hooks can
+    stay in place in production runs.
+
+    CPU time is process CPU time (it includes the FFT worker threads). Bytes
+    allocated is the tracemalloc peak above the allocation level at span entry,
+    recorded only with track_memory=True (tracing slows NumPy-heavy code).
+
+    Parameters:
+        enabled (bool): Record spans.
+        track_memory (bool): Record allocation peaks with tracemalloc (started on enable).
+        log_interval_s (float): In long streaming runs, log a progress summary at most this often.
+        log (callable): Receives the periodic progress lines (default: print).
+    """
+
+    def __init__(self, enabled=False, track_memory=False, log_interval_s=None, log=print):
+        self.track_memory = track_memory
+        self.log_interval_s = log_interval_s
+        self.log = log
+        self.records = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._last_log = self._origin
+        self.enabled = False
+        if enabled:
+            self.enable()
+
+    def enable(self, track_memory=None):
+        """Start recording (and tracemalloc tracing if memory is tracked)."""
+        if track_memory is not None:
+            self.track_memory = track_memory
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+        return self
+
+    def disable(self):
+        """Stop recording; records collected so far are kept."""
+        self.enabled = False
+        return self
+
+    def reset(self):
+        """Drop all records and restart the trace clock."""
+        with self._lock:
+            self.records = []
+            self._origin = self._last_log = time.perf_counter()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, samples=0, packets=0):
+        """
+        Context manager timing one stage.
+
+        Parameters:
+            name (str): Stage name.
+            samples (int): Samples processed (more can be added with span.add).
+            packets (int): Packets processed.
+
+        Returns:
+            span: Use as `with profiler.span("bandpass", samples=len(data)) as span: ...`.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, samples, packets)
+
+    def stage(self, name=None, count=None):
+        """
+        Decorator timing every call of a function as a span.
+
+        Parameters:
+            name (str): Stage name (default: the function name).
+            count (callable): count(args, result) -> (samples, packets), args without self for
+                methods; default counts the length of the first array argument as samples.
+        """
+        def decorate(func):
+            return _instrumented(func, self, name or func.__name__, count or count_first_array)
+        return decorate
+
+    def _finish(self, record):
+        with self._lock:
+            self.records.append(record)
+            if self.log_interval_s is None or record.start + record.wall - self._last_log < self.log_interval_s:
+                return
+            self._last_log = record.start + record.wall
+        self.log(self.progress_line())
+
+    def summary(self):
+        """
+        Totals per stage, slowest first.
+
+        Returns:
+            rows (list): Dicts with stage, calls, wall_s, cpu_s, samples, samples_per_s,
+            packets, mean_ms, max_ms and peak_bytes.
+        """
+        totals = {}
+        for record in list(self.records):
+            row = totals.setdefault(record.name, {"stage": record.name, "calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                                                  "samples": 0, "packets": 0, "max_ms": 0.0, "peak_bytes": 0})
+            row["calls"] += 1
+            row["wall_s"] += record.wall
+            row["cpu_s"] += record.cpu
+            row["samples"] += record.samples
+            row["packets"] += record.packets
+            row["max_ms"] = max(row["max_ms"], record.wall * 1e3)
+            row["peak_bytes"] = max(row["peak_bytes"], record.bytes_allocated)
+        for row in totals.values():
+            row["mean_ms"] = row["wall_s"] / row["calls"] * 1e3
+            row["samples_per_s"] = row["samples"] / row["wall_s"] if row["wall_s"] > 0 else 0.0
+        return sorted(totals.values(), key=lambda row: row["wall_s"], reverse=True)
+
+    def format_summary(self):
+        """Summary as a fixed-width text table."""
+        lines = [f"{'Stage':<20} {'Calls':>7} {'Wall s':>9} {'CPU s':>9} {'Mean ms':>9} {'Max ms':>9} "
+                 f"{'MS/s':>9} {'Packets':>8} {'Peak MB':>9}"]
+        for row in self.summary():
+            lines.append(f"{row['stage']:<20} {row['calls']:>7} {row['wall_s']:>9.3f} {row['cpu_s']:>9.3f} "
+                         f"{row['mean_ms']:>9.2f} {row['max_ms']:>9.2f} {row['samples_per_s'] / 1e6:>9.2f} "
+                         f"{row['packets']:>8} {row['peak_bytes'] / 1e6:>9.1f}")
+        return "\n".join(lines)
+
+    def progress_line(self):
+        """One-line running totals, as logged periodically."""
+        elapsed = time.perf_counter() - self._origin
+        stages = ", ".join(f"{row['stage']} {row['wall_s']:.2f} s ({row['samples_per_s'] / 1e6:.1f} MS/s)"
+                           for row in self.summary()[:6])
+        return f"[profile {elapsed:8.1f} s] {stages}"
+
+    def chrome_trace(self):
+        """Records as Chrome trace events (chrome://tracing, Perfetto)."""
+        events = []
+        for record in list(self.records):
+            events.append({"name": record.name, "cat": "stage", "ph": "X", "pid": 0, "tid": record.thread_id,
+                           "ts": (record.start - self._origin) * 1e6, "dur": record.wall * 1e6,
+                           "args": {"cpu_ms": record.cpu * 1e3, "samples": record.samples,
+                                    "packets": record.packets, "bytes_allocated": record.bytes_allocated}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, filepath):
+        """Write the Chrome trace JSON file."""
+        with open(filepath, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        return filepath
+
+
+def count_first_array(args, result):
+    """Samples = length of the first NumPy array argument; no packet count."""
+    for arg in args:
+        if isinstance(arg, np.ndarray):
+            return len(arg) if arg.ndim else 1, 0
+    return 0, 0
+
+
+def count_result(args, result):
+    """Samples = length of the returned array."""
+    return len(result), 0
+
+
+def count_packet(args, result):
+    """One packet per call, samples from the first array argument."""
+    return count_first_array(args, result)[0], 1
+
+
+def count_detected(args, result):
+    """Samples from the first array argument, packets = the detected (start, end) list."""
+    packets = result[0] if isinstance(result, tuple) else result
+    return count_first_array(args, result)[0], len(packets)
+
+
+def count_ragged(args, result):
+    """Samples and packets of a list of distributions."""
+    return sum(np.size(d) for d in args[0]), len(args[0])
+
+
+def count_packet_list(args, result):
+    """Samples and packets of a (data, packets) call."""
+    packets = args[1]
+    return sum(int(end) - int(start) for start, end in packets), len(packets)
+
+
+# Pipeline functions wrapped by `instrument`: qualified name -> (stage, count)
+PIPELINE_STAGES = {
+    "CaptureReader.read": ("load", count_result),
+    "bandpass_filter": ("bandpass", count_first_array),
+    "EnergyProfileEngine.compute": ("energy", count_first_array),
+    "find_runs": ("run detection", count_first_array),
+    "detect_packets_energy": ("detection", count_detected),
+    "StreamingPacketDetector.process": ("detection", count_detected),
+    "DroneSignalProcessor.estimate_offset": ("offset estimation", count_packet),
+    "DroneSignalProcessor.estimate_offset_fast": ("offset estimation", count_packet),
+    "DroneSignalProcessor.fshift": ("shift", count_packet),
+    "lowpass": ("lowpass", count_packet),
+    "dft_filter": ("lowpass", count_first_array),
+    "PacketPipeline.run": ("packet pipeline", count_packet_list),
+    "PSDService.psd": ("psd", count_packet),
+    "SNRCalculator.compute": ("snr", count_first_array),
+    "ragged_moments": ("moments", count_ragged),
+    "MomentAccumulator.update": ("moments", count_first_array),
+    "extract_patterns": ("patterns", count_packet),
+    "TemplateBank.correlate_batch": ("patterns", count_ragged),
+    "_draw_figure": ("plot", None),
+}
+
+
+def _instrumented(func, profiler, name, count, is_method=False):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+        with profiler.span(name) as span:
+            result = func(*args, **kwargs)
+            if count is not None:
+                span.add(*count(args[1:] if is_method else args, result))
+        return result
+    wrapper._profiled = True
+    return wrapper
+
+
+def instrument(namespace, profiler, stages=PIPELINE_STAGES):
+    """
+    Wrap the pipeline functions and methods found in a namespace with profiler spans.
+
+    Plain functions are replaced in the namespace dict (e.g. globals() of the
+    session running the scripts); "Class.method" entries are patched on the class.
+    Calling it again does not wrap twice.
+
+    Parameters:
+        namespace (dict): Namespace holding the pipeline definitions.
+        profiler (StageProfiler): Receives the spans.
+        stages (dict): Qualified name -> (stage name, count function).
+
+    Returns:
+        wrapped (list): Qualified names that were instrumented.
+    """
+    wrapped = []
+    for qualified_name, (stage_name, count) in stages.items():
+        owner_name, _, attribute = qualified_name.rpartition(".")
+        if owner_name:
+            owner = namespace.get(owner_name)
+            if owner is None or attribute not in vars(owner):
+                continue
+            member = vars(owner)[attribute]
+            is_static = isinstance(member, staticmethod)
+            func = member.__func__ if is_static else member
+            if getattr(func, "_profiled", False):
+                continue
+            wrapper = _instrumented(func, profiler, stage_name, count, is_method=not is_static)
+            setattr(owner, attribute, staticmethod(wrapper) if is_static else wrapper)
+        else:
+            func = namespace.get(attribute)
+            if func is None or getattr(func, "_profiled", False):
+                continue
+            namespace[attribute] = _instrumented(func, profiler, stage_name, count)
+        wrapped.append(qualified_name)
+    return wrapped
+
+
+def uninstrument(namespace, stages=PIPELINE_STAGES):
+    """Restore the original functions wrapped by `instrument`."""
+    for qualified_name in stages:
+        owner_name, _, attribute = qualified_name.rpartition(".")
+        if owner_name:
+            owner = namespace.get(owner_name)
+            member = vars(owner).get(attribute) if owner is not None else None
+            is_static = isinstance(member, staticmethod)
+            func = member.__func__ if is_static else member
+            if getattr(func, "_profiled", False):
+                setattr(owner, attribute, staticmethod(func.__wrapped__) if is_static else func.__wrapped__)
+        elif getattr(namespace.get(attribute), "_profiled", False):
+            namespace[attribute] = namespace[attribute].__wrapped__
+
+
+# Shared profiler, disabled until a run asks for it
+profiler = StageProfiler(enabled=False)
+
+
+# Example usage:
+instrument(globals(), profiler)
+profiler.enable(track_memory=True)
+
+with profiler.span("full run"):
+    filtered_data = bandpass_filter(ocusync2_data[:], sampling_rate, low_cutoff, high_cutoff)
+    packets, energy_profile, threshold = detect_packets_energy(filtered_data, sampling_rate, window_ms, threshold_factor)
+    results = PacketPipeline(DroneSignalProcessor(debug=False), sampling_rate=sampling_rate).run(ocusync2_data, packets)
+
+print(profiler.format_summary())
+profiler.write_chrome_trace("ocusync2_profile.json")
+
+# Periodic progress while streaming a large capture
+profiler.reset()
+profiler.log_interval_s = 10.0
+detector = StreamingPacketDetector(reader.sampling_rate, window_ms=0.508, threshold_factor=0.6)
+streamed_packets = list(detector.iter_packets(block for _, block in reader.blocks(1 << 22)))
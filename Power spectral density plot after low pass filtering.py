@@ -1,8 +1,7 @@
-from scipy.signal import welch, hamming
 import numpy as np
 import matplotlib.pyplot as plt
 
-def compute_psd_with_filtering(ocusync2_data, packets, fs=50e6, nfft_welch=4096, band_found=True, offset=0):
+def compute_psd_with_filtering(ocusync2_data, packets, fs=50e6, nfft_welch=PSD_NPERSEG, band_found=True, offset=0, plot=True):
     """
     Computes and plots the Power Spectral Density (PSD) for each detected packet after 
     frequency offset correction and filtering.
@@ -11,10 +10,16 @@ def compute_psd_with_filtering(ocusync2_data, packets, fs=50e6, nfft_welch=4096,
     - ocusync2_data: The input signal data (numpy array)
     - packets: A list of tuples (start_idx, end_idx) indicating detected packet indices
     - fs: Sampling frequency (default is 50 MHz)
-    - nfft_welch: Number of FFT points for Welch's method (default is 4096)
+    - nfft_welch: Number of FFT points for Welch's method (default is PSD_NPERSEG, shared with the other PSD scripts)
     - band_found: Boolean indicating if a suitable band was found for correction (default True)
     - offset: Frequency offset to correct (default 0)
+    - plot: Plot each PSD; False runs headless
+
+    Returns:
+    - psds: Dict of packet number -> PSDResult (fftshifted frequencies, PSD, mean and threshold)
     """
+    psds = {}
+    capture_id = capture_identity(ocusync2_data)
     for idx, (start_idx, end_idx) in enumerate(packets, start=1):
         # Extract corresponding signal samples for the packet
         current_packet = ocusync2_data[start_idx:end_idx]
@@ -26,30 +31,29 @@ def compute_psd_with_filtering(ocusync2_data, packets, fs=50e6, nfft_welch=4096,
             # Apply low-pass filter to the corrected packet (e.g., 8.5 MHz cutoff)
             filtered_packet, sos = lowpass(corrected_packet, 8.5e6, fs)
 
-            # Ensure data length is sufficient for Welch's method
-            if len(filtered_packet) < nfft_welch:
+            # Ensure data length is sufficient for Welch's method (FFT size snapped to a power of two)
+            if len(filtered_packet) < psd_service.fft_size(nfft_welch):
                 print(f"Insufficient data length for Welch's method in Packet {idx}")
                 continue
 
-            # Apply Hamming window
-            window = hamming(len(filtered_packet))
-            data_windowed = filtered_packet * window
-
-            # Calculate PSD using Welch's method
-            f, Pxx_den = welch(data_windowed, fs, nperseg=nfft_welch, return_onesided=False)
-
-            # Shift frequency and PSD for negative frequencies
-            Pxx_den_shifted = np.fft.fftshift(Pxx_den)
-            f_shifted = np.fft.fftshift(f)
+            # Hamming-windowed Welch PSD, shifted for negative frequencies (cached per packet and stage)
+            psd = psd_service.psd(filtered_packet, key=(start_idx, end_idx, offset), fs=fs,
+                                  stage=filter_stage("lowpass", poles=12, cutoff=8.5e6), nperseg=nfft_welch,
+                                  capture_id=capture_id)
+            Pxx_den_shifted = psd.Pxx_den
+            f_shifted = psd.f
 
             # Calculate the mean PSD value
-            mean_psd_value = np.mean(Pxx_den_shifted)
+            mean_psd_value = psd.mean
             print(f"Mean PSD Value for Packet {idx}: {mean_psd_value:.2e} V^2/Hz")
+            psds[idx] = psd
+            if not plot:
+                continue
 
             # Plot the PSD
             plt.figure(figsize=(20, 6))
             plt.semilogy(f_shifted / 1e6, Pxx_den_shifted)  # Convert frequency to MHz
-            plt.axhline(1.1 * Pxx_den_shifted.mean(), color='r', linestyle='--', label="Mean PSD")
+            plt.axhline(psd.threshold, color='r', linestyle='--', label="Mean PSD")
             plt.xlabel("Frequency [MHz]")
             plt.ylabel("PSD [V**2/Hz]")
             plt.title(f"Power Spectral Density (PSD) of Filtered Packet {idx}")
@@ -58,5 +62,7 @@ def compute_psd_with_filtering(ocusync2_data, packets, fs=50e6, nfft_welch=4096,
         else:
             print(f"Packet {idx}: No suitable band found for offset correction.")
 
+    return psds
+
 # Example usage:
-compute_psd_with_filtering(ocusync2_data, packets, fs=50e6, nfft_welch=4096, band_found=True, offset=offset)
+compute_psd_with_filtering(ocusync2_data, packets, fs=50e6, band_found=True, offset=offset)
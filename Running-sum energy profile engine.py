@@ -0,0 +1,99 @@
+import numpy as np
+
+
+class EnergyProfileEngine:
+    """
+    O(N) sliding-window energy using running (prefix) sums.
+
+    The window sum at each output sample is the difference of two prefix sums,
+    so the cost no longer grows with the window length the way a direct
+    `np.convolve` with a boxcar does. Prefix sums are accumulated in float64
+    and re-anchored to zero every `anchor_interval` output samples, so rounding
+    drift stays bounded by one anchor interval plus one window no matter how
+    long the stream is.
+
+    Parameters:
+        window_samples (int): Window length in samples.
+        mode (str): 'same' (centred window, zero-padded edges, like np.convolve mode='same')
+            or 'valid' (only windows fully inside the input).
+        anchor_interval (int): Output samples between prefix-sum re-anchors.
+        reuse_output (bool): Keep one output buffer and return views of it. Each call
+            then overwrites the result of the previous call.
+    """
+
+    def __init__(self, window_samples, mode="same", anchor_interval=1 << 20, reuse_output=False):
+        if window_samples <= 0:
+            raise ValueError("window_samples must be positive")
+        if mode not in ("same", "valid"):
+            raise ValueError(f"Unknown mode '{mode}', expected 'same' or 'valid'")
+
+        self.window_samples = int(window_samples)
+        self.mode = mode
+        self.anchor_interval = int(anchor_interval)
+        self.reuse_output = reuse_output
+
+        # Offset of the first window sample relative to the output sample
+        self._window_offset = -(self.window_samples // 2) if mode == "same" else 0
+        self._prefix = np.zeros(0)
+        self._output = np.zeros(0)
+
+    def output_length(self, num_samples):
+        """Number of energy values produced for `num_samples` input samples."""
+        if self.mode == "same":
+            return num_samples
+        return max(0, num_samples - self.window_samples + 1)
+
+    def _buffer(self, name, size):
+        buffer = getattr(self, name)
+        if len(buffer) < size:
+            buffer = np.empty(size)
+            setattr(self, name, buffer)
+        return buffer[:size]
+
+    def compute(self, power, out=None):
+        """
+        Compute the windowed energy of `power`.
+
+        Parameters:
+            power (np.ndarray): Instantaneous power |x|^2.
+            out (np.ndarray): Optional float64 array of length `output_length(len(power))`.
+
+        Returns:
+            energy (np.ndarray): Windowed energy.
+        """
+        n = len(power)
+        window = self.window_samples
+        out_len = self.output_length(n)
+
+        if out is None:
+            out = self._buffer("_output", out_len) if self.reuse_output else np.empty(out_len)
+        elif len(out) != out_len:
+            raise ValueError(f"out has length {len(out)}, expected {out_len}")
+
+        for out_start in range(0, out_len, self.anchor_interval):
+            out_stop = min(out_len, out_start + self.anchor_interval)
+            count = out_stop - out_start
+
+            # Prefix sums over (zero-padded) input positions [first, last], anchored at `anchor`
+            first = out_start + self._window_offset
+            last = out_stop - 1 + self._window_offset + window
+            anchor = max(0, first)
+            data_stop = min(last, n)
+
+            prefix = self._buffer("_prefix", count + window)
+            left = anchor - first + 1
+            middle = data_stop - anchor
+            prefix[:left] = 0.0
+            np.add.accumulate(power[anchor:data_stop], dtype=np.float64, out=prefix[left:left + middle])
+            prefix[left + middle:] = prefix[left + middle - 1]
+
+            np.subtract(prefix[window:window + count], prefix[:count], out=out[out_start:out_stop])
+
+        return out
+
+
+# Example usage:
+sampling_rate = 50e6
+window_samples = int((0.508 / 1000) * sampling_rate)
+engine = EnergyProfileEngine(window_samples, mode="same", reuse_output=True)
+energy_profile = engine.compute(np.abs(filtered_data) ** 2)
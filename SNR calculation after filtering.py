@@ -1,13 +1,77 @@
+from collections import namedtuple
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.signal import welch, hamming
+
+# Per-packet band powers and SNR for a batch of PSDs
+SNRResult = namedtuple("SNRResult", ["signal_power", "noise_power", "snr_dB"])
 
 def integrate_power(frequencies, psd, band):
-    """Integrate power over a specified frequency band."""
-    indices = (frequencies >= band[0]) & (frequencies <= band[1])
-    return np.trapz(psd[indices], frequencies[indices])
+    """Integrate power over a specified frequency band (trapezoidal, over the bins inside the band)."""
+    return float(np.asarray(psd) @ band_weights(frequencies, [band])[:, 0])
+
+def band_weights(frequencies, bands):
+    """
+    Trapezoid weights that turn a PSD into band powers with one matrix product.
+
+    Column k holds the trapezoid weights of the bins inside bands[k] = (f_low, f_high),
+    so `psd @ weights` gives the power of every band at once.
+
+    Parameters:
+        frequencies (np.ndarray): Ascending (fftshifted) frequency axis in Hz.
+        bands (list): (f_low, f_high) tuples in Hz.
+
+    Returns:
+        weights (np.ndarray): Array of shape (len(frequencies), len(bands)).
+    """
+    weights = np.zeros((len(frequencies), len(bands)))
+    for k, (low, high) in enumerate(bands):
+        start = np.searchsorted(frequencies, low, side="left")
+        stop = np.searchsorted(frequencies, high, side="right")
+        half_steps = np.diff(frequencies[start:stop]) / 2
+        weights[start:stop - 1, k] += half_steps
+        weights[start + 1:stop, k] += half_steps
+    return weights
+
+class SNRCalculator:
+    """
+    Vectorized SNR of many packets from their PSDs.
+
+    The band integration weights are built once for a frequency axis, after
+    which signal power, per-band noise power and SNR of N packets come from a
+    single (N, nfft) x (nfft, bands) product. No plotting is involved, so it can
+    run headless.
+
+    Parameters:
+        frequencies (np.ndarray): Ascending (fftshifted) frequency axis in Hz.
+        signal_band (tuple): (f_low, f_high) of the signal in Hz.
+        noise_bands (list): (f_low, f_high) of each noise band in Hz.
+    """
+
+    def __init__(self, frequencies, signal_band=(-8.5e6, 8.5e6), noise_bands=((-25e6, -8.5e6), (8.5e6, 25e6))):
+        self.frequencies = np.asarray(frequencies)
+        self.signal_band = tuple(signal_band)
+        self.noise_bands = [tuple(band) for band in noise_bands]
+        self.weights = band_weights(self.frequencies, [self.signal_band] + self.noise_bands)
+
+    def compute(self, psds):
+        """
+        Band powers and SNR of every packet.
+
+        Parameters:
+            psds (np.ndarray): fftshifted PSDs, one per row (a single 1-D PSD is also accepted).
 
-def compute_snr_and_plot_psd(processor, ocusync2_data, packets, fs=50e6, nfft_welch=2048):
+        Returns:
+            result (SNRResult): signal_power (N,), noise_power (N, noise bands) and snr_dB (N,).
+        """
+        powers = np.atleast_2d(psds) @ self.weights
+        signal_power = powers[:, 0]
+        noise_power = powers[:, 1:]
+        with np.errstate(divide="ignore"):
+            snr_dB = 10 * np.log10(signal_power / noise_power.sum(axis=1))
+        return SNRResult(signal_power, noise_power, snr_dB)
+
+def compute_snr_and_plot_psd(processor, ocusync2_data, packets, fs=50e6, nfft_welch=PSD_NPERSEG,
+                             signal_band=(-8.5e6, 8.5e6), noise_bands=((-25e6, -8.5e6), (8.5e6, 25e6)), plot=True):
     """
     Computes the SNR and plots the Power Spectral Density (PSD) for extracted packets after 
     frequency offset correction and filtering.
@@ -17,14 +81,19 @@ def compute_snr_and_plot_psd(processor, ocusync2_data, packets, fs=50e6, nfft_we
     - ocusync2_data: Raw signal data (numpy array).
     - packets: List of tuples (start_idx, end_idx) indicating detected packet indices.
     - fs: Sampling frequency in Hz (default is 50 MHz).
-    - nfft_welch: Number of FFT points for Welch's method (default is 2048).
-    """
+    - nfft_welch: Number of FFT points for Welch's method (default is PSD_NPERSEG, shared with the other PSD scripts).
+    - signal_band: (f_low, f_high) of the signal in Hz (default: +/-8.5 MHz around 0 Hz).
+    - noise_bands: (f_low, f_high) of each noise band in Hz (default: the rest of +/-25 MHz).
+    - plot: Plot each packet's PSD; False runs headless.
 
-    # Signal and noise band definitions
-    signal_band = (-8.5e6, 8.5e6)  # Signal is centered around 0 Hz
-    noise_band_lower = (-25e6, -8.5e6)
-    noise_band_upper = (8.5e6, 25e6)
+    Returns:
+    - packet_indices: 1-based index of each packet with an SNR.
+    - result: SNRResult with the signal power, noise power per band and SNR in dB of those packets.
+    """
 
+    packet_indices = []
+    psds = []
+    capture_id = capture_identity(ocusync2_data)
     for idx, (start_idx, end_idx) in enumerate(packets, start=1):
         current_packet = ocusync2_data[start_idx:end_idx]
 
@@ -39,45 +108,49 @@ def compute_snr_and_plot_psd(processor, ocusync2_data, packets, fs=50e6, nfft_we
             filtered_packet = dft_filter(corrected_packet, 8.5e6, fs)
 
             # Ensure sufficient data length for Welch's method
-            if len(filtered_packet) < nfft_welch:
+            if len(filtered_packet) < psd_service.fft_size(nfft_welch):
                 print(f"Packet {idx}: Insufficient data length for Welch's method.")
                 continue
 
-            # Apply Hamming window
-            window = hamming(len(filtered_packet))
-            data_windowed = filtered_packet * window
+            # Hamming-windowed Welch PSD, shifted for negative frequencies (cached per packet and stage)
+            psd = psd_service.psd(filtered_packet, key=(start_idx, end_idx, offset), fs=fs,
+                                  stage=filter_stage("dft_filter", cutoff=8.5e6), nperseg=nfft_welch,
+                                  capture_id=capture_id)
+            packet_indices.append(idx)
+            psds.append(psd)
+        else:
+            print(f"Packet {idx}: No suitable band found for offset correction.")
 
-            # Compute PSD using Welch's method
-            f, Pxx_den = welch(data_windowed, fs, nperseg=nfft_welch, return_onesided=False)
-            Pxx_den_shifted = np.fft.fftshift(Pxx_den)
-            f_shifted = np.fft.fftshift(f)
+    if not psds:
+        return packet_indices, SNRResult(np.zeros(0), np.zeros((0, len(noise_bands))), np.zeros(0))
 
-            # Compute signal and noise power
-            signal_power = integrate_power(f_shifted, Pxx_den_shifted, signal_band)
-            noise_power_lower = integrate_power(f_shifted, Pxx_den_shifted, noise_band_lower)
-            noise_power_upper = integrate_power(f_shifted, Pxx_den_shifted, noise_band_upper)
-            total_noise_power = noise_power_lower + noise_power_upper
+    # Signal and noise power of all packets in one pass
+    calculator = SNRCalculator(psd.f, signal_band, noise_bands)
+    result = calculator.compute(np.array([psd.Pxx_den for psd in psds]))
 
-            # Compute SNR in dB
-            snr = signal_power / total_noise_power
-            snr_dB = 10 * np.log10(snr)
-            print(f"Packet {idx}: SNR = {snr_dB:.2f} dB")
+    for row, idx in enumerate(packet_indices):
+        print(f"Packet {idx}: SNR = {result.snr_dB[row]:.2f} dB")
 
-            # Plot PSD
+        if plot:
             plt.figure(figsize=(10, 4))
-            plt.semilogy(f_shifted / 1e6, Pxx_den_shifted, label="PSD")
-            plt.axhline(1.1 * np.mean(Pxx_den_shifted), color='r', linestyle='--', label="Mean PSD")
+            plt.semilogy(psds[row].f / 1e6, psds[row].Pxx_den, label="PSD")
+            plt.axhline(psds[row].threshold, color='r', linestyle='--', label="Mean PSD")
             plt.axvspan(signal_band[0] / 1e6, signal_band[1] / 1e6, color='green', alpha=0.3, label="Signal Band")
-            plt.axvspan(noise_band_lower[0] / 1e6, noise_band_lower[1] / 1e6, color='red', alpha=0.3, label="Noise Band Lower")
-            plt.axvspan(noise_band_upper[0] / 1e6, noise_band_upper[1] / 1e6, color='blue', alpha=0.3, label="Noise Band Upper")
+            for band_idx, (low, high) in enumerate(noise_bands, start=1):
+                plt.axvspan(low / 1e6, high / 1e6, color=f"C{band_idx + 2}", alpha=0.3, label=f"Noise Band {band_idx}")
             plt.xlabel("Frequency [MHz]")
             plt.ylabel("PSD [V^2/Hz]")
             plt.title(f"Power Spectral Density (PSD) of Filtered Packet {idx}")
             plt.legend()
             plt.grid(True)
             plt.show()
-        else:
-            print(f"Packet {idx}: No suitable band found for offset correction.")
+
+    return packet_indices, result
 
 # Example usage:
 compute_snr_and_plot_psd(processor, ocusync2_data, packets)
+
+# Headless, with a custom band set
+packet_indices, snr_result = compute_snr_and_plot_psd(processor, ocusync2_data, packets, plot=False,
+                                                      signal_band=(-4.5e6, 4.5e6),
+                                                      noise_bands=[(-25e6, -10e6), (10e6, 25e6)])
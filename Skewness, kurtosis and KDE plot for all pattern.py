@@ -1,36 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
 from scipy.stats import skew, kurtosis
 
-def moment_based_skew(distribution):
-    """
-    Calculate skewness using the moment-based method.
-    Uses the magnitude of the complex signal.
-    """
-    magnitude = np.abs(distribution)
-    n = len(magnitude)
-    mean = np.mean(magnitude)
-    std = np.std(magnitude)
-
-    # Moment-based skewness formula
-    skewness = (n / ((n - 1) * (n - 2))) * np.sum(((magnitude - mean) / std) ** 3)
-    return skewness
-
-def moment_based_kurtosis(distribution):
-    """
-    Calculate kurtosis using the moment-based method.
-    Uses the magnitude of the complex signal.
-    """
-    magnitude = np.abs(distribution)
-    n = len(magnitude)
-    mean = np.mean(magnitude)
-    std = np.std(magnitude)
-
-    # Moment-based kurtosis formula (excess kurtosis)
-    kurt = (1 / n) * np.sum(((magnitude - mean) / std) ** 4) - 3
-    return kurt
-
 # Functions to classify skewness and kurtosis
 def classify_skewness(skew_value):
     if skew_value > 0:
@@ -52,11 +23,14 @@ def classify_kurtosis(kurt_value):
 skewness_values = []
 kurtosis_values = []
 
+# Skewness, kurtosis and KDE of every pattern's magnitude in one vectorized pass
+pattern_stats = ragged_moments(extracted_patterns)
+pattern_grids, pattern_densities = binned_kde_batch(extracted_patterns)
+
 # Process each extracted pattern
 for idx, pattern in enumerate(extracted_patterns):
-    # Compute skewness and kurtosis
-    skew_value = moment_based_skew(pattern)
-    kurtosis_value = moment_based_kurtosis(pattern)
+    skew_value = pattern_stats.skewness[idx]
+    kurtosis_value = pattern_stats.kurtosis[idx]
 
     # Store the values
     skewness_values.append(skew_value)
@@ -73,10 +47,7 @@ for idx, pattern in enumerate(extracted_patterns):
 
     # KDE plot for the pattern
     plt.figure(figsize=(20, 6))
-    sns.kdeplot(np.abs(pattern), shade=True)
-    plt.title(f"KDE Plot of Extracted Pattern {idx + 1}")
-    plt.xlabel("Amplitude")
-    plt.ylabel("Density")
+    plot_kde(pattern_grids[idx], pattern_densities[idx], title=f"KDE Plot of Extracted Pattern {idx + 1}")
     plt.show()
 
 
@@ -0,0 +1,209 @@
+import numpy as np
+
+
+class StreamingPacketDetector:
+    """
+    Energy-based packet detector that consumes the capture block by block.
+
+    The sliding-window energy, the noise floor estimate and any packet that is
+    still open at the end of a block are carried over to the next block, so the
+    detector works on live SDR feeds and on captures larger than RAM. Packets are
+    reported in absolute sample indices as soon as they close.
+
+    Fed the whole capture as a single final block it reproduces
+    `detect_packets_energy` exactly.
+
+    Parameters:
+        sampling_rate (float): Sampling rate in Hz.
+        window_ms (float): Energy window size in milliseconds.
+        threshold_factor (float): Multiplier applied to the noise floor estimate.
+        noise_mode (str): "running" for the mean energy seen so far, "ema" for an
+            exponentially decayed mean that follows gain changes, or "quantile" for the
+            `noise_quantile` of the energy (a robust floor that dense traffic does not
+            inflate; threshold_factor then scales the floor, so it is usually above 1).
+        noise_time_constant (float): Time constant in seconds of the "ema" noise floor.
+        noise_quantile (float): Quantile of the energy used as noise level ("quantile"); it must
+            fall in the gaps between packets, so it has to be below 1 - the traffic duty cycle.
+        noise_window_s (float): Track the quantile over this many recent seconds only
+            (default: the whole stream).
+        min_gap_ms (float): Packets separated by a gap shorter than this are merged, as with
+            `min_gap_samples` of detect_packets_energy (0 merges nothing). Set above the energy dip of OcuSync2's ~71 us
+            low-energy sync symbols, it keeps each burst in one piece; a packet is then only
+            reported once min_gap_ms of samples have passed after it.
+    """
+
+    def __init__(self, sampling_rate, window_ms, threshold_factor, noise_mode="running", noise_time_constant=1.0,
+                 noise_quantile=0.1, noise_window_s=None, min_gap_ms=0.0):
+        if noise_mode not in ("running", "ema", "quantile"):
+            raise ValueError(f"Unknown noise_mode '{noise_mode}', expected 'running', 'ema' or 'quantile'")
+
+        self.sampling_rate = sampling_rate
+        self.window_samples = int((window_ms / 1000) * sampling_rate)
+        self.threshold_factor = threshold_factor
+        self.noise_mode = noise_mode
+        self.noise_time_constant = noise_time_constant
+        self.noise_quantile = noise_quantile
+        self.noise_window_s = noise_window_s
+        self.min_gap = int((min_gap_ms / 1000) * sampling_rate)
+        self._energy_engine = EnergyProfileEngine(self.window_samples, mode="same", reuse_output=True)
+        self.reset()
+
+    def reset(self):
+        """Forget all carried state and start a new stream at sample 0."""
+        self._power = np.zeros(0)   # left context followed by samples whose energy is still pending
+        self._context = 0           # number of leading samples in _power that are context only
+        self._next_index = 0        # absolute index of the first pending sample
+        self._open_start = None     # absolute start of a packet still above threshold
+        self._held = None           # closed packet that a run starting within min_gap would extend
+        self._energy_sum = 0.0
+        self._energy_count = 0
+        self.noise_level = None
+        self.threshold = None
+        if self.noise_mode == "quantile":
+            # The energy is smooth over a window, so a few values per window describe it
+            window_count = None if self.noise_window_s is None else int(self.noise_window_s * self.sampling_rate)
+            self._noise_floor = NoiseFloorTracker(self.noise_quantile, window_count=window_count,
+                                                  stride=max(1, self.window_samples // 16))
+
+    def _update_noise_level(self, energy):
+        if self.noise_mode == "running":
+            self._energy_sum += energy.sum()
+            self._energy_count += len(energy)
+            self.noise_level = self._energy_sum / self._energy_count
+        elif self.noise_mode == "quantile":
+            self.noise_level = self._noise_floor.update(energy).level
+        else:
+            block_mean = np.mean(energy)
+            if self.noise_level is None:
+                self.noise_level = block_mean
+            else:
+                alpha = 1.0 - np.exp(-len(energy) / (self.noise_time_constant * self.sampling_rate))
+                self.noise_level += alpha * (block_mean - self.noise_level)
+        self.threshold = self.threshold_factor * self.noise_level
+
+    def process(self, block, final=False):
+        """
+        Feed the next block of samples.
+
+        Parameters:
+            block (np.ndarray): Next block of complex samples (contiguous with the previous block).
+            final (bool): True if this is the last block of the stream.
+
+        Returns:
+            packets (list): (start_index, end_index) of packets that closed in this block.
+        """
+        half_left = self.window_samples // 2
+        half_right = (self.window_samples - 1) // 2
+
+        buffer = np.concatenate([self._power, np.abs(block) ** 2])
+        pending = len(buffer) - self._context
+
+        # Energy at a sample needs half_right samples of look-ahead unless the stream ends here
+        ready = pending if final else max(0, pending - half_right)
+        if ready == 0 or len(buffer) == 0:
+            self._power = buffer
+            return self._merge_gaps(self._close_stream() if final else [], final)
+
+        energy = self._energy_engine.compute(buffer)[self._context:self._context + ready]
+        self._update_noise_level(energy)
+
+        packets = self._extract_packets(energy > self.threshold, self._next_index)
+
+        # Keep a window's worth of emitted samples as left context for the next block
+        emitted_end = self._context + ready
+        keep_from = max(0, emitted_end - half_left)
+        self._power = buffer[keep_from:]
+        self._context = emitted_end - keep_from
+        self._next_index += ready
+
+        if final:
+            packets.extend(self._close_stream())
+        return self._merge_gaps(packets, final)
+
+    def _extract_packets(self, detected, block_start):
+        starts, ends = find_runs(detected)
+        starts += block_start
+        ends += block_start
+
+        # Continue a packet left open by the previous block, or close it at the block boundary
+        if self._open_start is not None:
+            if len(starts) and starts[0] == block_start:
+                starts[0] = self._open_start
+            else:
+                starts = np.concatenate([[self._open_start], starts])
+                ends = np.concatenate([[block_start], ends])
+
+        # A run touching the end of the block stays open until a later block closes it
+        self._open_start = None
+        if detected[-1]:
+            self._open_start = int(starts[-1])
+            starts, ends = starts[:-1], ends[:-1]
+
+        return list(zip(starts.tolist(), ends.tolist()))
+
+    def _merge_gaps(self, packets, final):
+        if self.min_gap == 0:
+            return packets
+
+        # Merge closed packets (after the one held back from earlier blocks) separated by short gaps
+        merged = [self._held] if self._held is not None else []
+        for start_idx, end_idx in packets:
+            if merged and start_idx - merged[-1][1] < self.min_gap:
+                merged[-1] = (merged[-1][0], end_idx)
+            else:
+                merged.append((start_idx, end_idx))
+
+        # The last one may still be extended by the open packet, or by a run starting in the next block
+        self._held = None
+        if merged and not final:
+            if self._open_start is not None:
+                if self._open_start - merged[-1][1] < self.min_gap:
+                    self._open_start = merged.pop()[0]
+            elif self._next_index - merged[-1][1] < self.min_gap:
+                self._held = merged.pop()
+        return merged
+
+    def _close_stream(self):
+        # A packet that continues to the end of the stream ends at the last sample
+        packets = []
+        if self._open_start is not None:
+            packets.append((self._open_start, self._next_index))
+            self._open_start = None
+        return packets
+
+    def flush(self):
+        """Mark the end of the stream and return the packets that were still open."""
+        return self.process(np.zeros(0, dtype=np.complex64), final=True)
+
+    def iter_packets(self, blocks):
+        """
+        Run the detector over an iterable of blocks and yield packets as they close.
+
+        Parameters:
+            blocks (iterable): Contiguous, non-overlapping sample blocks.
+
+        Yields:
+            (start_index, end_index): Packet bounds in absolute sample indices.
+        """
+        blocks = iter(blocks)
+        current = next(blocks, None)
+        while current is not None:
+            upcoming = next(blocks, None)
+            yield from self.process(current, final=upcoming is None)
+            current = upcoming
+
+
+# Example usage:
+reader = CaptureReader("/home/sandeep/Documents/sandeep/ocusync2_50msps.dat", sampling_rate=50e6)
+detector = StreamingPacketDetector(reader.sampling_rate, window_ms=0.508, threshold_factor=0.6, noise_mode="ema")
+
+# Band-pass the stream to the 5-24 MHz band first, block by block, as the batch detection does
+bandpass = OverlapSaveFilter(design_fir('bandpass', (5e6, 24e6), reader.sampling_rate), zero_phase='linear')
+filtered_blocks = bandpass.stream(block for _, block in reader.blocks(1 << 22))
+
+streamed_packets = []
+for start_idx, end_idx in detector.iter_packets(filtered_blocks):
+    streamed_packets.append((start_idx, end_idx))
+    print(f"Packet closed: Start Time = {start_idx / reader.sampling_rate:.6f} s, "
+          f"End Time = {end_idx / reader.sampling_rate:.6f} s")
+print(f"Number of detected packets: {len(streamed_packets)}")
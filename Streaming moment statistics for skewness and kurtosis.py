@@ -0,0 +1,159 @@
+from collections import namedtuple
+import numpy as np
+
+# Summary statistics of one distribution (or one row per distribution when batched)
+MomentStats = namedtuple("MomentStats", ["n", "mean", "variance", "skewness", "kurtosis"])
+
+
+def _as_magnitude(values):
+    """Complex samples are analyzed through their magnitude, real samples as they are."""
+    values = np.asarray(values)
+    return np.abs(values) if np.iscomplexobj(values) else values.astype(np.float64, copy=False)
+
+
+def _shape_statistics(n, M2, M3, M4):
+    """Skewness and excess kurtosis from central moment sums, as the statistics scripts define them."""
+    # As floats, so a count of 1 or 2 gives NaN or inf instead of a ZeroDivisionError
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std = np.sqrt(M2 / n)
+        skewness = np.where(n > 2, n / ((n - 1) * (n - 2)) * M3 / std ** 3, np.nan)
+        kurtosis = n * M4 / M2 ** 2 - 3
+    return skewness, kurtosis
+
+
+class MomentAccumulator:
+    """
+    Single-pass, mergeable mean / variance / skewness / kurtosis.
+
+    Each chunk's central moment sums are computed in one vectorized pass and
+    merged into the running totals with Pébay's pairwise update formulas, so
+    chunks can arrive in any order, come from different workers (`merge`) or
+    stream from a capture that does not fit in memory.
+
+    Skewness is n / ((n - 1)(n - 2)) * sum(z**3) and kurtosis is mean(z**4) - 3,
+    with z standardized by the population standard deviation.
+
+    Parameters:
+        chunk_size (int): Samples processed per vectorized step, bounding temporaries.
+    """
+
+    def __init__(self, chunk_size=1 << 20):
+        self.chunk_size = chunk_size
+        self.n = 0
+        self.mean = 0.0
+        self.M2 = 0.0
+        self.M3 = 0.0
+        self.M4 = 0.0
+
+    def update(self, values):
+        """Add samples (complex samples contribute their magnitude). Returns self."""
+        values = _as_magnitude(values).ravel()
+        for start in range(0, len(values), self.chunk_size):
+            chunk = values[start:start + self.chunk_size]
+            mean = chunk.mean()
+            d = chunk - mean
+            d2 = d * d
+            self._combine(len(chunk), mean, d2.sum(), (d2 * d).sum(), (d2 * d2).sum())
+        return self
+
+    def merge(self, other):
+        """Fold another accumulator's samples into this one. Returns self."""
+        if other.n:
+            self._combine(other.n, other.mean, other.M2, other.M3, other.M4)
+        return self
+
+    def _combine(self, n_b, mean_b, M2_b, M3_b, M4_b):
+        n_a = self.n
+        if n_a == 0:
+            self.n, self.mean, self.M2, self.M3, self.M4 = n_b, mean_b, M2_b, M3_b, M4_b
+            return
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        delta_n = delta / n
+        M2_a, M3_a = self.M2, self.M3
+
+        self.M4 = (self.M4 + M4_b
+                   + delta * delta_n ** 3 * n_a * n_b * (n_a * n_a - n_a * n_b + n_b * n_b)
+                   + 6 * delta_n ** 2 * (n_a * n_a * M2_b + n_b * n_b * M2_a)
+                   + 4 * delta_n * (n_a * M3_b - n_b * M3_a))
+        self.M3 = (M3_a + M3_b
+                   + delta * delta_n ** 2 * n_a * n_b * (n_a - n_b)
+                   + 3 * delta_n * (n_a * M2_b - n_b * M2_a))
+        self.M2 = M2_a + M2_b + delta * delta_n * n_a * n_b
+        self.mean += delta_n * n_b
+        self.n = n
+
+    def result(self):
+        """Current statistics as MomentStats (variance is the population variance)."""
+        if self.n == 0:
+            return MomentStats(0, np.nan, np.nan, np.nan, np.nan)
+        skewness, kurtosis = _shape_statistics(self.n, self.M2, self.M3, self.M4)
+        return MomentStats(self.n, self.mean, self.M2 / self.n, float(skewness), float(kurtosis))
+
+
+def ragged_moments(distributions):
+    """
+    Moment statistics of many distributions of different lengths in one vectorized pass.
+
+    All samples are concatenated once and per-distribution sums are taken with
+    np.add.reduceat, so there is no Python loop over the samples of each distribution.
+
+    Parameters:
+        distributions (list): Arrays (packets or patterns); complex ones contribute their magnitude.
+
+    Returns:
+        stats (MomentStats): Arrays with one entry per distribution (NaN for empty ones).
+    """
+    lengths = np.array([np.size(d) for d in distributions], dtype=np.int64)
+    if len(lengths) == 0:
+        empty = np.zeros(0)
+        return MomentStats(lengths, empty, empty, empty, empty)
+
+    values = np.concatenate([_as_magnitude(d).ravel() for d in distributions])
+    nonempty = lengths > 0
+    edges = np.concatenate([[0], np.cumsum(lengths)[:-1]])[nonempty]
+    n = lengths[nonempty].astype(np.float64)
+
+    mean = np.add.reduceat(values, edges) / n
+    d = values - np.repeat(mean, lengths[nonempty])
+    d2 = d * d
+    M2 = np.add.reduceat(d2, edges)
+    M3 = np.add.reduceat(d2 * d, edges)
+    M4 = np.add.reduceat(d2 * d2, edges)
+    skewness, kurtosis = _shape_statistics(n, M2, M3, M4)
+
+    stats = [np.full(len(lengths), np.nan) for _ in range(4)]
+    for full, part in zip(stats, (mean, M2 / n, skewness, kurtosis)):
+        full[nonempty] = part
+    return MomentStats(lengths, *stats)
+
+
+def moment_based_skew(distribution):
+    """
+    Calculate skewness using the moment-based method.
+    Uses the magnitude of a complex signal.
+    """
+    return MomentAccumulator().update(distribution).result().skewness
+
+
+def moment_based_kurtosis(distribution):
+    """
+    Calculate excess kurtosis using the moment-based method.
+    Uses the magnitude of a complex signal.
+    """
+    return MomentAccumulator().update(distribution).result().kurtosis
+
+
+# Example usage:
+# One pass per packet, streamed block by block
+accumulator = MomentAccumulator()
+for start_idx, end_idx in packets:
+    for block_start in range(start_idx, end_idx, 1 << 20):
+        accumulator.update(ocusync2_data[block_start:min(block_start + (1 << 20), end_idx)])
+print(f"All packets: {accumulator.result()}")
+
+# All packets at once
+stats = ragged_moments([ocusync2_data[start_idx:end_idx] for start_idx, end_idx in packets])
+for idx, (skewness, kurtosis) in enumerate(zip(stats.skewness, stats.kurtosis), start=1):
+    print(f"Packet {idx}: Skewness = {skewness:.4f}, Kurtosis = {kurtosis:.4f}")
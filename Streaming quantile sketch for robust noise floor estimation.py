@@ -0,0 +1,177 @@
+from collections import deque
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Constant-memory, mergeable quantile estimate of a stream of positive values.
+
+    Values are counted in logarithmic bins (DDSketch): bin k holds values in
+    (gamma^(k-1), gamma^k] with gamma = (1 + a) / (1 - a), so every quantile is
+    returned within relative accuracy `a` whatever the distribution, and the
+    number of bins only grows with the dynamic range (about 1200 bins for 10
+    decades at 1 %). Updates are one vectorized log + bincount per batch;
+    sketches with the same accuracy merge (and subtract) by adding counts.
+
+    Parameters:
+        relative_accuracy (float): Relative error bound of the returned quantiles.
+        min_value (float): Values at or below this are counted in a zero bin.
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-300):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.min_value = min_value
+        self.counts = np.zeros(0)
+        self.offset = 0             # bin key of counts[0]
+        self.zero_count = 0.0
+        self.count = 0.0
+
+    def keys(self, values):
+        """Bin key of each value (values must be above min_value)."""
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def _grow(self, low, high):
+        if len(self.counts) == 0:
+            self.counts = np.zeros(high - low + 1)
+            self.offset = low
+            return
+        new_low, new_high = min(low, self.offset), max(high, self.offset + len(self.counts) - 1)
+        if new_low < self.offset or new_high >= self.offset + len(self.counts):
+            counts = np.zeros(new_high - new_low + 1)
+            counts[self.offset - new_low:self.offset - new_low + len(self.counts)] = self.counts
+            self.counts, self.offset = counts, new_low
+
+    def add_counts(self, keys, counts, zero_count=0.0):
+        """Add (or, with negative counts, remove) binned counts."""
+        if len(keys):
+            self._grow(int(keys.min()), int(keys.max()))
+            np.add.at(self.counts, keys - self.offset, counts)
+        self.zero_count += zero_count
+        self.count += float(np.sum(counts)) + zero_count
+
+    def binned(self, values):
+        """Bin a batch of values: (unique keys, counts per key, zero count)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        positive = values[values > self.min_value]
+        keys, counts = np.unique(self.keys(positive), return_counts=True)
+        return keys, counts.astype(np.float64), float(len(values) - len(positive))
+
+    def update(self, values):
+        """Add a batch of values. Returns self."""
+        self.add_counts(*self.binned(values))
+        return self
+
+    def merge(self, other):
+        """Fold another sketch with the same accuracy into this one. Returns self."""
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        nonzero = np.flatnonzero(other.counts)
+        self.add_counts(nonzero + other.offset, other.counts[nonzero], other.zero_count)
+        return self
+
+    def quantile(self, q):
+        """
+        Estimated q-quantile(s) of the values seen so far (NaN when empty).
+
+        Parameters:
+            q (float or np.ndarray): Quantile(s) in [0, 1].
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if self.count <= 0:
+            return np.full(q.shape, np.nan)[()]
+        rank = q * (self.count - 1)
+        cumulative = self.zero_count + np.cumsum(self.counts)
+        index = np.minimum(np.searchsorted(cumulative, rank, side="right"), len(self.counts) - 1)
+        # Middle of the bin in the relative sense, so the error is at most relative_accuracy either way
+        values = 2 * self.gamma ** (index + self.offset) / (self.gamma + 1)
+        return np.where(rank < self.zero_count, 0.0, values)[()]
+
+
+class SlidingQuantileSketch(QuantileSketch):
+    """
+    QuantileSketch over the most recent `window_count` values only.
+
+    Each update is kept as one binned segment; once the values after the
+    oldest segment alone fill the window, that segment's counts are subtracted
+    again. Quantiles therefore follow gain or noise changes within about one
+    window, with memory bounded by the bins of the segments in the window.
+
+    Parameters:
+        window_count (int): Number of most recent values the quantiles describe.
+        relative_accuracy (float): Relative error bound of the returned quantiles.
+        min_value (float): Values at or below this are counted in a zero bin.
+    """
+
+    def __init__(self, window_count, relative_accuracy=0.01, min_value=1e-300):
+        super().__init__(relative_accuracy, min_value)
+        self.window_count = window_count
+        self._segments = deque()
+
+    def update(self, values):
+        segment = self.binned(values)
+        self.add_counts(*segment)
+        self._segments.append(segment)
+        while len(self._segments) > 1 and self.count - self._segment_count(self._segments[0]) >= self.window_count:
+            keys, counts, zero_count = self._segments.popleft()
+            self.add_counts(keys, -counts, -zero_count)
+        return self
+
+    @staticmethod
+    def _segment_count(segment):
+        return float(segment[1].sum()) + segment[2]
+
+
+class NoiseFloorTracker:
+    """
+    Robust noise floor from a stream of energies or PSD bins.
+
+    The noise floor is a low quantile of everything seen (or of the last
+    `window_count` values), so strong or frequent packets do not pull it up
+    the way they pull up a mean, and it is known after every update instead of
+    after a full pass.
+
+    Parameters:
+        quantile (float): Quantile taken as the noise floor.
+        factor (float): threshold() = factor * noise floor.
+        window_count (int): Track only the most recent values (default: all values).
+        relative_accuracy (float): Relative accuracy of the sketch.
+        stride (int): Keep every stride-th value of each update (for smooth inputs such as energy profiles).
+    """
+
+    def __init__(self, quantile=0.5, factor=1.0, window_count=None, relative_accuracy=0.01, stride=1):
+        self.quantile = quantile
+        self.factor = factor
+        self.stride = stride
+        if window_count is None:
+            self.sketch = QuantileSketch(relative_accuracy)
+        else:
+            self.sketch = SlidingQuantileSketch(-(-window_count // stride), relative_accuracy)
+
+    def update(self, values):
+        """Add values. Returns self."""
+        self.sketch.update(np.asarray(values)[::self.stride])
+        return self
+
+    @property
+    def level(self):
+        """Current noise floor."""
+        return float(self.sketch.quantile(self.quantile))
+
+    def threshold(self):
+        """Current detection threshold (factor * noise floor)."""
+        return self.factor * self.level
+
+
+# Example usage:
+# Noise floor of the energy profile: median of the windowed energy, robust to dense traffic
+energy_floor = NoiseFloorTracker(quantile=0.5, stride=window_samples // 16).update(energy_profile)
+print(f"Mean energy: {np.mean(energy_profile):.4e}, median (noise floor): {energy_floor.level:.4e}")
+
+# PSD noise floor tracked over the last 64 packets for the band finder
+psd_floor = NoiseFloorTracker(quantile=0.5, factor=4.0, window_count=64 * 2048)
+processor = DroneSignalProcessor(debug=False)
+for start_idx, end_idx in packets:
+    offset, band_found = processor.estimate_offset(ocusync2_data[start_idx:end_idx], 50e6, noise_floor=psd_floor)
+    print(f"Offset = {offset / 1e3 if band_found else float('nan'):.2f} kHz, PSD floor = {psd_floor.level:.3e}")
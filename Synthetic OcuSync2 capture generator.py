@@ -0,0 +1,183 @@
+from collections import OrderedDict
+from fractions import Fraction
+import numpy as np
+import scipy.fft
+import scipy.signal
+
+# Ground truth of one generated burst
+BURST_DTYPE = np.dtype([
+    ("start_idx", np.int64),
+    ("end_idx", np.int64),
+    ("offset", np.float64),
+    ("snr_dB", np.float64),
+    ("pattern_starts", np.int64, (2,)),
+])
+
+
+class SyntheticOcuSync2:
+    """
+    Deterministic generator of OcuSync2-like captures with known ground truth.
+
+    Each burst is a train of OFDM symbols (QPSK on `num_subcarriers` 15 kHz
+    subcarriers of a 1024-point FFT at 15.36 Msps, with a cyclic prefix),
+    resampled to the capture rate and shifted to its carrier offset. Two of the
+    symbols are the ZC sync symbols (roots 600 and 147), transmitted
+    `pattern_gain` below the data symbols, which gives the ~70 us low-energy
+    patterns the pattern extraction looks for. Bursts start every
+    `burst_spacing_s` (plus jitter) in complex Gaussian noise.
+
+    Every burst and every noise chunk is drawn from its own seeded generator, so
+    any sample range can be produced independently and captures of any size are
+    written in constant memory with identical contents on every run.
+
+    Parameters:
+        sampling_rate (float): Capture sampling rate in Hz.
+        seed (int): Seed of all random draws.
+        offsets (tuple): Carrier offsets in Hz, cycled through burst by burst.
+        snr_dB (tuple): Burst SNRs (signal power over full-band noise power), cycled like offsets.
+        burst_spacing_s (float): Nominal time between burst starts in seconds.
+        jitter_s (float): Maximum random delay added to each burst start in seconds.
+        symbols_per_burst (int): OFDM symbols per burst.
+        pattern_symbols (tuple): Symbol positions of the two ZC sync symbols.
+        pattern_gain (float): Amplitude of the sync symbols relative to the data symbols.
+        noise_power (float): Mean |noise|^2 per sample.
+        num_subcarriers (int): Occupied subcarriers (601 = 9 MHz, including the nulled DC).
+        chunk_samples (int): Noise is drawn per chunk of this many samples.
+        max_cached_bursts (int): Burst waveforms kept by this generator for reuse.
+    """
+
+    SOURCE_RATE = 15.36e6
+    NFFT = 1024
+    CP_LENGTH = 72
+
+    def __init__(self, sampling_rate=50e6, seed=0, offsets=(-9.5e6, -12e6, -15.2e6), snr_dB=(20.0, 12.0, 5.0),
+                 burst_spacing_s=2e-3, jitter_s=2e-4, symbols_per_burst=9, pattern_symbols=(3, 5),
+                 pattern_gain=0.05, noise_power=1e-4, num_subcarriers=601, chunk_samples=1 << 20,
+                 max_cached_bursts=64):
+        self.sampling_rate = sampling_rate
+        self.seed = seed
+        self.offsets = tuple(offsets)
+        self.snr_dB = tuple(snr_dB)
+        self.burst_spacing = int(burst_spacing_s * sampling_rate)
+        self.jitter = int(jitter_s * sampling_rate)
+        self.symbols_per_burst = symbols_per_burst
+        self.pattern_symbols = tuple(pattern_symbols)
+        self.pattern_gain = pattern_gain
+        self.noise_power = noise_power
+        self.num_subcarriers = num_subcarriers
+        self.chunk_samples = chunk_samples
+        self.max_cached_bursts = max_cached_bursts
+        self._bursts = OrderedDict()
+
+        ratio = Fraction(sampling_rate / self.SOURCE_RATE).limit_denominator(10000)
+        self._up, self._down = ratio.numerator, ratio.denominator
+        symbol_samples = (self.NFFT + self.CP_LENGTH) * self._up / self._down
+        self.burst_samples = int(np.ceil(symbols_per_burst * symbol_samples))
+        self._symbol_starts = (np.arange(symbols_per_burst) * symbol_samples).astype(np.int64)
+        if self.burst_samples + self.jitter >= self.burst_spacing:
+            raise ValueError("burst_spacing_s is too short for the burst length plus jitter")
+
+    def _rng(self, *stream):
+        return np.random.default_rng([self.seed, *stream])
+
+    def burst_start(self, index):
+        """First sample of burst `index` (always within [index, index + 1) * burst spacing)."""
+        return index * self.burst_spacing + int(self._rng(1, index).integers(0, self.jitter + 1))
+
+    def schedule(self, num_samples):
+        """
+        Ground truth of every burst that fits completely in the first num_samples samples.
+
+        Returns:
+            bursts (np.ndarray): Structured array of BURST_DTYPE (start/end sample, offset,
+            SNR and the start samples of the two sync patterns).
+        """
+        count = -(-num_samples // self.burst_spacing)
+        bursts = np.zeros(count, dtype=BURST_DTYPE)
+        for i in range(count):
+            start = self.burst_start(i)
+            bursts[i] = (start, start + self.burst_samples, self.offsets[i % len(self.offsets)],
+                         self.snr_dB[i % len(self.snr_dB)], start + self._symbol_starts[list(self.pattern_symbols)])
+        return bursts[bursts["end_idx"] <= num_samples]
+
+    def burst(self, index):
+        """Waveform of burst `index` at its carrier offset and SNR (cached per generator, LRU)."""
+        waveform = self._bursts.get(index)
+        if waveform is None:
+            waveform = self._burst_waveform(index)
+            self._bursts[index] = waveform
+            while len(self._bursts) > self.max_cached_bursts:
+                self._bursts.popitem(last=False)
+        self._bursts.move_to_end(index)
+        return waveform
+
+    def _burst_waveform(self, index):
+        rng = self._rng(2, index)
+        half = self.num_subcarriers // 2
+        carriers = np.arange(-half, half + 1) % self.NFFT
+
+        symbols = []
+        for k in range(self.symbols_per_burst):
+            spectrum = np.zeros(self.NFFT, dtype=np.complex128)
+            if k in self.pattern_symbols:
+                root = (600, 147)[self.pattern_symbols.index(k)]
+                spectrum[carriers] = self.pattern_gain * zadoff_chu(root, self.num_subcarriers)
+            else:
+                spectrum[carriers] = np.exp(1j * (np.pi / 4 + np.pi / 2 * rng.integers(0, 4, len(carriers))))
+            spectrum[0] = 0
+            symbol = scipy.fft.ifft(spectrum) * np.sqrt(self.NFFT / len(carriers))
+            symbols.append(np.concatenate([symbol[-self.CP_LENGTH:], symbol]))
+
+        waveform = scipy.signal.resample_poly(np.concatenate(symbols), self._up, self._down)
+        waveform = np.resize(waveform, self.burst_samples)
+
+        offset = self.offsets[index % len(self.offsets)]
+        snr_dB = self.snr_dB[index % len(self.snr_dB)]
+        data_power = np.mean(np.abs(waveform) ** 2) * self.symbols_per_burst / (
+            self.symbols_per_burst - len(self.pattern_symbols) * (1 - self.pattern_gain ** 2))
+        gain = np.sqrt(self.noise_power * 10 ** (snr_dB / 10) / data_power)
+        n = np.arange(self.burst_samples)
+        return (gain * waveform * np.exp(2j * np.pi * offset * n / self.sampling_rate)).astype(np.complex64)
+
+    def generate(self, start, stop):
+        """
+        Samples [start, stop) of the capture, as complex64.
+
+        Any range can be generated on its own; overlapping requests return identical samples.
+        """
+        out = np.empty(stop - start, dtype=np.complex64)
+        scale = np.sqrt(self.noise_power / 2)
+        for chunk in range(start // self.chunk_samples, -(-stop // self.chunk_samples)):
+            chunk_start = chunk * self.chunk_samples
+            noise = self._rng(0, chunk).standard_normal((self.chunk_samples, 2), dtype=np.float32)
+            noise = noise.view(np.complex64)[:, 0] * np.float32(scale)
+            lo, hi = max(start, chunk_start), min(stop, chunk_start + self.chunk_samples)
+            out[lo - start:hi - start] = noise[lo - chunk_start:hi - chunk_start]
+
+        # Bursts start within their own spacing slot, so only the slots overlapping [start, stop) can contribute
+        for index in range(max(0, start // self.burst_spacing - 1), -(-stop // self.burst_spacing)):
+            burst_start = self.burst_start(index)
+            lo, hi = max(start, burst_start), min(stop, burst_start + self.burst_samples)
+            if lo < hi:
+                out[lo - start:hi - start] += self.burst(index)[lo - burst_start:hi - burst_start]
+        return out
+
+    def write(self, filepath, num_samples, block_samples=1 << 22):
+        """
+        Write a complex64 capture of num_samples samples in constant memory.
+
+        Returns:
+            bursts (np.ndarray): Ground truth of the written capture (see schedule).
+        """
+        with open(filepath, "wb") as f:
+            for start in range(0, num_samples, block_samples):
+                self.generate(start, min(start + block_samples, num_samples)).tofile(f)
+        return self.schedule(num_samples)
+
+
+# Example usage:
+generator = SyntheticOcuSync2(sampling_rate=50e6, seed=0)
+truth = generator.write("synthetic_ocusync2_50msps.dat", num_samples=int(0.1 * 50e6))
+print(f"Wrote {len(truth)} bursts; first at {truth[0]['start_idx'] / 50e6 * 1e3:.3f} ms, "
+      f"offset {truth[0]['offset'] / 1e6:.2f} MHz, SNR {truth[0]['snr_dB']:.1f} dB")
+ocusync2_data = CaptureReader("synthetic_ocusync2_50msps.dat", sampling_rate=50e6)
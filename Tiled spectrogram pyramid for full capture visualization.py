@@ -0,0 +1,208 @@
+import json
+import os
+import shutil
+import numpy as np
+import scipy.fft
+from scipy.signal import get_window
+
+PYRAMID_VERSION = 1
+
+
+def pool_rows(mean, peak, counts, factor):
+    """
+    Pool consecutive groups of `factor` rows (the last group may be shorter).
+
+    Parameters:
+        mean (np.ndarray): Mean power per row, shape (rows, bins).
+        peak (np.ndarray): Maximum power per row, shape (rows, bins).
+        counts (np.ndarray): Number of FFT frames behind each row.
+        factor (int): Rows per pooled row.
+
+    Returns:
+        (mean, peak, counts): Count-weighted mean, maximum and frame count of each pooled row.
+    """
+    edges = np.arange(0, len(counts), factor)
+    pooled_counts = np.add.reduceat(counts, edges)
+    pooled_mean = np.add.reduceat(mean * counts[:, None], edges, axis=0) / pooled_counts[:, None]
+    pooled_peak = np.maximum.reduceat(peak, edges, axis=0)
+    return pooled_mean.astype(np.float32), pooled_peak, pooled_counts
+
+
+class SpectrogramPyramid:
+    """
+    Multi-resolution spectrogram of a whole capture, stored on disk as tiles.
+
+    Built in one streaming pass: the capture is cut into nfft-sample frames, each
+    level-0 row pools `frames_per_row` frame power spectra (mean and max), and
+    every further level pools `factor` rows of the level below. Each level is a
+    sequence of .npy tiles of `tile_rows` rows (one for the mean, one for the
+    peak), so viewing a time window only memory-maps the tiles it overlaps.
+    meta.json records the capture's size and mtime, so re-opening an unchanged
+    capture reuses the pyramid.
+
+    Parameters:
+        directory (str): Directory holding meta.json and the level_XX tile folders.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.directory = directory
+        self.nfft = self.meta["nfft"]
+        self.sampling_rate = self.meta["capture"]["sampling_rate"]
+        self.tile_rows = self.meta["tile_rows"]
+        self.levels = self.meta["levels"]
+        self.frequencies = np.fft.fftshift(np.fft.fftfreq(self.nfft, 1 / self.sampling_rate))
+
+    @staticmethod
+    def capture_signature(reader):
+        """Identity of a capture file: path, size, mtime and sample layout."""
+        stat = os.stat(reader.filepath)
+        return {"filepath": os.path.abspath(reader.filepath), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "sample_format": reader.sample_format, "sampling_rate": reader.sampling_rate,
+                "header_bytes": reader.header_bytes}
+
+    @classmethod
+    def open_or_build(cls, reader, directory, nfft=1024, frames_per_row=16, factor=4, tile_rows=4096,
+                      chunk_frames=8192):
+        """
+        Open the pyramid in `directory` if it was built from this capture with these parameters, else build it.
+
+        Parameters:
+            reader (CaptureReader): Capture to visualize.
+            directory (str): Pyramid directory.
+            nfft (int): FFT size (frequency bins).
+            frames_per_row (int): FFT frames pooled into one level-0 row.
+            factor (int): Rows pooled into one row of the next level.
+            tile_rows (int): Rows per tile file (a multiple of factor).
+            chunk_frames (int): FFT frames read and transformed per step while building.
+
+        Returns:
+            pyramid (SpectrogramPyramid): The opened pyramid.
+        """
+        params = {"nfft": nfft, "frames_per_row": frames_per_row, "factor": factor, "tile_rows": tile_rows}
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if (meta.get("version") == PYRAMID_VERSION and meta.get("complete")
+                    and meta["capture"] == cls.capture_signature(reader)
+                    and all(meta[key] == value for key, value in params.items())):
+                return cls(directory)
+        cls.build(reader, directory, chunk_frames=chunk_frames, **params)
+        return cls(directory)
+
+    @classmethod
+    def build(cls, reader, directory, nfft=1024, frames_per_row=16, factor=4, tile_rows=4096, chunk_frames=8192):
+        """Stream the capture once and write every level of the pyramid (see open_or_build for parameters)."""
+        if tile_rows % factor:
+            raise ValueError("tile_rows must be a multiple of factor")
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+
+        window = get_window('hann', nfft).astype(np.float32)
+        scale = 1.0 / (reader.sampling_rate * (window ** 2).sum())
+        chunk_frames = max(frames_per_row, chunk_frames - chunk_frames % frames_per_row)
+
+        # Rows per level; the top level is the first that fits in a single tile
+        num_frames = len(reader) // nfft
+        level_rows = [-(-num_frames // frames_per_row)]
+        while level_rows[-1] > tile_rows:
+            level_rows.append(-(-level_rows[-1] // factor))
+        for level in range(len(level_rows)):
+            os.makedirs(os.path.join(directory, f"level_{level:02d}"))
+
+        # Per level: rows not yet written as a tile (mean, peak, counts) and the number of tiles written
+        buffers = [None] * len(level_rows)
+        tiles_written = [0] * len(level_rows)
+
+        def write_tile(level, mean, peak, counts):
+            level_dir = os.path.join(directory, f"level_{level:02d}")
+            np.save(os.path.join(level_dir, f"mean_{tiles_written[level]:06d}.npy"), mean)
+            np.save(os.path.join(level_dir, f"peak_{tiles_written[level]:06d}.npy"), peak)
+            tiles_written[level] += 1
+            if level + 1 < len(level_rows):
+                push(level + 1, *pool_rows(mean, peak, counts, factor))
+
+        def push(level, mean, peak, counts):
+            if buffers[level] is not None:
+                mean, peak, counts = [np.concatenate(pair) for pair in zip(buffers[level], (mean, peak, counts))]
+            while len(counts) >= tile_rows:
+                write_tile(level, mean[:tile_rows], peak[:tile_rows], counts[:tile_rows])
+                mean, peak, counts = mean[tile_rows:], peak[tile_rows:], counts[tile_rows:]
+            buffers[level] = (mean, peak, counts)
+
+        # Step 1: Level 0 from pooled FFT frame power spectra, one chunk of frames at a time
+        for first_frame in range(0, num_frames, chunk_frames):
+            last_frame = min(first_frame + chunk_frames, num_frames)
+            frames = np.asarray(reader.read(first_frame * nfft, last_frame * nfft)).reshape(-1, nfft) * window
+            power = np.abs(scipy.fft.fft(frames, axis=1, workers=-1)) ** 2 * scale
+            power = np.fft.fftshift(power, axes=1).astype(np.float32)
+            push(0, *pool_rows(power, power, np.ones(len(power), dtype=np.int64), frames_per_row))
+
+        # Step 2: Flush the partial last tile of each level, finest first so it feeds the next level
+        for level in range(len(level_rows)):
+            if buffers[level] is not None and len(buffers[level][2]):
+                write_tile(level, *buffers[level])
+                buffers[level] = None
+
+        levels = [{"rows": rows, "tiles": tiles, "samples_per_row": nfft * frames_per_row * factor ** level}
+                  for level, (rows, tiles) in enumerate(zip(level_rows, tiles_written))]
+
+        meta = {"version": PYRAMID_VERSION, "complete": True, "capture": cls.capture_signature(reader),
+                "nfft": nfft, "frames_per_row": frames_per_row, "factor": factor, "tile_rows": tile_rows,
+                "levels": levels}
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def select_level(self, start_time, stop_time, max_rows):
+        """Finest level that shows [start_time, stop_time) in at most max_rows rows."""
+        for level, info in enumerate(self.levels):
+            rows = (stop_time - start_time) * self.sampling_rate / info["samples_per_row"]
+            if rows <= max_rows:
+                return level
+        return len(self.levels) - 1
+
+    def window(self, start_time=0.0, stop_time=None, max_rows=2000, stat="mean", level=None):
+        """
+        Spectrogram rows covering a time window, read from only the overlapping tiles.
+
+        Parameters:
+            start_time (float): Window start in seconds.
+            stop_time (float): Window end in seconds (default: end of capture).
+            max_rows (int): Resolution budget used to pick the level.
+            stat (str): "mean" (average power) or "peak" (max-hold power).
+            level (int): Force a level instead of choosing one from max_rows.
+
+        Returns:
+            times (np.ndarray): Start time of each returned row in seconds.
+            frequencies (np.ndarray): Frequency of each bin in Hz (fftshifted).
+            power (np.ndarray): Power spectral density, shape (rows, nfft).
+        """
+        if stat not in ("mean", "peak"):
+            raise ValueError(f"Unknown stat '{stat}', expected 'mean' or 'peak'")
+        duration = self.levels[0]["rows"] * self.levels[0]["samples_per_row"] / self.sampling_rate
+        stop_time = duration if stop_time is None else min(stop_time, duration)
+        level = self.select_level(start_time, stop_time, max_rows) if level is None else level
+        info = self.levels[level]
+
+        row_seconds = info["samples_per_row"] / self.sampling_rate
+        first_row = max(0, int(start_time // row_seconds))
+        stop_row = min(info["rows"], int(np.ceil(stop_time / row_seconds)))
+
+        parts = []
+        for tile in range(first_row // self.tile_rows, -(-stop_row // self.tile_rows)):
+            path = os.path.join(self.directory, f"level_{level:02d}", f"{stat}_{tile:06d}.npy")
+            rows = np.load(path, mmap_mode="r")
+            offset = tile * self.tile_rows
+            parts.append(rows[max(first_row - offset, 0):stop_row - offset])
+        power = np.concatenate(parts) if parts else np.zeros((0, self.nfft), dtype=np.float32)
+        return np.arange(first_row, first_row + len(power)) * row_seconds, self.frequencies, power
+
+
+# Example usage:
+reader = CaptureReader("/home/sandeep/Documents/sandeep/ocusync2_50msps.dat", sampling_rate=50e6)
+pyramid = SpectrogramPyramid.open_or_build(reader, reader.filepath + ".spectrogram")
+times, frequencies, power = pyramid.window(0.10, 0.12, stat="peak")
+print(f"{len(pyramid.levels)} levels, zoomed window: {power.shape[0]} rows x {power.shape[1]} bins")
@@ -0,0 +1,100 @@
+import numpy as np
+
+
+def find_runs(mask):
+    """
+    Find runs of consecutive True values in a boolean array.
+
+    Parameters:
+        mask (np.ndarray): Boolean array.
+
+    Returns:
+        starts (np.ndarray): Index of the first sample of each run.
+        ends (np.ndarray): Index one past the last sample of each run.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if len(mask) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # Every change of value is a run edge; runs touching the array ends get an implicit edge there
+    edges = np.flatnonzero(mask[1:] != mask[:-1]) + 1
+    head = [0] if mask[0] else []
+    tail = [len(mask)] if mask[-1] else []
+    boundaries = np.concatenate([head, edges, tail]).astype(np.int64)
+    return boundaries[0::2], boundaries[1::2]
+
+
+def detect_runs(values, on_threshold, off_threshold=None, below=False, min_run=1, min_gap=0, max_length=None):
+    """
+    Detect runs where a signal crosses a threshold, with hysteresis and run clean-up.
+
+    A run starts at the first sample beyond `on_threshold` and continues while the
+    signal stays beyond `off_threshold`. Runs separated by fewer than `min_gap`
+    samples are merged, runs shorter than `min_run` samples are dropped, and runs
+    longer than `max_length` samples are truncated.
+
+    Parameters:
+        values (np.ndarray): Signal to threshold (e.g. an energy profile).
+        on_threshold (float): Threshold that opens a run.
+        off_threshold (float): Threshold that closes a run (default: on_threshold).
+        below (bool): Detect runs below the thresholds instead of above them.
+        min_run (int): Minimum run length in samples.
+        min_gap (int): Runs separated by fewer samples than this are merged.
+        max_length (int): Maximum run length in samples (default: unlimited).
+
+    Returns:
+        starts (np.ndarray): Index of the first sample of each run.
+        ends (np.ndarray): Index one past the last sample of each run.
+    """
+    if off_threshold is None:
+        off_threshold = on_threshold
+
+    if below:
+        starts, ends = find_runs(values < off_threshold)
+    else:
+        starts, ends = find_runs(values > off_threshold)
+
+    # Hysteresis: move each start to the first sample that also crosses the on threshold
+    if off_threshold != on_threshold and len(starts):
+        triggers = np.flatnonzero(values < on_threshold if below else values > on_threshold)
+        first = np.searchsorted(triggers, starts)
+        first_trigger = np.append(triggers, len(values))[first]
+        keep = first_trigger < ends
+        starts, ends = first_trigger[keep], ends[keep]
+
+    return clean_runs(starts, ends, min_run=min_run, min_gap=min_gap, max_length=max_length)
+
+
+def clean_runs(starts, ends, min_run=1, min_gap=0, max_length=None):
+    """
+    Merge runs separated by fewer than `min_gap` samples, then drop runs shorter than
+    `min_run` and truncate runs longer than `max_length` (as in detect_runs).
+
+    Returns:
+        starts (np.ndarray): Index of the first sample of each run.
+        ends (np.ndarray): Index one past the last sample of each run.
+    """
+    # Merge runs separated by short gaps
+    if min_gap > 0 and len(starts) > 1:
+        separate = (starts[1:] - ends[:-1]) >= min_gap
+        starts = starts[np.concatenate([[True], separate])]
+        ends = ends[np.concatenate([separate, [True]])]
+
+    # Drop short runs and truncate long ones
+    if min_run > 1:
+        keep = (ends - starts) >= min_run
+        starts, ends = starts[keep], ends[keep]
+    if max_length is not None:
+        ends = np.minimum(ends, starts + max_length)
+
+    return starts, ends
+
+
+# Example usage:
+energy_profile = EnergyProfileEngine(int((0.508 / 1000) * 50e6)).compute(np.abs(filtered_data) ** 2)
+threshold = 0.6 * np.mean(energy_profile)
+
+# Open a packet at the threshold, close it only once energy falls to 80 % of it,
+# and merge packets separated by less than 10 us
+starts, ends = detect_runs(energy_profile, threshold, off_threshold=0.8 * threshold, min_gap=500)
+print(f"Number of detected packets: {len(starts)}")
@@ -1,7 +1,21 @@
 import numpy as np
 import matplotlib.pyplot as plt
+import scipy.signal
 
-def visualize_detected_packets(ocusync2_data, packets, sampling_rate):
+def packet_spectrogram(current_packet, sampling_rate, nperseg=256, noverlap=128):
+    """
+    Two-sided spectrogram of one packet, with frequencies in increasing order.
+
+    Returns:
+    - f: Frequencies (Hz), fftshifted
+    - t: Segment times (s)
+    - Sxx: Power spectral density per frequency and segment
+    """
+    f, t, Sxx = scipy.signal.spectrogram(np.asarray(current_packet), fs=sampling_rate, nperseg=nperseg,
+                                         noverlap=noverlap, return_onesided=False, mode="psd")
+    return np.fft.fftshift(f), t, np.fft.fftshift(Sxx, axes=0)
+
+def visualize_detected_packets(ocusync2_data, packets, sampling_rate, plot=True):
     """
     This function visualizes detected signal packets by plotting their spectrograms and 
     printing details such as start time, end time, duration, and number of samples.
@@ -10,18 +24,23 @@ def visualize_detected_packets(ocusync2_data, packets, sampling_rate):
     - ocusync2_data: The input signal data (numpy array)
     - packets: A list of tuples (start_idx, end_idx) indicating detected packet indices
     - sampling_rate: The sampling rate of the signal (Hz)
+    - plot: Plot each spectrogram; False runs headless
+
+    Returns:
+    - spectrograms: Dict of packet number -> (f, t, Sxx) from packet_spectrogram
     """
+    spectrograms = {}
     # Loop through all detected signal packets
     for i, (start_idx, end_idx) in enumerate(packets):
-        # Extract the current packet
-        current_packet = ocusync2_data[start_idx:end_idx]
-
-        # Create a time array for the current packet
-        current_packet_time = np.arange(len(current_packet)) / sampling_rate
+        # Spectrogram of the current packet
+        f, t, Sxx = packet_spectrogram(ocusync2_data[start_idx:end_idx], sampling_rate)
+        spectrograms[i + 1] = (f, t, Sxx)
+        if not plot:
+            continue
 
         # Plot the spectrogram of the current packet
         plt.figure(figsize=(20, 6))
-        plt.specgram(current_packet, NFFT=256, Fs=sampling_rate, noverlap=128, cmap='viridis', scale='dB')
+        plt.pcolormesh(t, f, 10 * np.log10(Sxx + np.finfo(float).tiny), shading="auto", cmap='viridis')
         plt.title(f"Spectrogram of Detected Packet {i + 1}")
         plt.xlabel("Time [s]")
         plt.ylabel("Frequency [Hz]")
@@ -45,5 +64,7 @@ def visualize_detected_packets(ocusync2_data, packets, sampling_rate):
         print(f"Packet {idx}: Start Time = {start_time:.6f} s, End Time = {end_time:.6f} s, "
               f"Duration = {duration:.6f} s, Number of Samples = {num_samples}")
 
+    return spectrograms
+
 # Example usage:
 visualize_detected_packets(ocusync2_data, packets, sampling_rate)
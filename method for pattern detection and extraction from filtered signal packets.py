@@ -30,32 +30,12 @@ def extract_patterns(filtered_packet, energy_threshold, pattern_length, window_s
     # Smooth the energy curve
     smoothed_energy = smooth_energy_curve(energy_per_sample, window_size)
 
-    # Detect patterns based on energy threshold
-    detected_starts = []
-    detected_ends = []
-    extracted_patterns = []
-
-    below_threshold = np.where(smoothed_energy < energy_threshold)[0]
-    current_start = None
-
-    for i in range(1, len(below_threshold)):
-        if below_threshold[i] != below_threshold[i - 1] + 1:
-            # End of a low-energy region
-            if current_start is not None:
-                drop_duration = below_threshold[i - 1] - current_start + 1
-                if drop_duration >= pattern_length:
-                    end_sample = current_start + pattern_length
-                    detected_starts.append(current_start)
-                    detected_ends.append(end_sample)
-                    extracted_patterns.append(filtered_packet[current_start:end_sample])
-            # Start a new region
-            current_start = below_threshold[i]
-    # Handle the last region
-    if current_start is not None and below_threshold[-1] - current_start + 1 >= pattern_length:
-        end_sample = current_start + pattern_length
-        detected_starts.append(current_start)
-        detected_ends.append(end_sample)
-        extracted_patterns.append(filtered_packet[current_start:end_sample])
+    # Detect low-energy regions at least one pattern long and keep the first pattern_length samples of each
+    starts, ends = detect_runs(smoothed_energy, energy_threshold, below=True,
+                               min_run=pattern_length, max_length=pattern_length)
+    detected_starts = starts.tolist()
+    detected_ends = ends.tolist()
+    extracted_patterns = [filtered_packet[start:end] for start, end in zip(detected_starts, detected_ends)]
 
     return extracted_patterns, detected_starts, detected_ends, smoothed_energy
 
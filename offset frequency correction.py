@@ -1,13 +1,103 @@
+class FrequencyShifter:
+    """
+    Phase-continuous, table-driven complex oscillator for frequency shifting.
+
+    exp(2j*pi*offset*n/Fs) is evaluated once for a table of `table_size`
+    samples; longer signals are multiplied table block by table block, each
+    block scaled by its own start phasor. The phase is kept in cycles modulo
+    one, so it stays exact across streaming blocks of any length.
+
+    Parameters:
+        offset (float): Frequency shift in Hz.
+        Fs (float): Sampling rate in Hz.
+        table_size (int): Oscillator table length in samples.
+    """
+
+    def __init__(self, offset, Fs, table_size=4096):
+        self.offset = offset
+        self.Fs = Fs
+        self.table_size = table_size
+        self._cycles_per_sample = offset / Fs
+        self._table = np.exp(2j * np.pi * self._cycles_per_sample * np.arange(table_size))
+        self.phase = 0.0  # oscillator phase of the next sample, in cycles
+
+    def _start_phasors(self, num_blocks):
+        cycles = self.phase + self._cycles_per_sample * self.table_size * np.arange(num_blocks)
+        return np.exp(2j * np.pi * np.mod(cycles, 1.0))
+
+    def process(self, y, out=None):
+        """
+        Shift the next block of a stream.
+
+        Parameters:
+            y (np.ndarray): Complex samples.
+            out (np.ndarray): Optional output array; may be `y` itself to shift in place.
+
+        Returns:
+            shifted (np.ndarray): Shifted samples (complex64 for complex64 input).
+        """
+        n = len(y)
+        if out is None:
+            out = np.empty(n, dtype=np.result_type(y.dtype, np.complex64))
+
+        size = self.table_size
+        full = n // size
+        starts = self._start_phasors(full + 1)
+
+        head = full * size
+        block_out = out[:head].reshape(full, size)
+        np.multiply(y[:head].reshape(full, size), self._table, out=block_out)
+        block_out *= starts[:full, None]
+        np.multiply(y[head:], self._table[:n - head] * starts[full], out=out[head:])
+
+        self.phase = float(np.mod(self.phase + self._cycles_per_sample * n, 1.0))
+        return out
+
+
 class DroneSignalProcessor:
     def __init__(self, debug=True):
         self.debug = debug
 
     @staticmethod
-    def fshift(y, offset, Fs):
-        """Shift the frequency of the signal."""
-        print(f"{len(y)}, offset={offset}, Fs={Fs}")
-        x = np.linspace(0.0, len(y) / Fs, len(y))
-        return y * np.exp(x * 2j * np.pi * offset)
+    def fshift(y, offset, Fs, out=None):
+        """Shift the frequency of the signal (timebase n / Fs, phase-continuous oscillator)."""
+        return FrequencyShifter(offset, Fs).process(y, out=out)
+
+    @staticmethod
+    def fshift_batch(rows, offsets, Fs, out=None, table_size=4096):
+        """
+        Shift each row of a 2-D array by its own offset in one call.
+
+        Parameters:
+            rows (np.ndarray): 2-D array of packets (zero-padded rows stay zero).
+            offsets (np.ndarray): Frequency shift of each row in Hz.
+            Fs (float): Sampling rate in Hz.
+            out (np.ndarray): Optional output array; may be `rows` itself.
+            table_size (int): Oscillator table length in samples.
+
+        Returns:
+            shifted (np.ndarray): Shifted rows.
+        """
+        num_rows, length = rows.shape
+        if out is None:
+            out = np.empty(rows.shape, dtype=np.result_type(rows.dtype, np.complex64))
+        if length == 0:
+            return out
+
+        cycles_per_sample = np.asarray(offsets, dtype=float)[:, None] / Fs
+        table = np.exp(2j * np.pi * cycles_per_sample * np.arange(min(table_size, length)))
+        size = table.shape[1]
+
+        full = length // size
+        head = full * size
+        if full:
+            starts = np.exp(2j * np.pi * np.mod(cycles_per_sample * size * np.arange(full), 1.0))
+            block_out = out[:, :head].reshape(num_rows, full, size)
+            np.multiply(rows[:, :head].reshape(num_rows, full, size), table[:, None, :], out=block_out)
+            block_out *= starts[:, :, None]
+        tail_phasor = np.exp(2j * np.pi * np.mod(cycles_per_sample * head, 1.0))
+        np.multiply(rows[:, head:], table[:, :length - head] * tail_phasor, out=out[:, head:])
+        return out
 
 # Assuming you have already estimated the offset for each packet and stored in 'offset'
 for idx, (start_idx, end_idx) in enumerate(packets, start=1):
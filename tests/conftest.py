@@ -0,0 +1,112 @@
+import ast
+import itertools
+import pathlib
+import sys
+import types
+import matplotlib
+import numpy as np
+import pytest
+import scipy.signal
+import scipy.signal.windows
+
+matplotlib.use("Agg")
+
+REPO = pathlib.Path(__file__).resolve().parent.parent
+_module_numbers = itertools.count()
+
+# Cells in notebook order, as needed by the processing stages under test
+PIPELINE_CELLS = (
+    "Memory-mapped chunked capture reader for ocusync2 data",
+    "Tiled spectrogram pyramid for full capture visualization",
+    "Frequency spectrum of ocusync2 data",
+    "PLot and Spectrogram visualization of ocusync2 data",
+    "Vectorized run detection of threshold crossings",
+    "Running-sum energy profile engine",
+    "Filter design cache for Butterworth filters",
+    "Overlap-save FFT fast convolution filter",
+    "Energy based algorithm to detect and extrac signal packet from ocusync2 data",
+    "Streaming energy based packet detector",
+    "Coarse-to-fine packet detection on a decimated energy envelope",
+    "Streaming quantile sketch for robust noise floor estimation",
+    "Visualize signal packet using spectrogram",
+    "Estimate frequency offset for all signal packets",
+    "offset frequency correction",
+    "Apply low pass filter to all corrected signal  packets",
+    "Batched packet processing pipeline",
+    "Parallel packet processing across cores",
+    "Cached Welch PSD service",
+    "DFT domain low pass filter",
+    "SNR calculation after filtering",
+    "Streaming moment statistics for skewness and kurtosis",
+    "Binned FFT kernel density estimate",
+    "method for pattern detection and extraction from filtered signal packets",
+    "Matched filter pattern detection with reference templates",
+    "Synthetic OcuSync2 capture generator",
+    "Benchmark suite for the processing stages",
+    "Headless batch analysis of signal packets",
+    "Packet index persisted alongside each capture",
+    "Live socket ingest with ring buffer and backpressure",
+    "Per-stage profiling of the processing pipeline",
+)
+
+
+def _definitions(source, name):
+    """Code of a cell up to its example usage; cells without one keep imports, functions, classes and constants."""
+    if "\n# Example usage" in source:
+        return compile(source[:source.index("\n# Example usage")], name, "exec")
+    keep = []
+    for node in ast.parse(source).body:
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
+            keep.append(node)
+        elif isinstance(node, ast.Assign) and all(isinstance(t, ast.Name) and t.id.isupper() for t in node.targets):
+            keep.append(node)
+    return compile(ast.Module(body=keep, type_ignores=[]), name, "exec")
+
+
+def load_cells(*names):
+    """
+    Run the definitions of notebook cells, in order, in one shared namespace.
+
+    The cells rely on names defined by earlier cells, as in the notebook, so they
+    are executed together; the example code after "# Example usage" needs a capture
+    and is skipped. A class defined again by a later cell (DroneSignalProcessor) is
+    extended with the later cell's methods, as the notebook uses both sets. The
+    namespace is registered as a module, as the notebook's __main__ is, so the
+    cells' classes and results can be pickled.
+
+    Parameters:
+        names (str): Cell file names without the .py extension.
+
+    Returns:
+        namespace (dict): Globals shared by the loaded cells.
+    """
+    # welch and hamming come from the PSD cell's `from scipy.signal import welch, hamming`
+    module = types.ModuleType(f"notebook_cells_{next(_module_numbers)}")
+    sys.modules[module.__name__] = module
+    namespace = module.__dict__
+    namespace.update(welch=scipy.signal.welch, hamming=scipy.signal.windows.hamming)
+    for name in names:
+        source = (REPO / f"{name}.py").read_text()
+        existing = namespace.get("DroneSignalProcessor")
+        exec(_definitions(source, name), namespace)
+        redefined = namespace.get("DroneSignalProcessor")
+        if existing is not None and redefined is not existing:
+            for attr, member in vars(redefined).items():
+                if not attr.startswith("__"):
+                    setattr(existing, attr, member)
+            namespace["DroneSignalProcessor"] = existing
+    return namespace
+
+
+@pytest.fixture(scope="session")
+def cells():
+    return load_cells(*PIPELINE_CELLS)
+
+
+@pytest.fixture(scope="session")
+def synthetic_capture(cells, tmp_path_factory):
+    """Synthetic OcuSync2 capture on disk: (path, samples, ground truth) of 0.1 s at 50 Msps."""
+    generator = cells["SyntheticOcuSync2"](sampling_rate=50e6, seed=1)
+    path = tmp_path_factory.mktemp("capture") / "synthetic.dat"
+    truth = generator.write(str(path), int(0.1 * 50e6))
+    return str(path), np.fromfile(path, dtype=np.complex64), truth
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+import scipy.signal
+
+
+@pytest.mark.parametrize("detrend", [None, "constant"])
+def test_mean_hold_matches_welch(cells, detrend):
+    rng = np.random.default_rng(0)
+    n = 10 * 512 + 100
+    data = (0.3 + rng.standard_normal(n) + 1j * rng.standard_normal(n)).astype(np.complex64)
+    frequencies, mean_psd, _ = cells["averaged_spectrum"](data, 50e6, nfft=512, block_frames=3,
+                                                          detrend=detrend)
+
+    f, Pxx = scipy.signal.welch(data, 50e6, window="hann", nperseg=512, noverlap=0, detrend=detrend or False,
+                                return_onesided=False)
+    assert np.allclose(frequencies, np.fft.fftshift(f))
+    assert np.allclose(mean_psd, np.fft.fftshift(Pxx), rtol=1e-4, atol=1e-6 * Pxx.max())
+
+
+def test_unsupported_detrend_is_refused(cells):
+    with pytest.raises(ValueError):
+        cells["AveragedSpectrum"](512, 50e6, detrend="linear")
@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pytest
+
+
+def _packets(truth, count):
+    return [(int(b["start_idx"]), int(b["end_idx"])) for b in truth[:count]]
+
+
+def test_run_matches_per_packet_chain(cells, synthetic_capture):
+    _, data, truth = synthetic_capture
+    processor = cells["DroneSignalProcessor"](debug=False)
+    packets = _packets(truth, 12) + [(truth[0]["start_idx"], truth[0]["start_idx"] + 1000)]
+    results = cells["PacketPipeline"](processor, sampling_rate=50e6, batch_rows=5).run(data, packets)
+
+    assert [(r.start, r.end) for r in results] == packets
+    for (start_idx, end_idx), result in zip(packets, results):
+        offset, band_found = processor.estimate_offset(data[start_idx:end_idx], 50e6)
+        assert result.band_found == band_found
+        if offset is None:
+            assert result.offset is None
+            continue
+        assert np.isclose(result.offset, offset)
+        if band_found:
+            corrected = cells["DroneSignalProcessor"].fshift(data[start_idx:end_idx], -offset, 50e6)
+            filtered, _ = cells["lowpass"](corrected, 8.5e6, 50e6)
+            assert np.allclose(result.filtered, filtered, atol=1e-6 * np.abs(filtered).max())
+    assert sum(r.band_found for r in results) == 12
+
+
+def test_run_with_more_packets_than_the_cache_holds(cells, synthetic_capture):
+    _, data, truth = synthetic_capture
+    packets = _packets(truth, 10)
+    pipeline = cells["PacketPipeline"](cells["DroneSignalProcessor"](debug=False), max_cached_packets=4,
+                                       batch_rows=3)
+
+    results = pipeline.run(data, packets, capture_id="capture")
+    assert [(r.start, r.end) for r in results] == packets
+    assert len(pipeline._cache) == 4
+
+    # The last packets of the run are cached; a later run refreshes its hits before storing new results
+    again = pipeline.run(data, packets[-2:] + packets[:3], capture_id="capture")
+    assert again[0] is results[-2] and again[1] is results[-1]
+    assert len(pipeline._cache) == 4
+    assert all(key[1:3] in packets[-2:] + packets[:3] for key in pipeline._cache)
+
+
+def test_batch_size_does_not_change_results(cells, synthetic_capture):
+    _, data, truth = synthetic_capture
+    packets = _packets(truth, 9)
+    processor = cells["DroneSignalProcessor"](debug=False)
+    single = cells["PacketPipeline"](processor, batch_rows=1).run(data, packets)
+    batched = cells["PacketPipeline"](processor, batch_rows=64).run(data, packets)
+    for a, b in zip(single, batched):
+        assert a.offset == b.offset and a.band_found == b.band_found
+        assert np.allclose(a.filtered, b.filtered)
+
+
+def test_different_arrays_with_the_same_packets_are_not_confused(cells, synthetic_capture, monkeypatch):
+    _, data, truth = synthetic_capture
+    packets = _packets(truth, 6)
+    capture = data[:truth[5]["end_idx"] + 1]
+    processor = cells["DroneSignalProcessor"](debug=False)
+    pipeline = cells["PacketPipeline"](processor)
+
+    # Every array gets the same id, as a new array can get the id of a garbage-collected one
+    monkeypatch.setitem(cells, "id", lambda obj: 1)
+    for shift in (0.0, 3e6, -2e6):
+        shifted = cells["DroneSignalProcessor"].fshift(capture, shift, 50e6)
+        results = pipeline.run(shifted, packets)
+        expected = cells["PacketPipeline"](processor).run(shifted, packets)
+        assert [(r.offset, r.band_found) for r in results] == [(r.offset, r.band_found) for r in expected]
+        assert np.isclose(results[0].offset, truth[0]["offset"] + shift, atol=50e3)
+
+
+def test_capture_identity(cells, tmp_path):
+    identity = cells["capture_identity"]
+    a = np.zeros(1000, dtype=np.complex64)
+    assert identity(a) == identity(a)
+    key = identity(a)
+    del a
+    assert all(identity(np.zeros(1000, dtype=np.complex64)) != key for _ in range(5))
+    with pytest.raises(ValueError):
+        identity([0j] * 10)
+
+    path = tmp_path / "capture.dat"
+    np.zeros(1000, dtype=np.complex64).tofile(path)
+    before = identity(cells["CaptureReader"](str(path)))
+    assert identity(cells["CaptureReader"](str(path))) == before
+    np.ones(1000, dtype=np.complex64).tofile(path)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert identity(cells["CaptureReader"](str(path))) != before
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+def test_measure_times_without_tracemalloc_and_takes_the_peak_separately(cells):
+    import tracemalloc
+    tracing = []
+
+    def stage():
+        tracing.append(tracemalloc.is_tracing())
+        return np.ones(1 << 20).sum()
+
+    result, wall, cpu, peak = cells["_measure"](stage)
+    assert result == 1 << 20 and wall >= 0 and cpu >= 0
+    assert tracing == [False, True] and not tracemalloc.is_tracing()
+    assert peak >= 8 << 20
+
+    tracing.clear()
+    assert cells["_measure"](stage, measure_memory=False)[3] is None
+    assert tracing == [False]
+
+
+def test_benchmark_leaves_the_shared_psd_cache_alone(cells, synthetic_capture, tmp_path):
+    path, _, truth = synthetic_capture
+    service = cells["psd_service"]
+    service.psd(np.ones(4096, dtype=np.complex64), key=0, fs=50e6, stage="user", nperseg=2048, capture_id="user")
+    cached = dict(service._cache)
+
+    reader = cells["CaptureReader"](path, sampling_rate=50e6)
+    records = cells["benchmark_capture"](reader, truth, str(tmp_path), max_packets=6)
+    assert dict(service._cache) == cached
+    assert [r["stage"] for r in records] == ["bandpass_filter", "detect_packets_energy", "estimate_offset", "fshift",
+                                             "lowpass", "snr", "moments", "extract_patterns"]
+    assert all(r["peak_memory_bytes"] > 0 for r in records)
+
+
+
+def test_streamed_bandpass_writes_a_capture_dtype_memmap(cells, synthetic_capture, tmp_path):
+    path, samples, truth = synthetic_capture
+    reader = cells["CaptureReader"](path, sampling_rate=50e6)
+    records = cells["benchmark_capture"](reader, truth, str(tmp_path), in_memory_limit=0, max_packets=2,
+                                         measure_memory=False)
+    assert [r["mode"] for r in records[:2]] == ["streamed fir", "streaming"]
+    assert records[1]["packets_detected"] > 0
+
+    # The filtered capture takes as much disk as the capture itself (complex64, not complex128)
+    assert (tmp_path / "bandpass.tmp").stat().st_size == samples.nbytes == len(reader) * 8
+
+def test_generator_caches_bursts_per_instance(cells):
+    generator = cells["SyntheticOcuSync2"](sampling_rate=50e6, seed=3, max_cached_bursts=2)
+    other = cells["SyntheticOcuSync2"](sampling_rate=50e6, seed=4, max_cached_bursts=2)
+    first = generator.burst(0)
+    assert generator.burst(0) is first
+    assert not np.array_equal(other.burst(0), first)
+    generator.burst(1), generator.burst(2)
+    assert list(generator._bursts) == [1, 2] and len(other._bursts) == 1
+    assert np.array_equal(generator.burst(0), first)
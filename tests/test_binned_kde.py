@@ -0,0 +1,24 @@
+import numpy as np
+import scipy.stats
+
+
+def test_density_is_normalised_by_the_samples_on_the_grid(cells):
+    rng = np.random.default_rng(0)
+    inside = rng.normal(5.0, 0.5, 20000)
+    outliers = rng.normal(50.0, 1.0, 5000)
+    kde = cells["BinnedKDE"](0.0, 10.0, num_bins=1024).update(np.concatenate([inside, outliers]))
+
+    grid, density = kde.density(bandwidth=0.1)
+    assert np.isclose(np.trapezoid(density, grid), 1.0, atol=1e-3)
+
+    reference = scipy.stats.gaussian_kde(inside, bw_method=0.1 / inside.std(ddof=1))(grid)
+    assert np.allclose(density, reference, atol=2e-3 * reference.max())
+
+
+def test_merged_estimates_match_one_estimate(cells):
+    rng = np.random.default_rng(1)
+    values = rng.rayleigh(1.0, 6000)
+    whole = cells["BinnedKDE"](0.0, 3.0, num_bins=256).update(values)
+    merged = cells["BinnedKDE"](0.0, 3.0, num_bins=256).update(values[:2500])
+    merged.merge(cells["BinnedKDE"](0.0, 3.0, num_bins=256).update(values[2500:]))
+    assert np.allclose(whole.density()[1], merged.density()[1])
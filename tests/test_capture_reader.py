@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def capture(cells, tmp_path_factory):
+    path = tmp_path_factory.mktemp("reader") / "ramp.dat"
+    data = (np.arange(1000) + 1j * np.arange(1000)[::-1]).astype(np.complex64)
+    data.tofile(path)
+    return cells["CaptureReader"](str(path)), data
+
+
+@pytest.mark.parametrize("key", [slice(None), slice(10, 50), slice(10, 50, 3), slice(None, None, -1),
+                                 slice(50, 10, -1), slice(-5, None), slice(990, 10, -7), slice(10, 50, -1),
+                                 slice(None, None, 1000), slice(-1, -1000, -999)])
+def test_slices_match_numpy(capture, key):
+    reader, data = capture
+    assert np.array_equal(reader[key], data[key])
+
+
+def test_sc16_slices_and_indices(tmp_path, cells):
+    iq = np.arange(-200, 200, dtype=np.int16)
+    iq.tofile(tmp_path / "sc16.dat")
+    reader = cells["CaptureReader"](str(tmp_path / "sc16.dat"), sample_format="sc16", sc16_scale=1.0)
+    expected = iq[0::2].astype(np.float32) + 1j * iq[1::2].astype(np.float32)
+    assert np.array_equal(reader[150:20:-4], expected[150:20:-4])
+    assert reader[-1] == expected[-1]
+    with pytest.raises(IndexError):
+        reader[len(reader)]
+
+
+def test_load_and_plot_spectrogram_returns_lazy_samples_and_time(cells, synthetic_capture, tmp_path):
+    path, data, _ = synthetic_capture
+    reader, time = cells["load_and_plot_spectrogram"](path, pyramid_dir=str(tmp_path / "pyramid"))
+    assert isinstance(reader, cells["CaptureReader"]) and len(reader) == len(data)
+    assert np.array_equal(reader[1000:2000], data[1000:2000])
+    assert np.allclose(time(1000, 1003), np.array([1000, 1001, 1002]) / 50e6)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+FS = 50e6
+CUTOFF = 8.5e6
+TRANSITION = 0.85e6
+
+
+def tone(frequency, n):
+    return np.exp(2j * np.pi * frequency * np.arange(n) / FS).astype(np.complex64)
+
+
+@pytest.mark.parametrize("n", [4000, 60_000])
+def test_passband_is_kept_and_stopband_removed(cells, n):
+    edge = n // 10
+    for frequency in (0.0, 2e6, -5e6, CUTOFF - TRANSITION):
+        y = cells["dft_filter"](tone(frequency, n), CUTOFF, FS)[edge:-edge]
+        assert np.allclose(np.abs(y), 1, atol=1e-3), frequency
+    for frequency in (CUTOFF + TRANSITION, -12e6, 20e6):
+        y = cells["dft_filter"](tone(frequency, n), CUTOFF, FS)[edge:-edge]
+        assert np.abs(y).max() < 1e-3, frequency
+
+
+def test_taper_passes_half_amplitude_at_the_cutoff(cells):
+    y = cells["dft_filter"](tone(CUTOFF, 60_000), CUTOFF, FS)[6000:-6000]
+    assert np.allclose(np.abs(y), 0.5, atol=1e-3)
+
+
+def test_real_input_matches_the_complex_path(cells):
+    x = np.random.default_rng(0).standard_normal(30_000)
+    for block_size in (None, 8192):
+        real = cells["dft_filter"](x, CUTOFF, FS, block_size=block_size)
+        assert not np.iscomplexobj(real)
+        assert np.allclose(real, cells["dft_filter"](x.astype(complex), CUTOFF, FS, block_size=block_size).real)
+
+
+@pytest.mark.parametrize("n", [20_000, 120_000])
+def test_blocks_match_a_single_fft(cells, n):
+    rng = np.random.default_rng(1)
+    x = (rng.standard_normal(n) + 1j * rng.standard_normal(n)).astype(np.complex64)
+    single = cells["dft_filter"](x, CUTOFF, FS, block_size=None)
+    for block_size in (4096, 8192):
+        blocked = cells["dft_filter"](x, CUTOFF, FS, block_size=block_size)
+        assert blocked.shape == x.shape
+        assert np.abs(blocked - single).max() < 1e-3 * np.abs(x).max()
+
+
+@pytest.mark.parametrize("block_size", [None, 8192])
+def test_batched_rows_match_per_row_calls(cells, block_size):
+    rng = np.random.default_rng(2)
+    lengths = np.array([30_000, 12_345, 1, 29_999])
+    rows = np.zeros((len(lengths), lengths.max()), dtype=np.complex64)
+    for r, length in enumerate(lengths):
+        rows[r, :length] = rng.standard_normal(length) + 1j * rng.standard_normal(length)
+
+    batched = cells["dft_filter"](rows, CUTOFF, FS, lengths=lengths, block_size=block_size)
+    assert batched.shape == rows.shape
+    for r, length in enumerate(lengths):
+        # A row zero-padded to the batch width is the same signal, so only the FFT length differs
+        alone = cells["dft_filter"](rows[r, :length], CUTOFF, FS, block_size=block_size)
+        assert np.abs(batched[r, :length] - alone).max() < 1e-3 * np.abs(rows[r]).max()
+        assert not batched[r, length:].any()
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import scipy.signal
+
+
+def test_counters_and_cached_designs(cells):
+    bank = cells["FilterBank"]()
+    first = bank.design("lowpass", 12, 8.5e6, 50e6)
+    assert bank.cache_info() == {"hits": 0, "misses": 1, "size": 1, "max_designs": 64}
+
+    # Equal parameters given as other types hit the same entry
+    assert bank.design("lowpass", 12.0, np.float32(8.5e6), 50_000_000) is first
+    assert bank.design("lowpass", 12, [8.5e6], 50e6) is first
+    assert bank.cache_info()["hits"] == 2 and bank.cache_info()["misses"] == 1
+
+    assert np.allclose(first.sos, scipy.signal.butter(12, 8.5e6, "lowpass", fs=50e6, output="sos"))
+    assert np.allclose(first.zi, scipy.signal.sosfilt_zi(first.sos))
+
+    bank.clear()
+    assert bank.cache_info() == {"hits": 0, "misses": 0, "size": 0, "max_designs": 64}
+
+
+def test_key_includes_every_design_parameter(cells):
+    bank = cells["FilterBank"]()
+    base = ("bandpass", 6, (5e6, 24e6), 50e6)
+    variants = [
+        ("bandstop", 6, (5e6, 24e6), 50e6),
+        ("bandpass", 8, (5e6, 24e6), 50e6),
+        ("bandpass", 6, (5e6, 20e6), 50e6),
+        ("bandpass", 6, (4e6, 24e6), 50e6),
+        ("bandpass", 6, (5e6, 24e6), 60e6),
+    ]
+    designs = [bank.design(*params) for params in [base] + variants]
+    assert bank.cache_info()["misses"] == len(designs) and bank.cache_info()["hits"] == 0
+    for params, design in zip([base] + variants, designs):
+        btype, order, cutoff, fs = params
+        assert np.allclose(design.sos, scipy.signal.butter(order, cutoff, btype, fs=fs, output="sos"))
+
+
+def test_least_recently_used_design_is_evicted(cells):
+    bank = cells["FilterBank"](max_designs=3)
+    for cutoff in (1e6, 2e6, 3e6):
+        bank.design("lowpass", 4, cutoff, 50e6)
+
+    # A hit makes 1 MHz the most recently used, so 2 MHz goes first
+    bank.design("lowpass", 4, 1e6, 50e6)
+    bank.design("lowpass", 4, 4e6, 50e6)
+    assert bank.cache_info()["size"] == 3
+    cached = [key[2][0] for key in bank._designs]
+    assert cached == [3e6, 1e6, 4e6]
+
+    misses = bank.cache_info()["misses"]
+    bank.design("lowpass", 4, 2e6, 50e6)
+    assert bank.cache_info()["misses"] == misses + 1
+    assert [key[2][0] for key in bank._designs] == [1e6, 4e6, 2e6]
+
+
+def test_shared_bank_from_several_threads(cells):
+    bank = cells["FilterBank"](max_designs=4)
+    cutoffs = [1e6 * (1 + i % 7) for i in range(400)]
+    with ThreadPoolExecutor(8) as executor:
+        designs = list(executor.map(lambda cutoff: bank.design("lowpass", 4, cutoff, 50e6), cutoffs))
+
+    info = bank.cache_info()
+    assert info["hits"] + info["misses"] == len(cutoffs) and info["size"] == 4
+    for cutoff, design in zip(cutoffs, designs):
+        assert np.allclose(design.sos, scipy.signal.butter(4, cutoff, fs=50e6, output="sos"))
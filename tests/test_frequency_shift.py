@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("length", [0, 1, 4095, 4096, 10000])
+def test_fshift_batch_matches_per_row_shift(cells, length):
+    rng = np.random.default_rng(length)
+    rows = (rng.standard_normal((3, length)) + 1j * rng.standard_normal((3, length))).astype(np.complex64)
+    offsets = np.array([-9.5e6, 0.0, 12.3e6])
+    shifted = cells["DroneSignalProcessor"].fshift_batch(rows, offsets, 50e6)
+
+    assert shifted.shape == rows.shape
+    n = np.arange(length)
+    for row, offset, result in zip(rows, offsets, shifted):
+        assert np.allclose(result, row * np.exp(2j * np.pi * offset * n / 50e6), atol=1e-4)
+        assert np.allclose(result, cells["DroneSignalProcessor"].fshift(row, offset, 50e6), atol=1e-5)
+
+
+def test_streamed_shift_is_phase_continuous(cells):
+    rng = np.random.default_rng(0)
+    y = (rng.standard_normal(20000) + 1j * rng.standard_normal(20000)).astype(np.complex64)
+    shifter = cells["FrequencyShifter"](-12e6, 50e6)
+    pieces = [shifter.process(y[a:b]) for a, b in [(0, 0), (0, 777), (777, 9000), (9000, 20000)]]
+    assert np.allclose(np.concatenate(pieces), cells["DroneSignalProcessor"].fshift(y, -12e6, 50e6), atol=1e-5)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("batch_packets", [1024, 10000])
+def test_analyze_more_packets_than_the_pipeline_cache(cells, synthetic_capture, batch_packets):
+    _, data, truth = synthetic_capture
+    bursts = [(int(b["start_idx"]), int(b["end_idx"])) for b in truth[:6]]
+    # Short fragments (below one Welch FFT) push the packet count past max_cached_packets
+    fragments = [(start, start + 64) for start in range(0, 4200 * 64, 64)]
+    packets = bursts + fragments
+
+    analysis = cells["analyze_packets"](data, packets, cells["DroneSignalProcessor"](debug=False),
+                                        batch_packets=batch_packets)
+
+    assert len(analysis.table) == len(packets) > 4096
+    assert list(analysis.table["start_idx"]) == [start for start, _ in packets]
+    assert analysis.table["band_found"][:6].all() and not analysis.table["band_found"][6:].any()
+    assert np.isfinite(analysis.table["snr_dB"][:6]).all()
+    assert np.isnan(analysis.table["offset"][6:]).all()
+
+
+def test_visualize_returns_the_spectrograms_of_analyze_packets(cells, synthetic_capture):
+    _, data, truth = synthetic_capture
+    packets = [(int(b["start_idx"]), int(b["end_idx"])) for b in truth[:3]]
+
+    spectrograms = cells["visualize_detected_packets"](data, packets, 50e6, plot=False)
+    analysis = cells["analyze_packets"](data, packets, cells["DroneSignalProcessor"](debug=False), spectrograms=True)
+
+    assert sorted(spectrograms) == [1, 2, 3]
+    for number, (f, t, Sxx) in spectrograms.items():
+        assert Sxx.shape == (len(f), len(t)) and np.all(np.diff(f) > 0)
+        for ours, theirs in zip((f, t, Sxx), analysis.spectrograms[number]):
+            assert np.array_equal(ours, theirs)
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+FS = 1e6
+BURSTS = [(5000, 10000), (20000, 25000), (35000, 40000)]
+
+
+def bursty_signal(num_samples=50000):
+    rng = np.random.default_rng(0)
+    samples = (rng.standard_normal(num_samples) + 1j * rng.standard_normal(num_samples)) / np.sqrt(2)
+    for start_idx, end_idx in BURSTS:
+        samples[start_idx:end_idx] *= 10
+    return samples.astype(np.complex64)
+
+
+def live_ingest(cells, **kwargs):
+    options = dict(sampling_rate=FS, window_ms=0.5, threshold_factor=4.0, noise_mode="quantile",
+                   block_samples=4096, max_latency_s=0.01, analyzer=lambda samples, level: (0.0, True, None, None, None))
+    options.update(kwargs)
+    return cells["LiveIngest"](**options)
+
+
+def assert_one_packet_per_burst(packets):
+    packets = sorted(packets, key=lambda p: p.start_idx)
+    assert len(packets) == len(BURSTS)
+    for packet, (start_idx, end_idx) in zip(packets, BURSTS):
+        assert abs(packet.start_idx - start_idx) < 1000 and abs(packet.end_idx - end_idx) < 1000
+
+
+def test_udp_drops_and_losses_are_counted(cells):
+    samples = bursty_signal(11000)
+
+    async def run():
+        # The ring holds 4000 samples and the consumer waits for a block it never gets
+        ingest = live_ingest(cells, ring_seconds=0.004, block_samples=1 << 20, max_latency_s=0.5)
+        await ingest.start(port=0, protocol="udp")
+        await cells["send_samples"](samples[:10000], port=ingest.address[1], datagram_samples=1000)
+        await asyncio.sleep(0.7)
+        await cells["send_samples"](samples[10000:], port=ingest.address[1], datagram_samples=1000,
+                                    start_index=20000)
+        await asyncio.sleep(0.1)
+        return await ingest.stop(idle_s=0.05)
+
+    stats = asyncio.run(run())
+    assert stats["received"] == 11000
+    assert stats["dropped"] == 6000
+    assert stats["lost"] == 10000
+    assert stats["gaps"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_tcp_sender_is_paused_instead_of_dropping(cells):
+    samples = np.tile(bursty_signal(), 4)
+    detector_calls = []
+
+    async def run():
+        ingest = live_ingest(cells, ring_seconds=0.008, block_samples=1000)
+        process = ingest.detector.process
+
+        def slow_process(block, final=False):
+            detector_calls.append(len(block))
+            time.sleep(0.001)
+            return process(block, final)
+
+        ingest.detector.process = slow_process
+        await ingest.start(port=0, protocol="tcp")
+        await cells["send_samples"](samples, port=ingest.address[1], protocol="tcp", datagram_samples=2000)
+        return ingest, await ingest.stop(idle_s=0.05)
+
+    ingest, stats = asyncio.run(run())
+    assert stats["pauses"] >= 1 and not stats["paused"]
+    assert stats["dropped"] == 0 and stats["gaps"] == 0
+    assert stats["received"] == len(samples) == sum(detector_calls)
+    assert len(ingest.packets) == 4 * len(BURSTS)
+
+
+def test_failed_analysis_is_counted_and_reported(cells):
+    calls = []
+
+    def analyzer(samples, level):
+        calls.append(len(samples))
+        if len(calls) == 2:
+            raise ValueError("analysis failed")
+        return 0.0, True, None, None, None
+
+    async def run():
+        ingest = live_ingest(cells, analyzer=analyzer)
+        await ingest.start(port=0, protocol="udp")
+        await cells["send_samples"](bursty_signal(), port=ingest.address[1])
+        return ingest, await ingest.stop(idle_s=0.05)
+
+    ingest, stats = asyncio.run(run())
+    assert stats["packets"]["failed"] == 1 and stats["packets"]["full"] == len(BURSTS) - 1
+    (start_idx, end_idx, error), = ingest.errors
+    assert isinstance(error, ValueError)
+    assert_one_packet_per_burst(ingest.packets)
+    failed, = [p for p in ingest.packets if p.level == "failed"]
+    assert (failed.start_idx, failed.end_idx) == (start_idx, end_idx)
+
+
+def test_packets_are_emitted_in_completion_order(cells):
+    emitted = []
+
+    def analyzer(samples, level):
+        # The first packet takes longest, so the later ones overtake it
+        if not emitted and not getattr(analyzer, "slowed", False):
+            analyzer.slowed = True
+            time.sleep(0.3)
+        return 0.0, True, None, None, None
+
+    async def run():
+        with ThreadPoolExecutor(4) as executor:
+            ingest = live_ingest(cells, analyzer=analyzer, executor=executor, on_packet=emitted.append)
+            await ingest.start(port=0, protocol="udp")
+            await cells["send_samples"](bursty_signal(), port=ingest.address[1])
+            return ingest, await ingest.stop(idle_s=0.05)
+
+    ingest, stats = asyncio.run(run())
+    assert_one_packet_per_burst(emitted)
+    assert list(ingest.packets) == emitted
+    assert emitted[-1].start_idx == min(p.start_idx for p in emitted)
+    assert [p.start_idx for p in emitted] != sorted(p.start_idx for p in emitted)
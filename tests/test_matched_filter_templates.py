@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def bank(cells):
+    templates = [cells["zc_sync_template"](600), cells["zc_sync_template"](147)]
+    return cells["TemplateBank"](templates, block_size=4096, max_segments=3)
+
+
+def _direct_scores(template, signal):
+    """Normalized correlation magnitude computed lag by lag."""
+    L = len(template)
+    scores = []
+    for lag in range(len(signal) - L + 1):
+        window = signal[lag:lag + L]
+        energy = np.linalg.norm(window) * np.linalg.norm(template)
+        scores.append(abs(np.vdot(template, window)) / energy if energy else 0.0)
+    return np.array(scores)
+
+
+def test_scores_match_direct_correlation(cells, bank):
+    rng = np.random.default_rng(0)
+    signals = [rng.standard_normal(n) + 1j * rng.standard_normal(n) for n in (20000, 500, 9000, 0, 14000)]
+    signals[2][3000:3000 + bank.template_length] += 5 * bank.templates[1]
+
+    scores = bank.correlate_batch(signals)
+    assert [s.shape for s in scores] == [(2, max(0, len(x) - bank.template_length + 1)) for x in signals]
+    for signal, score in zip(signals[:3], scores[:3]):
+        lags = np.arange(0, score.shape[1], 97)
+        for template, row in zip(bank.templates, score):
+            assert np.allclose(row[lags], _direct_scores(template, signal)[lags], atol=1e-9)
+    assert int(np.argmax(scores[2][1])) == 3000
+
+
+def test_batches_are_bounded_and_signals_streamed(cells, bank, monkeypatch):
+    rng = np.random.default_rng(1)
+    transformed = []
+    fft = cells["scipy"].fft.fft
+
+    def counting_fft(x, *args, **kwargs):
+        transformed.append(len(x))
+        return fft(x, *args, **kwargs)
+
+    consumed = []
+
+    def signals():
+        for n in (30000, 12000, 26000):
+            consumed.append(n)
+            yield rng.standard_normal(n) + 0j
+
+    monkeypatch.setattr(cells["scipy"].fft, "fft", counting_fft)
+    iterator = bank.iter_correlate(signals())
+    first = next(iterator)
+    assert first.shape[1] == 30000 - bank.template_length + 1
+    assert consumed == [30000, 12000]
+    rest = list(iterator)
+    assert len(rest) == 2 and max(transformed) <= bank.max_segments
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+import scipy.stats
+
+
+def _expected(values):
+    """Mean, population variance, skewness and excess kurtosis as the statistics scripts define them."""
+    values = np.abs(values) if np.iscomplexobj(values) else np.asarray(values, dtype=np.float64)
+    n = len(values)
+    # n / ((n - 1)(n - 2)) * sum(z**3) with the population std is n**2 / ((n - 1)(n - 2)) times the biased skew
+    skewness = n * n / ((n - 1) * (n - 2)) * scipy.stats.skew(values, bias=True) if n > 2 else np.nan
+    kurtosis = scipy.stats.kurtosis(values, fisher=True, bias=True)
+    return values.mean(), values.var(), skewness, kurtosis
+
+
+def _assert_stats(stats, values):
+    mean, variance, skewness, kurtosis = _expected(values)
+    assert stats.n == len(values)
+    assert stats.mean == pytest.approx(mean, rel=1e-10)
+    assert stats.variance == pytest.approx(variance, rel=1e-9)
+    assert stats.skewness == pytest.approx(skewness, rel=1e-8, nan_ok=True)
+    assert stats.kurtosis == pytest.approx(kurtosis, rel=1e-8)
+
+
+@pytest.fixture(scope="module")
+def values():
+    # Skewed and offset from zero, so the merge terms in delta matter
+    return 5 + np.random.default_rng(0).lognormal(0, 0.8, 20_011)
+
+
+def test_chunked_updates_match_scipy(cells, values):
+    whole = cells["MomentAccumulator"]().update(values).result()
+    _assert_stats(whole, values)
+
+    accumulator = cells["MomentAccumulator"](chunk_size=997)
+    for piece in np.split(values, [1, 2, 3000, 3001, 15_000]):
+        accumulator.update(piece)
+    _assert_stats(accumulator.result(), values)
+
+
+def test_uneven_merges_match_scipy(cells, values):
+    pieces = np.split(values, [1, 4, 10_000, 10_002])
+    accumulators = [cells["MomentAccumulator"]().update(piece) for piece in pieces]
+
+    # Merge out of order, into an empty accumulator and with an empty one along the way
+    merged = cells["MomentAccumulator"]()
+    for index in (3, 0, 4, 2, 1):
+        merged.merge(accumulators[index]).merge(cells["MomentAccumulator"]())
+    _assert_stats(merged.result(), values)
+
+    pairwise = accumulators[0].merge(accumulators[1].merge(accumulators[2])).merge(accumulators[3].merge(accumulators[4]))
+    _assert_stats(pairwise.result(), values)
+
+
+def test_empty_accumulator(cells):
+    stats = cells["MomentAccumulator"]().result()
+    assert stats.n == 0 and np.isnan([stats.mean, stats.variance, stats.skewness, stats.kurtosis]).all()
+
+
+def test_ragged_moments_match_per_row_scipy(cells):
+    rng = np.random.default_rng(1)
+    rows = [rng.exponential(2.0, 1000), np.zeros(0), np.array([3.0]), np.array([1.0, 4.0]),
+            rng.standard_normal(7) + 1j * rng.standard_normal(7), np.zeros(0), 2 + rng.gamma(0.5, size=5003)]
+    stats = cells["ragged_moments"](rows)
+
+    assert stats.n.tolist() == [len(row) for row in rows]
+    for r, row in enumerate(rows):
+        if len(row) == 0:
+            assert np.isnan([stats.mean[r], stats.variance[r], stats.skewness[r], stats.kurtosis[r]]).all()
+            continue
+        mean, variance, skewness, kurtosis = _expected(row)
+        assert stats.mean[r] == pytest.approx(mean, rel=1e-10)
+        assert stats.variance[r] == pytest.approx(variance, rel=1e-9, abs=1e-300)
+        assert stats.skewness[r] == pytest.approx(skewness, rel=1e-8, nan_ok=True)
+        if len(row) == 1:
+            # No spread: the kurtosis is undefined
+            assert np.isnan(stats.kurtosis[r])
+        else:
+            assert stats.kurtosis[r] == pytest.approx(kurtosis, rel=1e-8)
+
+        # The single-distribution helpers agree with the batched pass
+        assert cells["moment_based_skew"](row) == pytest.approx(stats.skewness[r], rel=1e-10, nan_ok=True)
+        assert cells["moment_based_kurtosis"](row) == pytest.approx(stats.kurtosis[r], rel=1e-10, nan_ok=True)
+
+    assert len(cells["ragged_moments"]([]).n) == 0
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+FS = 50e6
+BIN = FS / 2048
+
+
+@pytest.fixture(scope="module")
+def bursts(cells):
+    generator = cells["SyntheticOcuSync2"](sampling_rate=FS, seed=7, offsets=(-9.5e6, -7.3217e6, -20.0061e6, -15.2e6))
+    truth = generator.schedule(int(0.1 * FS))
+    return [(generator.generate(b["start_idx"], b["end_idx"]), b["offset"], b["snr_dB"]) for b in truth]
+
+
+def test_fast_estimate_is_within_a_kilohertz(cells, bursts):
+    processor = cells["DroneSignalProcessor"](debug=False)
+    for y, offset, snr_dB in bursts:
+        estimate, band_found = processor.estimate_offset(y, FS, mode="fast")
+        assert band_found
+        assert abs(estimate - offset) < 1e3, (offset, snr_dB, estimate)
+
+
+def test_fast_estimate_agrees_with_welch_mode(cells, bursts):
+    processor = cells["DroneSignalProcessor"](debug=False)
+    for y, offset, _ in bursts:
+        welch_offset, band_found = processor.estimate_offset(y, FS)
+        assert band_found
+        assert abs(welch_offset - offset) <= BIN
+        assert abs(processor.estimate_offset(y, FS, mode="fast")[0] - welch_offset) <= BIN
+
+        # Without refinement the fast estimate is the band centre, good to one bin
+        coarse, _ = processor.estimate_offset_fast(y, FS, refine=False)
+        assert abs(coarse - offset) <= BIN
+
+
+def test_refinement_needs_a_known_numerology(cells, bursts):
+    processor = cells["DroneSignalProcessor"](debug=False)
+    y, offset, _ = bursts[1]
+    unknown, _ = processor.estimate_offset_fast(y, FS, packet_type="other")
+    assert unknown == processor.estimate_offset_fast(y, FS, refine=False)[0]
+    assert processor.estimate_offset_fast(y[:1000], FS) == (None, False)
@@ -0,0 +1,92 @@
+import os
+import numpy as np
+import pytest
+
+DETECTION_PARAMS = {"window_ms": 0.508, "threshold_factor": 0.6, "low_cutoff": 5e6, "high_cutoff": 24e6}
+
+
+@pytest.fixture
+def reader(cells, synthetic_capture, tmp_path):
+    path, data, _ = synthetic_capture
+    capture = tmp_path / "capture.dat"
+    data.tofile(capture)
+    return cells["CaptureReader"](str(capture), sampling_rate=50e6)
+
+
+def test_scan_streams_the_capture_and_finds_the_bursts(cells, synthetic_capture, reader, monkeypatch):
+    _, _, truth = synthetic_capture
+
+    def whole_capture_read(start=0, stop=None):
+        if stop is None or stop - start > 1 << 22:
+            raise AssertionError("scan_capture must not read the whole capture at once")
+        return read(start, stop)
+
+    read = reader.read
+    monkeypatch.setattr(reader, "read", whole_capture_read)
+    records = cells["scan_capture"](reader, DETECTION_PARAMS, cells["DroneSignalProcessor"](debug=False),
+                                    block_samples=1 << 18)
+
+    assert np.all(np.diff(records["start_idx"]) > 0)
+    # 5 dB bursts stay below 0.6 x the mean energy of this capture; the stronger ones must all be found
+    strong = truth[truth["snr_dB"] >= 12]
+    burst_centres = (strong["start_idx"] + strong["end_idx"]) // 2
+    containing = np.searchsorted(records["start_idx"], burst_centres, side="right") - 1
+    assert np.all(records["end_idx"][containing] > burst_centres)
+    assert records["band_found"][np.unique(containing)].all()
+
+
+def test_index_is_saved_reused_and_invalidated(cells, reader, monkeypatch):
+    processor = cells["DroneSignalProcessor"](debug=False)
+    index = cells["load_or_scan_packets"](reader, DETECTION_PARAMS, processor)
+
+    path = cells["PacketIndex"].path_for(reader.filepath)
+    with open(path, "rb") as f:
+        magic = f.read(len(cells["PACKET_INDEX_MAGIC"]))
+        header_length = int.from_bytes(f.read(4), "little")
+        assert magic == cells["PACKET_INDEX_MAGIC"] and f.read(header_length).startswith(b"{")
+
+    # A valid sidecar is loaded instead of rescanned
+    with monkeypatch.context() as patch:
+        patch.setitem(cells, "scan_capture", None)
+        reused = cells["load_or_scan_packets"](reader, DETECTION_PARAMS, processor)
+    assert isinstance(reused.records, np.memmap)
+    assert np.array_equal(np.asarray(reused.records), index.records)
+    assert reused.packets == index.packets
+
+    # The stored index matches the parameters it was built with (including those the scan adds), and no others
+    stored_params = dict(DETECTION_PARAMS, sampling_rate=reader.sampling_rate, sample_format=reader.sample_format)
+    fingerprint = cells["capture_fingerprint"](reader.filepath)
+    assert cells["PacketIndex"].load(path, stored_params, fingerprint) is not None
+    assert cells["PacketIndex"].load(path, dict(stored_params, threshold_factor=0.7), fingerprint) is None
+
+    first, last = index.records["start_idx"][[1, 3]] / 50e6
+    assert list(index.in_time_range(first, last)["start_idx"]) == list(index.records["start_idx"][1:3])
+
+
+@pytest.mark.parametrize("keep", [0, 6, 10, 20])
+def test_truncated_or_corrupt_index_is_not_loaded(cells, reader, keep):
+    cells["load_or_scan_packets"](reader, DETECTION_PARAMS, cells["DroneSignalProcessor"](debug=False))
+    path = cells["PacketIndex"].path_for(reader.filepath)
+    with open(path, "rb") as f:
+        content = f.read()
+    with open(path, "wb") as f:
+        f.write(content[:keep])
+    assert cells["PacketIndex"].load(path) is None
+
+    with open(path, "wb") as f:
+        f.write(content[:12] + b"\xff" * (len(content) - 12))
+    assert cells["PacketIndex"].load(path) is None
+
+
+def test_fingerprint_changes_with_an_edit_between_the_sampled_blocks(cells, reader):
+    before = cells["capture_fingerprint"](reader.filepath, num_blocks=2, block_bytes=8)
+    stat = os.stat(reader.filepath)
+    with open(reader.filepath, "r+b") as f:
+        f.seek(stat.st_size // 2)
+        f.write(b"\x01" * 8)
+    os.utime(reader.filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cells["capture_fingerprint"](reader.filepath, num_blocks=2, block_bytes=8) != before
+
+    # The sampled blocks alone do not see the edit
+    os.utime(reader.filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cells["capture_fingerprint"](reader.filepath, num_blocks=2, block_bytes=8) == before
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+
+def _packets(truth, count):
+    return [(int(b["start_idx"]), int(b["end_idx"])) for b in truth[:count]]
+
+
+def _summary(results):
+    return [(r.start, r.end, r.offset, r.band_found) for r in results]
+
+
+@pytest.fixture
+def executor(cells):
+    pipeline = cells["PacketPipeline"](cells["DroneSignalProcessor"](debug=False), sampling_rate=50e6)
+    with cells["ParallelPacketExecutor"](pipeline.run, workers=2, tasks_per_worker=2) as executor:
+        yield executor
+
+
+def test_two_captures_in_sequence_match_the_serial_pipeline(cells, synthetic_capture, executor):
+    _, data, truth = synthetic_capture
+    packets = _packets(truth, 12)
+    capture = data[:truth[11]["end_idx"] + 1]
+
+    for shift in (0.0, 3e6, 0.0):
+        shifted = cells["DroneSignalProcessor"].fshift(capture, shift, 50e6)
+        serial = cells["PacketPipeline"](cells["DroneSignalProcessor"](debug=False)).run(shifted, packets)
+        parallel = executor.run(shifted, packets)
+        assert _summary(parallel) == _summary(serial)
+        for a, b in zip(parallel, serial):
+            assert (a.filtered is None) == (b.filtered is None)
+            if a.filtered is not None:
+                assert np.allclose(a.filtered, b.filtered)
+
+
+def test_file_backed_captures_are_not_copied(cells, synthetic_capture, executor, monkeypatch):
+    path, data, truth = synthetic_capture
+    packets = _packets(truth, 6)
+    serial = _summary(cells["PacketPipeline"](cells["DroneSignalProcessor"](debug=False)).run(data, packets))
+
+    def no_copy(*args, **kwargs):
+        raise AssertionError("file-backed capture copied into shared memory")
+
+    monkeypatch.setattr(cells["shared_memory"], "SharedMemory", no_copy)
+    assert _summary(executor.run(cells["CaptureReader"](path), packets)) == serial
+
+    # A slice of a memmap is re-opened at its own byte offset
+    first = packets[0][0] - 1000
+    view = np.memmap(path, dtype=np.complex64, mode="r")[first:]
+    assert cells["file_region"](view) == (path, first * 8)
+    shifted = [(start - first, end - first) for start, end in packets]
+    assert [(r.offset, r.band_found) for r in executor.run(view, shifted)] == [(s[2], s[3]) for s in serial]
+
+
+def test_worker_errors_are_raised_and_the_pool_recovers(cells, synthetic_capture):
+    _, data, truth = synthetic_capture
+
+    def fragile(capture, packets, capture_id=None):
+        if any(end - start < 10 for start, end in packets):
+            raise ValueError("packet too short")
+        return [len(capture[start:end]) for start, end in packets]
+
+    with cells["ParallelPacketExecutor"](fragile, workers=2) as executor:
+        with pytest.raises(RuntimeError, match="packet too short"):
+            executor.run(data, [(0, 5), (100, 200)])
+        assert executor.run(data, [(0, 50), (100, 200)]) == [50, 100]
+
+
+def test_balance_packets_covers_every_packet_once(cells):
+    packets = [(0, 10), (10, 500), (500, 520), (600, 900), (900, 1000)]
+    tasks = cells["balance_packets"](packets, 2)
+    assert sorted(i for task in tasks for i in task) == list(range(len(packets)))
+    loads = [sum(packets[i][1] - packets[i][0] for i in task) for task in tasks]
+    assert max(loads) == 490
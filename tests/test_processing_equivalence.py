@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import scipy.signal
+
+WINDOW_MS = 0.508
+
+
+@pytest.fixture(scope="module")
+def filtered_capture(cells, synthetic_capture):
+    _, data, truth = synthetic_capture
+    return cells["bandpass_filter"](data, 50e6, 5e6, 24e6), truth
+
+
+@pytest.mark.parametrize("mode", ["same", "valid"])
+@pytest.mark.parametrize("window", [1, 2, 25, 256])
+def test_energy_profile_matches_boxcar_convolution(cells, mode, window):
+    power = np.random.default_rng(window).exponential(1.0, 5000)
+    engine = cells["EnergyProfileEngine"](window, mode=mode, anchor_interval=700)
+    assert np.allclose(engine.compute(power), np.convolve(power, np.ones(window), mode=mode))
+
+
+@pytest.mark.parametrize("btype, cutoff", [("bandpass", (5e6, 24e6)), ("lowpass", 8.5e6)])
+def test_filter_bank_sosfiltfilt_matches_scipy(cells, btype, cutoff):
+    rng = np.random.default_rng(0)
+    rows = rng.standard_normal((3, 4000)) + 1j * rng.standard_normal((3, 4000))
+    bank = cells["FilterBank"]()
+    design = bank.design(btype, 4, cutoff, 50e6)
+    expected = scipy.signal.sosfiltfilt(design.sos, rows)
+
+    assert np.allclose(bank.sosfiltfilt(design, rows[0]), expected[0])
+    assert np.allclose(bank.sosfiltfilt(design, rows), expected)
+
+    lengths = np.array([4000, 1000, 100])
+    ragged = bank.sosfiltfilt_ragged(design, np.where(np.arange(4000) < lengths[:, None], rows, 0), lengths)
+    for row, length, result in zip(rows, lengths, ragged):
+        assert np.allclose(result[:length], scipy.signal.sosfiltfilt(design.sos, row[:length]))
+        assert not result[length:].any()
+    assert bank.design(btype, 4, cutoff, 50e6) is design
+
+
+def test_overlap_save_matches_direct_convolution(cells):
+    rng = np.random.default_rng(1)
+    x = rng.standard_normal(50000) + 1j * rng.standard_normal(50000)
+    taps = cells["design_fir"]("bandpass", (5e6, 24e6), 50e6, numtaps=257)
+
+    causal = cells["OverlapSaveFilter"](taps, block_size=4096, zero_phase=None).filter(x)
+    assert np.allclose(causal, np.convolve(x, taps)[:len(x)])
+
+    linear = cells["OverlapSaveFilter"](taps, block_size=4096).filter(x)
+    assert np.allclose(linear, np.convolve(x, taps, mode="same"))
+
+    blocks = [x[a:b] for a, b in [(0, 1), (1, 3000), (3000, 3000), (3000, 41000), (41000, 50000)]]
+    streamed = np.concatenate(list(cells["OverlapSaveFilter"](taps, block_size=4096).stream(blocks)))
+    assert np.allclose(streamed, linear)
+
+
+def test_streaming_detector_on_one_final_block_matches_batch_detection(cells, filtered_capture):
+    filtered, _ = filtered_capture
+    expected, _, threshold = cells["detect_packets_energy"](filtered, 50e6, WINDOW_MS, 0.6)
+
+    detector = cells["StreamingPacketDetector"](50e6, WINDOW_MS, 0.6)
+    assert detector.process(filtered, final=True) == expected
+    assert np.isclose(detector.threshold, threshold)
+    assert len(expected) > 0
+
+
+@pytest.mark.parametrize("block_samples", [1000, 10_007, 25_399])
+def test_streaming_detector_in_small_blocks_matches_batch_detection(cells, filtered_capture, block_samples):
+    filtered = filtered_capture[0][:600_000]
+    expected, _, threshold = cells["detect_packets_energy"](filtered, 50e6, WINDOW_MS, 0.6)
+    assert max(end - start for start, end in expected) > 2 * block_samples
+
+    detector = cells["StreamingPacketDetector"](50e6, WINDOW_MS, 0.6)
+    assert block_samples < detector.window_samples
+    # The running noise level depends on how much of the stream has been seen, so pin the threshold
+    # to the batch one and compare only the block-boundary handling of the energy and the packets
+    detector._update_noise_level = lambda energy: setattr(detector, "threshold", threshold)
+    blocks = (filtered[i:i + block_samples] for i in range(0, len(filtered), block_samples))
+    assert list(detector.iter_packets(blocks)) == expected
+
+
+@pytest.mark.parametrize("max_refined_fraction", [0.1, 1.0, 0.0])
+@pytest.mark.parametrize("options", [{}, {"off_threshold_factor": 0.4, "min_packet_samples": 500,
+                                          "min_gap_samples": 2000}])
+def test_coarse_to_fine_matches_detect_packets_energy(cells, filtered_capture, max_refined_fraction, options):
+    filtered, _ = filtered_capture
+    options = dict(options)
+    expected, _, threshold = cells["detect_packets_energy"](filtered, 50e6, WINDOW_MS, 0.6, **options)
+
+    detector = cells["CoarseToFineDetector"](50e6, WINDOW_MS, 0.6, block_samples=256, chunk_samples=1 << 16,
+                                             max_refined_fraction=max_refined_fraction, **options)
+    packets, _, coarse_threshold = detector.detect(filtered)
+    assert packets == expected
+    assert np.isclose(coarse_threshold, threshold)
+    if max_refined_fraction == 0.1:
+        assert detector.refined_fraction < 0.1
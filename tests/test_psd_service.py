@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+import scipy.signal
+
+
+def _packet(seed, length=8192):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(length) + 1j * rng.standard_normal(length)).astype(np.complex64)
+
+
+def test_psd_matches_windowed_welch(cells):
+    packet = _packet(0)
+    psd = cells["PSDService"]().psd(packet, key=(0, len(packet)), fs=50e6, nperseg=2048, capture_id="a")
+
+    f, Pxx_den = scipy.signal.welch(packet * scipy.signal.windows.hamming(len(packet)), 50e6, nperseg=2048,
+                                    return_onesided=False)
+    assert np.allclose(psd.f, np.fft.fftshift(f))
+    assert np.allclose(psd.Pxx_den, np.fft.fftshift(Pxx_den), rtol=1e-5)
+    assert psd.threshold == pytest.approx(1.1 * np.mean(psd.Pxx_den))
+
+
+def test_cache_is_keyed_by_capture(cells):
+    service = cells["PSDService"]()
+    first = service.psd(_packet(1), key=(0, 8192), fs=50e6, capture_id="capture_a.dat")
+    again = service.psd(_packet(1), key=(0, 8192), fs=50e6, capture_id="capture_a.dat")
+    other = service.psd(_packet(2), key=(0, 8192), fs=50e6, capture_id="capture_b.dat")
+
+    assert again is first
+    assert other is not first and not np.allclose(other.Pxx_den, first.Pxx_den)
+    assert service.cache_info()["hits"] == 1 and service.cache_info()["misses"] == 2
+
+    with pytest.raises(ValueError):
+        service.psd(_packet(1), key=(0, 8192), fs=50e6, capture_id=None)
+
+
+def test_unknown_window_is_refused(cells):
+    service = cells["PSDService"]()
+    with pytest.raises(ValueError, match="window"):
+        service.psd(_packet(3), key=(0, 8192), fs=50e6, window="hann", capture_id="a")
+    untapered = service.psd(_packet(3), key=(0, 8192), fs=50e6, nperseg=2048, window=None, capture_id="a")
+    f, Pxx_den = scipy.signal.welch(_packet(3), 50e6, nperseg=2048, return_onesided=False)
+    assert np.allclose(untapered.Pxx_den, np.fft.fftshift(Pxx_den), rtol=1e-5)
+
+
+def test_band_powers_are_trapezoid_integrals(cells):
+    psd = cells["PSDService"]().psd(_packet(4), key=(0, 8192), fs=50e6, capture_id="a")
+    bands = [(-8.5e6, 8.5e6), (-25e6, -8.5e6), (8.5e6, 25e6)]
+    powers = psd.Pxx_den @ cells["band_weights"](psd.f, bands)
+
+    for band, power in zip(bands, powers):
+        inside = (psd.f >= band[0]) & (psd.f <= band[1])
+        assert power == pytest.approx(np.trapezoid(psd.Pxx_den[inside], psd.f[inside]))
+        assert cells["integrate_power"](psd.f, psd.Pxx_den, band) == pytest.approx(power)
+
+    result = cells["SNRCalculator"](psd.f, bands[0], bands[1:]).compute(psd.Pxx_den)
+    assert result.snr_dB[0] == pytest.approx(10 * np.log10(powers[0] / powers[1:].sum()))
+
+
+def test_filtered_stages_are_keyed_by_their_filter(cells):
+    service = cells["PSDService"]()
+    stage = cells["filter_stage"]("lowpass", poles=12, cutoff=8.5e6)
+    assert stage == cells["filter_stage"]("lowpass", cutoff=8.5e6, poles=12)
+
+    first = service.psd(_packet(5), key=(0, 8192, 0.0), fs=50e6, stage=stage, capture_id="a")
+    assert service.psd(_packet(5), key=(0, 8192, 0.0), fs=50e6, stage=stage, capture_id="a") is first
+    for other in (cells["filter_stage"]("lowpass", poles=12, cutoff=4e6),
+                  cells["filter_stage"]("lowpass", poles=6, cutoff=8.5e6),
+                  cells["filter_stage"]("dft_filter", cutoff=8.5e6)):
+        assert service.psd(_packet(6), key=(0, 8192, 0.0), fs=50e6, stage=other, capture_id="a") is not first
+    assert service.cache_info()["hits"] == 1 and service.cache_info()["misses"] == 4
+
+
+def test_psd_scripts_share_one_segment_length(cells):
+    import inspect
+
+    psd = cells["PSDService"]().psd(_packet(7), key=(0, 8192), fs=50e6, capture_id="a")
+    assert len(psd.f) == cells["PSD_NPERSEG"]
+    for function in ("compute_snr_and_plot_psd", "analyze_packets"):
+        default = inspect.signature(cells[function]).parameters["nfft_welch"].default
+        assert default == cells["PSD_NPERSEG"]
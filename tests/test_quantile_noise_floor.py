@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+
+def _score(packets, truth):
+    """Bursts overlapped by a detection, and detections overlapping no burst."""
+    packets = np.array(packets).reshape(-1, 2)
+    overlap = (packets[:, None, 0] < truth["end_idx"][None]) & (packets[:, None, 1] > truth["start_idx"][None])
+    return overlap.any(axis=0), ~overlap.any(axis=1)
+
+
+@pytest.fixture(scope="module")
+def dense_capture(cells):
+    # 32k-sample bursts every 35k samples: over 90 % of the capture is traffic
+    generator = cells["SyntheticOcuSync2"](seed=5, burst_spacing_s=0.7e-3, jitter_s=0.05e-3)
+    return generator.generate(0, 2_500_000), generator.schedule(2_500_000)
+
+
+@pytest.fixture(scope="module")
+def spaced_capture(cells):
+    # 32k-sample bursts every 42.5k samples (75 % traffic), with gaps longer than the sync symbols
+    generator = cells["SyntheticOcuSync2"](seed=5, burst_spacing_s=0.85e-3, jitter_s=0.02e-3)
+    return generator.generate(0, 2_500_000), generator.schedule(2_500_000)
+
+
+def _detect(cells, data, block_samples=1 << 18, **kwargs):
+    detector = cells["StreamingPacketDetector"](50e6, 0.05, **kwargs)
+    return list(detector.iter_packets(data[i:i + block_samples] for i in range(0, len(data), block_samples)))
+
+
+def _bursts_per_detection(packets, truth):
+    """Number of bursts holding the centre of each detection, and of detections centred in each burst."""
+    centres = np.array(packets).reshape(-1, 2).mean(axis=1)
+    inside = (centres[:, None] >= truth["start_idx"][None]) & (centres[:, None] < truth["end_idx"][None])
+    return inside.sum(axis=1), inside.sum(axis=0)
+
+
+def test_sketch_quantiles_within_relative_accuracy(cells):
+    values = np.random.default_rng(0).lognormal(0, 3, 200_000)
+    sketch = cells["QuantileSketch"](0.01)
+    for chunk in np.array_split(values, 7):
+        sketch.update(chunk)
+    q = [0.01, 0.1, 0.5, 0.9, 0.99]
+    assert np.all(np.abs(sketch.quantile(q) / np.quantile(values, q) - 1) <= 0.01)
+
+    merged = cells["QuantileSketch"](0.01).update(values[:50_000]).merge(cells["QuantileSketch"](0.01).update(values[50_000:]))
+    assert np.allclose(merged.quantile(q), sketch.quantile(q))
+
+
+def test_quantile_floor_finds_every_burst_in_dense_traffic(cells, dense_capture):
+    data, truth = dense_capture
+    found, false = _score(_detect(cells, data, threshold_factor=2.0, noise_mode="quantile"), truth)
+    assert found.all()
+    assert false.sum() <= 2
+
+    # The running mean is pulled up by the traffic and misses most of the weaker bursts
+    found_mean, _ = _score(_detect(cells, data, threshold_factor=0.6), truth)
+    assert found_mean[truth["snr_dB"] == 5].sum() < 0.1 * np.sum(truth["snr_dB"] == 5)
+
+
+def test_quantile_floor_gives_one_detection_per_burst(cells, spaced_capture):
+    data, truth = spaced_capture
+
+    # The sync symbols sit at the noise floor, so without merging every burst is cut in three
+    split = _detect(cells, data, threshold_factor=2.0, noise_mode="quantile")
+    assert len(split) >= 2.5 * len(truth)
+
+    packets = _detect(cells, data, threshold_factor=2.0, noise_mode="quantile", min_gap_ms=0.1)
+    per_detection, per_burst = _bursts_per_detection(packets, truth)
+    assert len(packets) == len(truth)
+    assert np.all(per_detection == 1) and np.all(per_burst == 1)
+
+    # Packets held back for merging across block boundaries are not lost or split
+    packets = _detect(cells, data, block_samples=10_000, threshold_factor=2.0, noise_mode="quantile", min_gap_ms=0.1)
+    per_detection, per_burst = _bursts_per_detection(packets, truth)
+    assert len(packets) == len(truth)
+    assert np.all(per_detection == 1) and np.all(per_burst == 1)
+
+
+def test_gap_merging_matches_detect_packets_energy(cells):
+    energy = np.zeros(40_000)
+    for start, stop in [(1000, 5000), (5400, 9000), (12_000, 15_000), (15_100, 15_200), (30_000, 40_000)]:
+        energy[start:stop] = 1.0
+    data = np.sqrt(energy + 1e-3) * np.exp(1j * np.random.default_rng(0).uniform(0, 2 * np.pi, len(energy)))
+    expected, _, _ = cells["detect_packets_energy"](data, 1e6, 0.01, 0.5, min_gap_samples=1000)
+    assert len(expected) == 3
+    merging = cells["StreamingPacketDetector"](1e6, 0.01, 0.5, min_gap_ms=1.0)
+    assert list(merging.iter_packets([data])) == expected
+
+    # In smaller blocks the running threshold moves, so compare with the unmerged packets of the same blocks
+    for block_samples in (4096, 777):
+        blocks = [data[i:i + block_samples] for i in range(0, len(data), block_samples)]
+        merging.reset()
+        unmerged = np.array(list(cells["StreamingPacketDetector"](1e6, 0.01, 0.5).iter_packets(blocks)))
+        starts, ends = cells["clean_runs"](unmerged[:, 0], unmerged[:, 1], min_gap=1000)
+        assert list(merging.iter_packets(blocks)) == list(zip(starts.tolist(), ends.tolist()))
+
+
+def test_band_across_dc_stays_one_band(cells):
+    nfft, fs = 2048, 50e6
+    psd = np.ones(nfft)
+    psd[nfft // 2 - 200:nfft // 2 + 200] = 10.0
+    processor = cells["DroneSignalProcessor"](debug=False)
+
+    floor = cells["NoiseFloorTracker"](quantile=0.5, factor=4.0)
+    offset, band_found = processor.find_offset_band(psd, fs, nfft, noise_floor=floor)
+    default_offset, _ = processor.find_offset_band(psd, fs, nfft)
+    assert band_found and abs(offset) <= fs / nfft
+    assert offset == default_offset
+
+
+def test_noise_floor_update_is_explicit(cells):
+    nfft, fs = 2048, 50e6
+    psd = np.ones(nfft)
+    psd[200:600] = 10.0
+    processor = cells["DroneSignalProcessor"](debug=False)
+    floor = cells["NoiseFloorTracker"](quantile=0.5, factor=4.0)
+
+    first = processor.find_offset_band(psd, fs, nfft, noise_floor=floor)
+    assert floor.sketch.count == nfft
+    again = processor.find_offset_band(psd, fs, nfft, noise_floor=floor, update_noise_floor=False)
+    assert floor.sketch.count == nfft and again == first
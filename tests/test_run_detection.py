@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+
+def _runs(cells, mask):
+    starts, ends = cells["find_runs"](mask)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def _runs_of(cells, values, on_threshold, off_threshold=None, **kwargs):
+    starts, ends = cells["detect_runs"](values, on_threshold, off_threshold=off_threshold, **kwargs)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def _reference_runs(values, on_threshold, off_threshold):
+    """Per-sample loop: a run opens above on_threshold and stays open while above off_threshold."""
+    runs, start = [], None
+    for i, value in enumerate(values):
+        if start is None and value > on_threshold:
+            start = i
+        elif start is not None and value <= off_threshold:
+            runs.append((start, i))
+            start = None
+    if start is not None:
+        runs.append((start, len(values)))
+    return runs
+
+
+def test_find_runs_edge_cases(cells):
+    assert _runs(cells, np.zeros(0, dtype=bool)) == []
+    assert _runs(cells, np.zeros(5, dtype=bool)) == []
+    assert _runs(cells, np.ones(5, dtype=bool)) == [(0, 5)]
+    assert _runs(cells, [True]) == [(0, 1)]
+    assert _runs(cells, [True, True, False, True, False, False, True]) == [(0, 2), (3, 4), (6, 7)]
+    assert _runs(cells, [False, True, True, False]) == [(1, 3)]
+
+    starts, ends = cells["find_runs"](np.zeros(0, dtype=bool))
+    assert starts.dtype == ends.dtype == np.int64
+
+
+def test_detect_runs_hysteresis_matches_a_sample_loop(cells):
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        values = np.cumsum(rng.standard_normal(rng.integers(1, 300)))
+        starts, ends = cells["detect_runs"](values, 1.0, off_threshold=-1.0)
+        assert list(zip(starts.tolist(), ends.tolist())) == _reference_runs(values, 1.0, -1.0)
+
+        starts, ends = cells["detect_runs"](values, 0.5)
+        assert list(zip(starts.tolist(), ends.tolist())) == _reference_runs(values, 0.5, 0.5)
+
+
+def test_detect_runs_hysteresis_edge_cases(cells):
+    values = np.array([2.0, 0.5, 0.5, 0.0, 0.5, 0.5, 0.0, 0.5, 2.0, 0.5])
+    # Opens at the first sample and again at the trigger; a run above off that never triggers is dropped
+    assert _runs_of(cells, values, 1.0, 0.2) == [(0, 3), (8, 10)]
+    # Without hysteresis only the trigger samples remain
+    assert _runs_of(cells, values, 1.0) == [(0, 1), (8, 9)]
+    # Everything above both thresholds is one run touching both ends
+    assert _runs_of(cells, np.full(6, 3.0), 1.0, 0.2) == [(0, 6)]
+    assert _runs_of(cells, np.zeros(0), 1.0, 0.2) == []
+
+    # below=True mirrors the thresholds
+    assert _runs_of(cells, -values, -1.0, -0.2, below=True) == [(0, 3), (8, 10)]
+
+
+def test_clean_runs(cells):
+    starts, ends = np.array([0, 5, 7, 20]), np.array([3, 6, 12, 21])
+    merged = cells["clean_runs"](starts, ends, min_gap=2)
+    assert [r.tolist() for r in merged] == [[0, 5, 20], [3, 12, 21]]
+    kept = cells["clean_runs"](starts, ends, min_run=2)
+    assert [r.tolist() for r in kept] == [[0, 7], [3, 12]]
+    truncated = cells["clean_runs"](starts, ends, max_length=2)
+    assert [r.tolist() for r in truncated] == [[0, 5, 7, 20], [2, 6, 9, 21]]
+    # Merging happens before the length filter: two short runs merged across a short gap are kept
+    assert [r.tolist() for r in cells["clean_runs"](starts[1:3], ends[1:3], min_run=6, min_gap=2)] == [[5], [12]]
+    empty = cells["clean_runs"](np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), min_run=3, min_gap=2)
+    assert [len(r) for r in empty] == [0, 0]
+
+
+@pytest.mark.parametrize("leading_gap", [True, False])
+def test_extract_patterns_keeps_every_low_energy_region(cells, leading_gap):
+    pattern_length, window_size = 100, 5
+    packet = np.ones(2000, dtype=np.complex64)
+    regions = [(300, 450), (900, 950), (1500, 1700)]     # the middle one is shorter than a pattern
+    if leading_gap:
+        regions.insert(0, (0, 200))
+    for start, end in regions:
+        packet[start:end] = 0.01
+
+    patterns, starts, ends, smoothed = cells["extract_patterns"](packet, 0.5, pattern_length, window_size)
+
+    # Every low-energy region long enough is reported, including the first one, wherever it starts
+    # (the per-sample loop this replaced only opened a region after an index gap, so it skipped the first)
+    expected = [(start, end) for start, end in regions if end - start >= pattern_length]
+    assert len(starts) == len(expected)
+    for start, end, (region_start, region_end) in zip(starts, ends, expected):
+        assert abs(start - region_start) <= window_size // 2
+        assert end - start == pattern_length
+    assert all(len(p) == pattern_length for p in patterns)
+    assert np.array_equal(patterns[0], packet[starts[0]:ends[0]])
+    assert smoothed.shape == packet.shape
@@ -0,0 +1,107 @@
+import os
+import numpy as np
+import pytest
+import scipy.signal
+
+NFFT, FRAMES_PER_ROW, FACTOR, TILE_ROWS = 64, 4, 2, 8
+# 151 level-0 rows, the last one pooling only 3 frames, and a few samples past the last frame
+NUM_FRAMES = FRAMES_PER_ROW * 150 + 3
+BUILD = dict(nfft=NFFT, frames_per_row=FRAMES_PER_ROW, factor=FACTOR, tile_rows=TILE_ROWS, chunk_frames=26)
+
+
+@pytest.fixture(scope="module")
+def capture(cells, tmp_path_factory):
+    path = tmp_path_factory.mktemp("pyramid") / "capture.dat"
+    rng = np.random.default_rng(0)
+    num_samples = NUM_FRAMES * NFFT + 10
+    data = (rng.standard_normal(num_samples) + 1j * rng.standard_normal(num_samples)).astype(np.complex64)
+    data[5000:20000] *= 1 + 5 * np.exp(2j * np.pi * 0.2 * np.arange(15000))
+    data.tofile(path)
+    return cells["CaptureReader"](str(path), sampling_rate=1e6), data
+
+
+def _level(pyramid, level, stat):
+    """Every row of a level, concatenated from its tiles."""
+    level_dir = os.path.join(pyramid.directory, f"level_{level:02d}")
+    tiles = sorted(name for name in os.listdir(level_dir) if name.startswith(stat))
+    assert len(tiles) == pyramid.levels[level]["tiles"]
+    return np.concatenate([np.load(os.path.join(level_dir, name)) for name in tiles])
+
+
+def test_level_zero_pools_frame_power_spectra(cells, capture, tmp_path):
+    reader, data = capture
+    pyramid = cells["SpectrogramPyramid"].open_or_build(reader, str(tmp_path / "pyramid"), **BUILD)
+
+    window = scipy.signal.get_window("hann", NFFT)
+    frames = data[:NUM_FRAMES * NFFT].reshape(-1, NFFT) * window
+    power = np.fft.fftshift(np.abs(np.fft.fft(frames, axis=1)) ** 2, axes=1) / (1e6 * (window ** 2).sum())
+    edges = np.arange(0, NUM_FRAMES, FRAMES_PER_ROW)
+    counts = np.diff(np.append(edges, NUM_FRAMES))
+
+    assert pyramid.levels[0]["rows"] == len(edges) == 151
+    assert np.allclose(_level(pyramid, 0, "mean"), np.add.reduceat(power, edges) / counts[:, None], rtol=1e-4)
+    assert np.allclose(_level(pyramid, 0, "peak"), np.maximum.reduceat(power, edges), rtol=1e-4)
+
+
+def test_every_level_equals_pooled_level_zero(cells, capture, tmp_path):
+    reader, _ = capture
+    pyramid = cells["SpectrogramPyramid"].open_or_build(reader, str(tmp_path / "pyramid"), **BUILD)
+    assert [info["rows"] for info in pyramid.levels] == [151, 76, 38, 19, 10, 5]
+
+    mean, peak = _level(pyramid, 0, "mean"), _level(pyramid, 0, "peak")
+    counts = np.full(len(mean), FRAMES_PER_ROW)
+    counts[-1] = NUM_FRAMES % FRAMES_PER_ROW
+    for level, info in enumerate(pyramid.levels):
+        # Tiles hold a multiple of factor rows, so level k row j pools level 0 rows [j, j + 1) * factor**k
+        pooled_mean, pooled_peak, pooled_counts = cells["pool_rows"](mean, peak, counts, FACTOR ** level)
+        assert info["samples_per_row"] == NFFT * FRAMES_PER_ROW * FACTOR ** level
+        assert np.allclose(_level(pyramid, level, "mean"), pooled_mean, rtol=1e-5)
+        assert np.array_equal(_level(pyramid, level, "peak"), pooled_peak)
+        assert pooled_counts.sum() == NUM_FRAMES
+
+        # A window at this level is the same rows, read back from the tiles
+        times, _, rows = pyramid.window(level=level, stat="peak")
+        assert np.array_equal(rows, pooled_peak)
+        assert np.allclose(times, np.arange(len(rows)) * info["samples_per_row"] / 1e6)
+
+
+def test_repeated_query_reuses_the_tiles(cells, capture, tmp_path, monkeypatch):
+    reader, _ = capture
+    directory = str(tmp_path / "pyramid")
+    Pyramid = cells["SpectrogramPyramid"]
+    first = Pyramid.open_or_build(reader, directory, **BUILD)
+    tile = os.path.join(directory, "level_00", "mean_000000.npy")
+    built = os.stat(tile).st_mtime_ns
+    expected = first.window(0.01, 0.02, level=0)[2]
+
+    builds, loaded = [], []
+    build, load = Pyramid.build.__func__, np.load
+
+    def counted_build(cls, *args, **kwargs):
+        builds.append(kwargs)
+        return build(cls, *args, **kwargs)
+
+    def counted_load(path, *args, **kwargs):
+        loaded.append(os.path.basename(path))
+        return load(path, *args, **kwargs)
+
+    monkeypatch.setattr(Pyramid, "build", classmethod(counted_build))
+    again = Pyramid.open_or_build(reader, directory, **BUILD)
+    assert builds == [] and os.stat(tile).st_mtime_ns == built
+
+    # Only the tiles overlapping the window are read
+    monkeypatch.setattr(np, "load", counted_load)
+    assert np.array_equal(again.window(0.01, 0.02, level=0)[2], expected)
+    row_seconds = NFFT * FRAMES_PER_ROW / 1e6
+    first_tile, last_tile = int(0.01 // row_seconds) // TILE_ROWS, int(np.ceil(0.02 / row_seconds) - 1) // TILE_ROWS
+    assert loaded == [f"mean_{tile:06d}.npy" for tile in range(first_tile, last_tile + 1)]
+    monkeypatch.undo()
+
+    # Other parameters or a modified capture build it again
+    monkeypatch.setattr(Pyramid, "build", classmethod(counted_build))
+    assert Pyramid.open_or_build(reader, directory, **dict(BUILD, nfft=32)).nfft == 32
+    Pyramid.open_or_build(reader, directory, **BUILD)
+    stat = os.stat(reader.filepath)
+    os.utime(reader.filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    Pyramid.open_or_build(reader, directory, **BUILD)
+    assert [kwargs["nfft"] for kwargs in builds] == [32, NFFT, NFFT]
@@ -0,0 +1,111 @@
+import json
+import time
+import numpy as np
+
+
+def _member(owner, attribute):
+    member = vars(owner)[attribute]
+    return getattr(member, "__func__", member)
+
+
+def test_spans_nest_and_sum_per_stage(cells):
+    profiler = cells["StageProfiler"](enabled=True)
+    with profiler.span("outer", samples=10) as outer:
+        for _ in range(2):
+            with profiler.span("inner", samples=100) as inner:
+                inner.add(samples=5, packets=1)
+                time.sleep(0.01)
+        outer.add(packets=3)
+
+    inner_a, inner_b, outer_record = profiler.records
+    assert [r.name for r in profiler.records] == ["inner", "inner", "outer"]
+    assert inner_a.depth == inner_b.depth == 1 and outer_record.depth == 0
+    # Times are inclusive: the outer span contains both inner ones
+    assert outer_record.start <= inner_a.start and inner_b.start + inner_b.wall <= outer_record.start + outer_record.wall
+    assert outer_record.wall >= inner_a.wall + inner_b.wall >= 0.02
+
+    rows = {row["stage"]: row for row in profiler.summary()}
+    assert [row["stage"] for row in profiler.summary()] == ["outer", "inner"]
+    assert rows["inner"]["calls"] == 2 and rows["inner"]["samples"] == 210 and rows["inner"]["packets"] == 2
+    assert rows["inner"]["wall_s"] == inner_a.wall + inner_b.wall
+    assert rows["inner"]["max_ms"] == max(inner_a.wall, inner_b.wall) * 1e3
+    assert rows["inner"]["samples_per_s"] == 210 / rows["inner"]["wall_s"]
+    assert rows["outer"]["calls"] == 1 and rows["outer"]["samples"] == 10 and rows["outer"]["packets"] == 3
+    assert len(profiler.format_summary().splitlines()) == 3
+
+
+def test_disabled_profiler_records_nothing(cells):
+    profiler = cells["StageProfiler"]()
+    with profiler.span("idle", samples=10) as span:
+        span.add(samples=1)
+    assert span is cells["_NULL_SPAN"] and profiler.records == []
+
+    profiler.enable()
+    with profiler.span("active"):
+        pass
+    profiler.disable()
+    with profiler.span("idle"):
+        pass
+    assert [r.name for r in profiler.records] == ["active"]
+
+
+def test_instrument_and_uninstrument_restore_the_originals(cells):
+    namespace = dict(cells)
+    stages = cells["PIPELINE_STAGES"]
+    functions = {name: namespace[name] for name in stages if "." not in name and name in namespace}
+    methods = {name: _member(namespace[name.split(".")[0]], name.split(".")[1])
+               for name in stages if "." in name and name.split(".")[0] in namespace}
+    profiler = cells["StageProfiler"](enabled=True)
+
+    try:
+        wrapped = cells["instrument"](namespace, profiler)
+        assert set(wrapped) == set(functions) | set(methods)
+        # A second call does not wrap twice
+        assert cells["instrument"](namespace, profiler) == []
+        for name, func in functions.items():
+            assert namespace[name].__wrapped__ is func and cells[name] is func
+        for name, func in methods.items():
+            assert _member(namespace[name.split(".")[0]], name.split(".")[1]).__wrapped__ is func
+        assert isinstance(vars(namespace["DroneSignalProcessor"])["fshift"], staticmethod)
+
+        data = np.ones(5000, dtype=np.complex64)
+        namespace["bandpass_filter"](data, 50e6, 5e6, 20e6)
+        namespace["DroneSignalProcessor"].fshift(data, 1e6, 50e6)
+        assert [(r.name, r.samples, r.packets) for r in profiler.records] == [("bandpass", 5000, 0),
+                                                                               ("shift", 5000, 1)]
+
+        # Disabled hooks call straight through
+        profiler.disable()
+        namespace["bandpass_filter"](data, 50e6, 5e6, 20e6)
+        assert len(profiler.records) == 2
+    finally:
+        cells["uninstrument"](namespace)
+
+    for name, func in functions.items():
+        assert namespace[name] is func
+    for name, func in methods.items():
+        owner, attribute = name.split(".")
+        assert _member(namespace[owner], attribute) is func
+    assert isinstance(vars(namespace["DroneSignalProcessor"])["fshift"], staticmethod)
+
+
+def test_chrome_trace_is_well_formed(cells, tmp_path):
+    profiler = cells["StageProfiler"](enabled=True)
+    with profiler.span("outer", samples=7):
+        with profiler.span("inner", packets=2):
+            time.sleep(0.002)
+
+    path = profiler.write_chrome_trace(str(tmp_path / "trace.json"))
+    with open(path) as f:
+        trace = json.load(f)
+
+    assert trace["displayTimeUnit"] == "ms"
+    inner, outer = trace["traceEvents"]
+    for event, record in zip((inner, outer), profiler.records):
+        assert set(event) == {"name", "cat", "ph", "pid", "tid", "ts", "dur", "args"}
+        assert event["ph"] == "X" and event["name"] == record.name and isinstance(event["tid"], int)
+        assert event["ts"] >= 0 and event["dur"] == record.wall * 1e6
+        assert set(event["args"]) == {"cpu_ms", "samples", "packets", "bytes_allocated"}
+    assert outer["args"]["samples"] == 7 and inner["args"]["packets"] == 2
+    # Complete events nest by time, as the viewer draws them
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"] + 1e-3